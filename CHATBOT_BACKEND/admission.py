@@ -0,0 +1,224 @@
+import os
+import math
+import time
+import asyncio
+import threading
+from collections import deque
+import logging
+logger = logging.getLogger(__name__)
+
+# 서버 측 요청 수용 제어 ( chat / chat_async ) : 클라이언트 currentUser 대신 처리 중 요청 수 + LLM 응답 시간 기준
+# 동시 처리 한도는 AIMD ( 응답 시간 정상 : 한도 도달 시 +1/limit, 지연 / 리소스 부족 : x DECREASE )
+# 동기 함수는 Python worker thread pool 에서 실행 ( 미설정 시 worker 기본값 min(32, cpu + 4) ) -> 초기 한도 = thread 수
+# async 요청은 I/O 대기 중 thread 를 점유하지 않으므로 최대 한도는 thread 수의 ADMISSION_ASYNC_FACTOR 배
+ADMISSION_THREAD_COUNT = int(os.environ.get("PYTHON_THREADPOOL_THREAD_COUNT") or min(32, (os.cpu_count() or 1) + 4))
+ADMISSION_ASYNC_FACTOR = 2
+ADMISSION_INITIAL_LIMIT = ADMISSION_THREAD_COUNT
+ADMISSION_MIN_LIMIT = min(4, ADMISSION_THREAD_COUNT)
+ADMISSION_MAX_LIMIT = ADMISSION_THREAD_COUNT * ADMISSION_ASYNC_FACTOR
+ADMISSION_DECREASE = 0.8
+# 연속 감소 방지 ( 감소 후 이 시간 동안은 다시 줄이지 않음, 초 )
+ADMISSION_DECREASE_INTERVAL = 5
+# LLM 응답 시간 ( llm_refinement + llm_answer ) 목표 (초), 이동 평균으로 비교
+ADMISSION_TARGET_LATENCY = 15
+ADMISSION_LATENCY_ALPHA = 0.2
+# 한도 초과 시 대기열 ( aacquire 만 사용 ) : 최대 대기 요청 수 / 최대 대기 시간 (초, 요청 deadline 이내)
+ADMISSION_QUEUE_SIZE = 64
+ADMISSION_QUEUE_TIMEOUT = 5
+# 한 locale 이 대기열에서 차지할 수 있는 비율
+ADMISSION_LOCALE_QUEUE_SHARE = 0.5
+# 경합 중 ( 다른 locale 이 대기 중이거나 최근 거절됨 ) 한 locale 이 처리 중 한도에서 차지할 수 있는 비율
+# 동기 경로는 대기열이 없어 이 상한으로 공정 분배 ( 경합이 없으면 한 locale 도 한도 전체 사용 )
+ADMISSION_LOCALE_SHARE = 0.5
+# 거절된 locale 을 경합 중으로 보는 시간 (초)
+ADMISSION_LOCALE_SHED_WINDOW = 10
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason, locale):
+        super().__init__(f"Admission rejected ( {reason} ) : {locale}")
+        self.reason = reason
+        self.locale = locale
+
+class Ticket:
+    def __init__(self, locale, wait_time):
+        self.locale = locale
+        self.wait_time = wait_time
+        self.start_time = time.time()
+        self.released = False
+
+class Waiter:
+    def __init__(self, locale, wake):
+        self.locale = locale
+        self.wake = wake
+        self.enqueue_time = time.time()
+        self.granted = False
+
+class AdmissionController:
+    def __init__(self, initial_limit=ADMISSION_INITIAL_LIMIT, min_limit=ADMISSION_MIN_LIMIT, max_limit=ADMISSION_MAX_LIMIT,
+                 target_latency=ADMISSION_TARGET_LATENCY, queue_size=ADMISSION_QUEUE_SIZE, queue_timeout=ADMISSION_QUEUE_TIMEOUT):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        # locale 별 처리 중 요청 수 / 대기열
+        self.locale_in_flight = {}
+        self.queues = {}
+        # locale 별 마지막 거절 시간
+        self.locale_shed = {}
+        self.queued = 0
+        self.latency = None
+        self.decrease_time = 0
+        self.counts = {"admitted": 0, "queued": 0, "shed_limit": 0, "shed_locale_limit": 0, "shed_queue_full": 0, "shed_locale_share": 0, "shed_timeout": 0,
+                       "increase": 0, "decrease": 0}
+
+    def admit(self, locale):
+        self.in_flight += 1
+        self.locale_in_flight[locale] = self.locale_in_flight.get(locale, 0) + 1
+        self.counts["admitted"] += 1
+
+    def shed(self, reason, locale):
+        self.counts[f"shed_{reason}"] += 1
+        self.locale_shed[locale] = time.time()
+        return AdmissionRejected(reason, locale)
+
+    # 대기 중이거나 최근 거절된 locale
+    def contending_locales(self, now):
+        for locale, shed_time in list(self.locale_shed.items()):
+            if now - shed_time > ADMISSION_LOCALE_SHED_WINDOW:
+                del self.locale_shed[locale]
+        return set(self.locale_shed) | set(locale for locale, queue in self.queues.items() if queue)
+
+    # 다른 locale 이 경합 중인데 이 locale 이 한도의 ADMISSION_LOCALE_SHARE 이상 처리 중
+    def over_share(self, locale, now=None):
+        if self.locale_in_flight.get(locale, 0) < max(1, math.ceil(int(self.limit) * ADMISSION_LOCALE_SHARE)):
+            return False
+        return bool(self.contending_locales(time.time() if now is None else now) - {locale})
+
+    # 대기 없이 처리 가능 : 한도 미만 + locale 상한 미만 + 이 locale 보다 처리 중 요청이 적은 locale 의 대기 요청이 없음
+    def can_admit(self, locale):
+        if self.in_flight >= int(self.limit) or self.over_share(locale):
+            return False
+        current = self.locale_in_flight.get(locale, 0)
+        return not any(queue and self.locale_in_flight.get(other, 0) <= current for other, queue in self.queues.items())
+
+    # 반환 : Ticket ( 즉시 처리 ) / Waiter ( 대기열 등록 ), 대기열이 가득 차면 AdmissionRejected
+    # wake 가 없으면 ( 동기 경로 ) 대기열 없이 즉시 AdmissionRejected
+    def try_acquire(self, locale, wake=None):
+        with self.lock:
+            if self.can_admit(locale):
+                self.admit(locale)
+                return Ticket(locale, 0.0)
+            if wake is None:
+                raise self.shed("locale_limit" if self.over_share(locale) else "limit", locale)
+            if self.queued >= self.queue_size:
+                raise self.shed("queue_full", locale)
+            queue = self.queues.setdefault(locale, deque())
+            if len(queue) >= max(1, math.ceil(self.queue_size * ADMISSION_LOCALE_QUEUE_SHARE)):
+                raise self.shed("locale_share", locale)
+            waiter = Waiter(locale, wake)
+            queue.append(waiter)
+            self.queued += 1
+            self.counts["queued"] += 1
+            return waiter
+
+    # 빈 자리는 처리 중 요청이 가장 적은 locale 의 첫 대기 요청에 배정 ( locale 간 공정 분배, locale 상한 초과 locale 제외 )
+    def dispatch(self):
+        woken = []
+        while self.queued and self.in_flight < int(self.limit):
+            now = time.time()
+            locales = [locale for locale, queue in self.queues.items() if queue and not self.over_share(locale, now)]
+            if not locales:
+                break
+            locale = min(locales, key=lambda locale: self.locale_in_flight.get(locale, 0))
+            waiter = self.queues[locale].popleft()
+            if not self.queues[locale]:
+                del self.queues[locale]
+            self.queued -= 1
+            waiter.granted = True
+            self.admit(locale)
+            woken.append(waiter)
+        return woken
+
+    # 대기 종료 후 결과 확인 ( 배정되지 않았으면 대기열에서 제거 후 AdmissionRejected )
+    def finish_wait(self, waiter):
+        with self.lock:
+            if not waiter.granted:
+                queue = self.queues.get(waiter.locale)
+                if queue is not None and waiter in queue:
+                    queue.remove(waiter)
+                    self.queued -= 1
+                    if not queue:
+                        del self.queues[waiter.locale]
+                raise self.shed("timeout", waiter.locale)
+        return Ticket(waiter.locale, time.time() - waiter.enqueue_time)
+
+    def wait_timeout(self, timeout):
+        return self.queue_timeout if timeout is None else min(timeout, self.queue_timeout)
+
+    # 동기 경로 : 대기 중에도 worker thread 를 점유하므로 한도 초과 시 바로 거절
+    def acquire(self, locale):
+        return self.try_acquire(locale)
+
+    async def aacquire(self, locale, timeout=None):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def wake():
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(True))
+
+        result = self.try_acquire(locale, wake)
+        if isinstance(result, Ticket):
+            return result
+        try:
+            await asyncio.wait([future], timeout=self.wait_timeout(timeout))
+        except asyncio.CancelledError:
+            # 대기 중 취소 : 이미 배정된 자리는 반납
+            try:
+                self.release(self.finish_wait(result))
+            except AdmissionRejected:
+                pass
+            raise
+        return self.finish_wait(result)
+
+    # latency : 요청의 LLM 응답 시간 ( LLM 호출 없이 끝난 요청은 None ), overloaded : OpenAI 리소스 부족
+    def release(self, ticket, latency=None, overloaded=False):
+        with self.lock:
+            if ticket.released:
+                return
+            ticket.released = True
+            saturated = self.in_flight >= int(self.limit)
+            self.in_flight -= 1
+            self.locale_in_flight[ticket.locale] -= 1
+            if not self.locale_in_flight[ticket.locale]:
+                del self.locale_in_flight[ticket.locale]
+
+            if latency is not None:
+                self.latency = latency if self.latency is None else ADMISSION_LATENCY_ALPHA * latency + (1 - ADMISSION_LATENCY_ALPHA) * self.latency
+            now = time.time()
+            if overloaded or (latency is not None and self.latency > self.target_latency):
+                if now - self.decrease_time >= ADMISSION_DECREASE_INTERVAL:
+                    self.limit = max(self.min_limit, self.limit * ADMISSION_DECREASE)
+                    self.decrease_time = now
+                    self.counts["decrease"] += 1
+                    logger.info(f"Admission limit decreased : {self.limit:.1f} ( latency {self.latency}, overloaded {overloaded} )")
+            elif latency is not None and saturated:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+                self.counts["increase"] += 1
+            woken = self.dispatch()
+        for waiter in woken:
+            waiter.wake()
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counts,
+                        limit=round(self.limit, 2),
+                        in_flight=self.in_flight,
+                        queued=self.queued,
+                        latency=round(self.latency, 3) if self.latency is not None else None,
+                        locales=dict(self.locale_in_flight))
+
+admission_controller = AdmissionController()
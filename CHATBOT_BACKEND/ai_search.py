@@ -1,18 +1,29 @@
 import yaml
 import uuid
 from model import OpenAI
-from database import MySql, AzureStorage
+from database import AzureStorage, DOCUMENT_CACHE, DOCUMENT_CACHE_FRESHNESS
 import pytz
 from datetime import datetime, timedelta
+from tracing import traced
 import logging
 import re
 import json
-from tools import extract_data
+import time
+import asyncio
+import contextvars
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, wait
+from tools import extract_data, to_thread
 from credential import keyvault_values
 from log import setup_logger
+from request_context import request_timeout
+from master_data import get_master_data
+from model_codes import model_code_resolver
+from clients import client_registry
 from azure.search.documents.indexes import SearchIndexClient, SearchIndexerClient  
 from azure.core.credentials import AzureKeyCredential  
 from azure.search.documents import SearchClient, SearchIndexingBufferedSender
+from azure.search.documents.aio import SearchClient as AsyncSearchClient
 from azure.search.documents.models import VectorizedQuery,VectorFilterMode
 from azure.core.exceptions import ResourceNotFoundError
 from azure.search.documents.indexes.models import (  
@@ -35,6 +46,13 @@ from azure.search.documents.indexes.models import (
 
 logger = logging.getLogger(__name__)
 
+# 검색 결과 본문 일괄 조회 : 요청 당 최대 대기 시간 (초), 초과 시 빈 본문
+DOCUMENT_FETCH_DEADLINE = 3
+document_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="document-fetch")
+# 검색 유형별 본문 조회 건수 ( spec_search 는 첫 번째 결과만 반환 ) / 본문이 JSON 인 유형
+SEARCH_RESULT_LIMIT = {"spec" : 1}
+JSON_TEXT_TYPES = ("youtube", "manual")
+
 class AISearch(OpenAI):
     def __init__(self, type=None):
         super().__init__()
@@ -51,8 +69,57 @@ class AISearch(OpenAI):
             self.account_name = keyvault_values["aisearch-account-name"]
             self.as_account_str = keyvault_values["storage-doc-account-str"]
         
-        # iclient 초기화
-        self.index_client = SearchIndexClient(endpoint=self.service_endpoint, credential=AzureKeyCredential(self.account_key))
+        # iclient 초기화 ( endpoint / index 별 client 는 registry 에서 공유 )
+        self.index_client = client_registry.get("search-index", self.service_endpoint,
+                                                lambda: SearchIndexClient(endpoint=self.service_endpoint, credential=AzureKeyCredential(self.account_key)))
+
+    # 인덱스 변경 여부 확인 ( answer cache 무효화 ) : 문서 수 / 저장 용량
+    @traced("AISearch.index_version")
+    def index_version(self, index_name):
+        stats = self.index_client.get_index_statistics(index_name)
+        return (stats['document_count'], stats['storage_size'])
+
+    def get_search_client(self, index_name):
+        return client_registry.get("search", (self.service_endpoint, index_name),
+                                   lambda: SearchClient(endpoint=self.service_endpoint, index_name=index_name, credential=AzureKeyCredential(self.account_key)))
+
+    # 검색 결과 본문을 동시에 조회 ( jobs : [(main_text_path, parse_json) or None] )
+    @traced("AISearch.load_main_texts")
+    def load_main_texts(self, query, jobs, deadline=DOCUMENT_FETCH_DEADLINE):
+        logger = setup_logger()
+        logger.info("###### Function Name : load_main_texts")
+
+        as_instance = AzureStorage(container_name='documents', storage_type='docst', use_cache=True,
+                                   cache_freshness=DOCUMENT_CACHE_FRESHNESS, cache=DOCUMENT_CACHE)
+
+        def load_main_text(main_text_path, parse_json):
+            try :
+                if parse_json :
+                    return json.load(as_instance.read_file(main_text_path.split('documents/')[1]))['main_text']
+                return as_instance.read_file(main_text_path.split('documents/')[1])
+            except :
+                return ""
+
+        start_time = time.time()
+        deadline = request_timeout(deadline)
+        # worker thread 에서도 요청의 로그 버퍼를 사용하도록 context 복사
+        futures = [document_executor.submit(contextvars.copy_context().run, load_main_text, *job) if job is not None else None for job in jobs]
+        done, not_done = wait([future for future in futures if future is not None], timeout=deadline)
+        if not_done :
+            logger.error(f"########## document fetch timeout : {len(not_done)} / {len(done) + len(not_done)} ( {deadline}s )")
+
+        main_texts = []
+        for future in futures :
+            if future is None :
+                main_texts.append(None)
+            elif future in done :
+                main_texts.append(future.result())
+            else :
+                future.cancel()
+                main_texts.append("")
+
+        logger.info(f"###### document fetch time : {time.time() - start_time:.3f}s")
+        return main_texts
 
     def create_index(self, index_name) :
 
@@ -160,7 +227,7 @@ class AISearch(OpenAI):
         
         # documents는 fileds 형식과 같아야함 ( sample.json )
         try : 
-            search_client = SearchClient(endpoint=self.service_endpoint, index_name=index_name, credential=AzureKeyCredential(self.account_key))
+            search_client = self.get_search_client(index_name)
             #search_client.upload_documents(documents)
 
             #문서가 많을 경우 아래 코드로 배치 처리
@@ -178,14 +245,14 @@ class AISearch(OpenAI):
     def get_documents(self, index_name, mapping_key=None):
         logger.info("###### Function Name : get_documents")
         if mapping_key is None :
-            search_client = SearchClient(endpoint=self.service_endpoint, index_name=index_name, credential=AzureKeyCredential(self.account_key))
+            search_client = self.get_search_client(index_name)
             result = search_client.search(search_text="*")
             output = []
             for document in result:
                 output.append(document)
         
         else :
-            search_client = SearchClient(endpoint=self.service_endpoint, index_name=index_name, credential=AzureKeyCredential(self.account_key))
+            search_client = self.get_search_client(index_name)
             filter_query = f"mapping_key eq '{mapping_key}'"
 
             result = search_client.search(search_text="*",
@@ -201,7 +268,7 @@ class AISearch(OpenAI):
     
     def item_id_list(self, index_name, query, type, product_group_code_filter, product_code_filter):
         
-        search_client = SearchClient(endpoint=self.service_endpoint, index_name=index_name, credential=AzureKeyCredential(self.account_key))
+        search_client = self.get_search_client(index_name)
 
         filter_query = f"type eq '{type}' and iso_cd eq '{query['iso_cd']}' and language eq '{query['language']}' and \
                                     {product_group_code_filter} and \
@@ -217,7 +284,7 @@ class AISearch(OpenAI):
 
         
     def delete_document(self, index_name, key, key_value) :
-        search_client = SearchClient(endpoint=self.service_endpoint, index_name=index_name, credential=AzureKeyCredential(self.account_key))
+        search_client = self.get_search_client(index_name)
         result = search_client.delete_documents(documents=[{key: str(key_value)}])
         if result[0].succeeded :
             return print("문서 %s = %s 가 삭제 되었습니다." % (key,key_value))
@@ -225,169 +292,54 @@ class AISearch(OpenAI):
             return print("문서 %s = %s 를 찾을 수 없습니다." % (key,key_value))
         
     def update_document(self, index_name, document, key, key_value) :
-        search_client = SearchClient(endpoint=self.service_endpoint, index_name=index_name, credential=AzureKeyCredential(self.account_key))
+        search_client = self.get_search_client(index_name)
         result = search_client.merge_or_upload_documents(document)
         if result[0].succeeded :
             return print("문서 %s = %s 가 업데이트 되었습니다." % (key,key_value))
         else :
             return print("문서 %s = %s 를 찾을 수 없습니다." % (key,key_value))
     
-    def intent_search(self, filter_df, index_name, query, top_k):
-        logger = setup_logger(query['chatid'],query['chat_session_id'], query['rag_order'])
-        logger.info("###### Function Name : intent_search")
-        search_client = SearchClient(self.service_endpoint, index_name, credential=AzureKeyCredential(self.account_key))
-        vector_query = VectorizedQuery(vector=self.generate_embeddings_chat(query['trans_question']), k_nearest_neighbors=50, fields="main_text_vector")
-
+    # 제품군/제품 코드 filter ( 공통 )
+    def product_filter(self, filter_df):
         product_group_code_list = filter_df['PROD_GROUP_CD'].drop_duplicates().tolist()
         product_code_list = filter_df['PROD_CD'].drop_duplicates().tolist()
         product_group_code_filter_strings = " or ".join([f"product_group_code eq '{item}'" for item in product_group_code_list])
         product_group_code_filter = f"({product_group_code_filter_strings})"
         product_code_filter_strings = " or ".join([f"product_code eq '{item}'" for item in product_code_list])
         product_code_filter = f"({product_code_filter_strings})"
-            
-            
-        filter_query = f"iso_cd eq '{query['iso_cd']}' and language eq '{query['language']}' and {product_group_code_filter} and {product_code_filter}"
-        
-        logger.info("=" * 30 + " Intent Filtering " + "=" * 30)
-        logger.info(f"filter_query : {filter_query}")
-            
-            
-        results = search_client.search(search_text=query['trans_question'],
-                                        search_fields=['title'],
-                                        top=50,
-                                        vector_queries= [vector_query],
-                                        vector_filter_mode=VectorFilterMode.PRE_FILTER,
-                                        filter=filter_query
-                                        )
-        
-        korea_timezone = pytz.timezone('Asia/Seoul')
-        korea_time = datetime.now(korea_timezone)
-        current_time = korea_time.strftime('%Y-%m-%d %H:%M:%S')
-        as_instance = AzureStorage(container_name='documents', storage_type='docst')
-        preprocessed = []
-
-        sql_instacne = MySql()
-        intent_table = sql_instacne.get_table("""
-        SELECT * FROM tb_chat_intent_mst""")
-
-        for idx_result, result in enumerate(results):
-
-            if idx_result >= 3:
-                break
-        # for result in results :
+        return f"{product_group_code_filter} and {product_code_filter}"
 
-            if result["type"] == "general-inquiry" :
-                
-                mapping_key = '_'.join(result['mapping_key'].split('_')[5:])
-                match_intent = [item for item in intent_table if item['INTENT_CODE'] == mapping_key and item['LOCALE_CD'] == query['locale_cd']]
-                
-                EVENT_CODE = match_intent[0]['EVENT_CD']
-                INTENT_CODE = match_intent[0]['INTENT_CODE']
-                related_link_url = match_intent[0]['RELATED_LINK_URL']
-                answer = match_intent[0]['CHATBOT_RESPONSE']
-                related_link_name = match_intent[0]['RELATED_LINK_NAME']
-                
-                data = {"timestamp" : current_time,
-                        "id": result['id'],
-                        "type": result['type'],
-                        "iso_cd": result['iso_cd'],
-                        "language": result['language'],
-                        "product_group_code": result['product_group_code'],
-                        "product_code": result['product_code'],
-                        "product_model_code": result['product_model_code'],
-                        "data_id" :  result['data_id'],
-                        "mapping_key": result['mapping_key'],
-                        "chunk_num" : result['chunk_num'],
-                        "file_name": EVENT_CODE,
-                        "pages" : INTENT_CODE,
-                        "url": related_link_url if related_link_url != None else "",
-                        "title": related_link_name,
-                        "main_text_path" : result['main_text_path'],
-                        "main_text": answer,
-                        "question": query['question'],
-                        "score": result['@search.score']}
+    @traced("AISearch.spec_data_id_filter")
+    def spec_data_id_filter(self, query):
+        logger = setup_logger()
 
-                logger.info(f"###### search_result : {json.dumps(data,indent=4,ensure_ascii=False)}")
-                if data["score"] >= 0.03 :
-                    preprocessed.append(data)
-                    break
+        corp_cd = query['corp_cd'].upper()
+        local_cd = query['locale_cd'].upper()
+        
+        if len(query['product_model_code']) == 0:
+            data_id_filter = f"data_id eq '{str(uuid.uuid4())}'"
 
-            elif result["type"] == "contents" :
-                
-                try : 
-                    text_data = as_instance.read_file(result['main_text_path'].split('documents/')[1])
-
-                except :
-                    text_data = ""
-
-                data = {"timestamp" : current_time,
-                        "id": result['id'],
-                        "type": result['type'],
-                        "iso_cd": result['iso_cd'],
-                        "language": result['language'],
-                        "product_group_code": result['product_group_code'],
-                        "product_code": result['product_code'],
-                        "product_model_code": result['product_model_code'],
-                        "data_id" :  result['data_id'],
-                        "mapping_key": result['mapping_key'],
-                        "chunk_num" : result['chunk_num'],
-                        "file_name": result['file_name'],
-                        "pages" : result['pages'],
-                        "url": result['url'],
-                        "title": result['title'],
-                        "main_text_path" : result['main_text_path'],
-                        "main_text": text_data,
-                        "question": query['question'],
-                        "score": result['@search.score']}
-                logger.info(f"###### search_result : {json.dumps(data,indent=4,ensure_ascii=False)}")
-                preprocessed.append(data)
+        else :
+            # SALES_CD 부분 일치 ( 기존 LIKE '%code%' ) -> MATCHED_MODEL_CD
+            product_model_code_list = query['product_model_code'].split(',')
+            prod_model_cd_list = model_code_resolver.matched_model_codes(corp_cd, local_cd, product_model_code_list)
+            logger.info(prod_model_cd_list)
 
-            else :
-                try :
-                    text_data = json.load(as_instance.read_file(result['main_text_path'].split('documents/')[1]))
-                    text_data = text_data['main_text']
-            
-                except :
-                    text_data = ""
-
-                data = {"timestamp" : current_time,
-                        "id": result['id'],
-                        "type": result['type'],
-                        "iso_cd": result['iso_cd'],
-                        "language": result['language'],
-                        "product_group_code": result['product_group_code'],
-                        "product_code": result['product_code'],
-                        "product_model_code": result['product_model_code'],
-                        "data_id" :  result['data_id'],
-                        "mapping_key": result['mapping_key'],
-                        "chunk_num" : result['chunk_num'],
-                        "file_name": result['file_name'],
-                        "pages" : result['pages'],
-                        "url": result['url'],
-                        "title": result['title'],
-                        "main_text_path" : result['main_text_path'],
-                        "main_text": text_data,
-                        "question": query['question'],
-                        "score": result['@search.score']}
-                logger.info(f"###### search_result : {json.dumps(data,indent=4,ensure_ascii=False)}")
-                preprocessed.append(data)
-       
-        return preprocessed
-    
-    def spec_search(self, filter_df, index_name, query, top_k):
+            if len(prod_model_cd_list) == 0 :
+                data_id_filter = f"data_id eq '{str(uuid.uuid4())}'"
+            else:
+                data_id_list = prod_model_cd_list[:30]
 
-        logger = setup_logger(query['chatid'],query['chat_session_id'], query['rag_order'])
-        logger.info("###### Function Name : spec_search")
-        search_client = SearchClient(self.service_endpoint, index_name, credential=AzureKeyCredential(self.account_key))
+                data_id_filter_strings = ','.join(data_id_list)
+                data_id_filter = f"search.in(data_id, '{data_id_filter_strings}', ',')"
 
-        type = "spec"
+        logger.info(query)
+        logger.info(data_id_filter)
+        return data_id_filter
 
-        product_group_code_list = filter_df['PROD_GROUP_CD'].drop_duplicates().tolist()
-        product_code_list = filter_df['PROD_CD'].drop_duplicates().tolist()
-        product_group_code_filter_strings = " or ".join([f"product_group_code eq '{item}'" for item in product_group_code_list])
-        product_group_code_filter = f"({product_group_code_filter_strings})"
-        product_code_filter_strings = " or ".join([f"product_code eq '{item}'" for item in product_code_list])
-        product_code_filter = f"({product_code_filter_strings})"
+    @traced("AISearch.manual_data_id_filter")
+    def manual_data_id_filter(self, query):
+        logger = setup_logger()
 
         corp_cd = query['corp_cd'].upper()
         local_cd = query['locale_cd'].upper()
@@ -397,443 +349,249 @@ class AISearch(OpenAI):
             data_id_filter = f"data_id eq '{str(uuid.uuid4())}'"
 
         else :
+            # SALES_CD 부분 일치 -> PROD_MODEL_CD -> tb_if_manual_list ITEM_ID
             product_model_code_list = query['product_model_code'].split(',')
-            
-            
-            if len(product_model_code_list) > 1 :
-
-                SALES_CODES = product_model_code_list 
-                patterns = [f'%{code.strip()}%' for code in SALES_CODES]
-                parameters = [corp_cd, local_cd] + patterns
-
-                sql_instance = MySql()
-                sql_query = f"""
-                SELECT DISTINCT MATCHED_MODEL_CD
-                FROM tb_sales_prod_map
-                WHERE CORP_CD = %s AND LOCALE_CD = %s AND ({' OR '.join([f'SALES_CD LIKE %s' for _ in patterns])})
-                """
-                sales_code_mst = sql_instance.get_table(query=sql_query, parameters=parameters)
-
-            else :
-                SALES_CODE = query['product_model_code']
-                pattern = f'%{SALES_CODE}%'
-                parameters = (corp_cd, local_cd, pattern)
-                sql_instance = MySql()
-                sales_code_mst = sql_instance.get_table(query ="""
-                                                        SELECT DISTINCT MATCHED_MODEL_CD
-                                                        FROM tb_sales_prod_map
-                                                        WHERE CORP_CD = %s AND LOCALE_CD = %s AND SALES_CD LIKE %s
-                                                        """, parameters=parameters)
-                logger.info(sales_code_mst)
-
-            prod_model_cd_list = [item['MATCHED_MODEL_CD'] for item in sales_code_mst if item['MATCHED_MODEL_CD'] != 'NOT_MATCHED']
-            prod_model_cd_list = list(set(prod_model_cd_list))
+            prod_model_cd_list = model_code_resolver.prod_model_codes(corp_cd, local_cd, product_model_code_list)
 
             if len(prod_model_cd_list) == 0 :
                 data_id_filter = f"data_id eq '{str(uuid.uuid4())}'"
             else:
-                data_id_list_mst = prod_model_cd_list
-
-                data_id_list = data_id_list_mst[:30]
-
-                data_id_filter_strings = ','.join(data_id_list)
-                data_id_filter = f"search.in(data_id, '{data_id_filter_strings}', ',')"
+                data_id_list_mst = model_code_resolver.manual_item_ids(corp_cd, lang, prod_model_cd_list)
+                if len(data_id_list_mst) == 0:
+                    data_id_filter = f"data_id eq '{str(uuid.uuid4())}'"
+                else :
+                    data_id_list = data_id_list_mst[:30]
 
-        logger.info(query)
-        logger.info(data_id_filter)
-        filter_query = f"type eq '{type}' and type ne 'general-inquiry' and iso_cd eq '{query['iso_cd']}' and language eq '{query['language']}' and {product_group_code_filter} and {product_code_filter} and {data_id_filter}"
+                    data_id_filter_strings = ','.join(data_id_list)
+                    data_id_filter = f"search.in(data_id, '{data_id_filter_strings}', ',')"
         
-        logger.info("=" * 30 + " Spec Filtering " + "=" * 30)
+        logger.info(data_id_filter)
+        logger.info(query)
+        return data_id_filter
+
+    # 검색 유형별 filter query ( spec / manual 은 모델 코드 resolver 조회 포함, 처음 사용하는 locale 은 MySQL 적재 )
+    def typed_filter_query(self, search_type, filter_df, query):
+        logger = setup_logger()
+        product_filter = self.product_filter(filter_df)
+
+        if search_type == "intent":
+            filter_query = f"iso_cd eq '{query['iso_cd']}' and language eq '{query['language']}' and {product_filter}"
+        elif search_type == "contents":
+            filter_query = f"(type eq '{search_type}' or type eq 'microsites') and type ne 'general-inquiry' and iso_cd eq '{query['iso_cd']}' and language eq '{query['language']}' and {product_filter}"
+        elif search_type == "youtube":
+            filter_query = f"type eq '{search_type}' and type ne 'general-inquiry' and iso_cd eq '{query['iso_cd']}' and language eq '{query['language']}' and {product_filter}"
+        else:
+            data_id_filter = self.spec_data_id_filter(query) if search_type == "spec" else self.manual_data_id_filter(query)
+            filter_query = f"type eq '{search_type}' and type ne 'general-inquiry' and iso_cd eq '{query['iso_cd']}' and language eq '{query['language']}' and {product_filter} and {data_id_filter}"
+
+        logger.info("=" * 30 + f" {search_type.capitalize()} Filtering " + "=" * 30)
         logger.info(f"filter_query : {filter_query}")
+        return filter_query
 
-        if 'retrieve_error_code:' in query['refined_query'] :
-            
-            vector_query = VectorizedQuery(vector=self.generate_embeddings_chat(query['refined_query']), k_nearest_neighbors=50, fields="main_text_vector")
-            search_text = extract_data(query['refined_query'],start="etrieve_error_code:")[0].strip()
-
-            logger.info(f"############# ERROR_CODE : {search_text}")
+    def typed_search_kwargs(self, search_type, query, filter_query, top_k, vector):
+        logger = setup_logger()
 
-            results = search_client.search(search_text=search_text,
+        if search_type == "intent":
+            return dict(search_text=query['trans_question'],
                         search_fields=['title'],
                         top=50,
-                        vector_queries= [vector_query],
+                        vector_queries= [VectorizedQuery(vector=vector, k_nearest_neighbors=50, fields="main_text_vector")],
                         vector_filter_mode=VectorFilterMode.PRE_FILTER,
-                        filter=filter_query
-                        )
-        else :
-            vector_query = VectorizedQuery(vector=self.generate_embeddings_chat(query['refined_query']), k_nearest_neighbors=top_k, fields="main_text_vector")
-            results = search_client.search(search_text=None,
-                                            vector_queries= [vector_query],
-                                            vector_filter_mode=VectorFilterMode.PRE_FILTER,
-                                            filter=filter_query
-                                            )
-
-        korea_timezone = pytz.timezone('Asia/Seoul')
-        korea_time = datetime.now(korea_timezone)
-        current_time = korea_time.strftime('%Y-%m-%d %H:%M:%S')
-
-        as_instance = AzureStorage(container_name='documents', storage_type='docst')
-        preprocessed = []
-
-        for i, result in enumerate(results) :
-
-            if i ==3 :
-                break     
-
-            try : 
-                text_data = as_instance.read_file(result['main_text_path'].split('documents/')[1])
-
-            except :
-                text_data = ""
-
-            data = {"timestamp" : current_time,
-                    "id": result['id'],
-                    "type": result['type'],
-                    "iso_cd": result['iso_cd'],
-                    "language": result['language'],
-                    "product_group_code": result['product_group_code'],
-                    "product_code": result['product_code'],
-                    "product_model_code": result['product_model_code'],
-                    "data_id" :  result['data_id'],
-                    "mapping_key": result['mapping_key'],
-                    "chunk_num" : result['chunk_num'],
-                    "file_name": result['file_name'],
-                    "pages" : result['pages'],
-                    "url": result['url'],
-                    "title": result['title'],
-                    "main_text_path" : result['main_text_path'],
-                    "main_text": text_data,
-                    "question": query['question'],
-                    "score": result['@search.score']}
-
-            preprocessed.append(data)
-
-            return preprocessed
-    
-    def contents_search(self, filter_df, index_name, query, top_k):
-        logger = setup_logger(query['chatid'],query['chat_session_id'], query['rag_order'])
-        logger.info("###### Function Name : contents_search")
-        search_client = SearchClient(self.service_endpoint, index_name, credential=AzureKeyCredential(self.account_key))
-
-        type = "contents"
-
-        product_group_code_list = filter_df['PROD_GROUP_CD'].drop_duplicates().tolist()
-        product_code_list = filter_df['PROD_CD'].drop_duplicates().tolist()
-        product_group_code_filter_strings = " or ".join([f"product_group_code eq '{item}'" for item in product_group_code_list])
-        product_group_code_filter = f"({product_group_code_filter_strings})"
-        product_code_filter_strings = " or ".join([f"product_code eq '{item}'" for item in product_code_list])
-        product_code_filter = f"({product_code_filter_strings})"
-            
-            
-        filter_query = f"(type eq '{type}' or type eq 'microsites') and type ne 'general-inquiry' and iso_cd eq '{query['iso_cd']}' and language eq '{query['language']}' and {product_group_code_filter} and {product_code_filter}"
-        
-        logger.info("=" * 30 + " Contents Filtering " + "=" * 30)
-        logger.info(f"filter_query : {filter_query}")
+                        filter=filter_query)
 
         if 'retrieve_error_code:' in query['refined_query'] :
-            
-            vector_query = VectorizedQuery(vector=self.generate_embeddings_chat(query['refined_query']), k_nearest_neighbors=50, fields="main_text_vector")
             search_text = extract_data(query['refined_query'],start="etrieve_error_code:")[0].strip()
 
             logger.info(f"############# ERROR_CODE : {search_text}")
 
-            results = search_client.search(search_text=search_text,
+            return dict(search_text=search_text,
                         search_fields=['title'],
                         top=50,
-                        vector_queries= [vector_query],
+                        vector_queries= [VectorizedQuery(vector=vector, k_nearest_neighbors=50, fields="main_text_vector")],
                         vector_filter_mode=VectorFilterMode.PRE_FILTER,
-                        filter=filter_query
-                        )
-        else :
-            vector_query = VectorizedQuery(vector=self.generate_embeddings_chat(query['refined_query']), k_nearest_neighbors=top_k, fields="main_text_vector")
-            results = search_client.search(search_text=None,
-                                            vector_queries= [vector_query],
-                                            vector_filter_mode=VectorFilterMode.PRE_FILTER,
-                                            filter=filter_query
-                                            )
-        
+                        filter=filter_query)
+
+        return dict(search_text=None,
+                    vector_queries= [VectorizedQuery(vector=vector, k_nearest_neighbors=top_k, fields="main_text_vector")],
+                    vector_filter_mode=VectorFilterMode.PRE_FILTER,
+                    filter=filter_query)
+
+    # 본문 조회 대상 ( None : 조회하지 않음, (main_text_path, parse_json) )
+    def main_text_jobs(self, search_type, results):
+        if search_type == "intent":
+            return [None if result["type"] == "general-inquiry" else (result['main_text_path'], result["type"] != "contents") for result in results]
+        return [(result['main_text_path'], search_type in JSON_TEXT_TYPES) for result in results]
+
+    def make_search_data(self, query, result, text_data, current_time):
+        return {"timestamp" : current_time,
+                "id": result['id'],
+                "type": result['type'],
+                "iso_cd": result['iso_cd'],
+                "language": result['language'],
+                "product_group_code": result['product_group_code'],
+                "product_code": result['product_code'],
+                "product_model_code": result['product_model_code'],
+                "data_id" :  result['data_id'],
+                "mapping_key": result['mapping_key'],
+                "chunk_num" : result['chunk_num'],
+                "file_name": result['file_name'],
+                "pages" : result['pages'],
+                "url": result['url'],
+                "title": result['title'],
+                "main_text_path" : result['main_text_path'],
+                "main_text": text_data,
+                "question": query['question'],
+                "score": result['@search.score']}
+
+    def intent_results(self, query, results, main_texts):
+        logger = setup_logger()
         korea_timezone = pytz.timezone('Asia/Seoul')
         korea_time = datetime.now(korea_timezone)
         current_time = korea_time.strftime('%Y-%m-%d %H:%M:%S')
-        
-        as_instance = AzureStorage(container_name='documents', storage_type='docst')
         preprocessed = []
 
-        for i, result in enumerate(results) :
-            
-            if i ==3 :
-                break
-
-            try : 
-                text_data = as_instance.read_file(result['main_text_path'].split('documents/')[1])
+        master_data = get_master_data()
 
-            except :
-                text_data = ""
-
-            data = {"timestamp" : current_time,
-                    "id": result['id'],
-                    "type": result['type'],
-                    "iso_cd": result['iso_cd'],
-                    "language": result['language'],
-                    "product_group_code": result['product_group_code'],
-                    "product_code": result['product_code'],
-                    "product_model_code": result['product_model_code'],
-                    "data_id" :  result['data_id'],
-                    "mapping_key": result['mapping_key'],
-                    "chunk_num" : result['chunk_num'],
-                    "file_name": result['file_name'],
-                    "pages" : result['pages'],
-                    "url": result['url'],
-                    "title": result['title'],
-                    "main_text_path" : result['main_text_path'],
-                    "main_text": text_data,
-                    "question": query['question'],
-                    "score": result['@search.score']}
-            
-            preprocessed.append(data)
-
-        return preprocessed
-    
-    def youtube_search(self, filter_df, index_name, query, top_k):
-        logger = setup_logger(query['chatid'],query['chat_session_id'], query['rag_order'])
-        logger.info("###### Function Name : youtube_search")
-        search_client = SearchClient(self.service_endpoint, index_name, credential=AzureKeyCredential(self.account_key))
+        for idx_result, result in enumerate(results):
 
-        type = "youtube"
+            if idx_result >= 3:
+                break
+        # for result in results :
 
-        product_group_code_list = filter_df['PROD_GROUP_CD'].drop_duplicates().tolist()
-        product_code_list = filter_df['PROD_CD'].drop_duplicates().tolist()
-        product_group_code_filter_strings = " or ".join([f"product_group_code eq '{item}'" for item in product_group_code_list])
-        product_group_code_filter = f"({product_group_code_filter_strings})"
-        product_code_filter_strings = " or ".join([f"product_code eq '{item}'" for item in product_code_list])
-        product_code_filter = f"({product_code_filter_strings})"
-            
-        filter_query = f"type eq '{type}' and type ne 'general-inquiry' and iso_cd eq '{query['iso_cd']}' and language eq '{query['language']}' and {product_group_code_filter} and {product_code_filter}"
-        
-        logger.info("=" * 30 + " Youtube Filtering " + "=" * 30)
-        logger.info(f"filter_query : {filter_query}")
+            if result["type"] == "general-inquiry" :
+                
+                mapping_key = '_'.join(result['mapping_key'].split('_')[5:])
+                match_intent = master_data.get_intent(mapping_key, query['locale_cd'])
+                
+                EVENT_CODE = match_intent['EVENT_CD']
+                INTENT_CODE = match_intent['INTENT_CODE']
+                related_link_url = match_intent['RELATED_LINK_URL']
+                answer = match_intent['CHATBOT_RESPONSE']
+                related_link_name = match_intent['RELATED_LINK_NAME']
+                
+                data = self.make_search_data(query, result, answer, current_time)
+                data.update({"file_name": EVENT_CODE,
+                             "pages" : INTENT_CODE,
+                             "url": related_link_url if related_link_url != None else "",
+                             "title": related_link_name})
 
-        if 'retrieve_error_code:' in query['refined_query'] :
-            
-            vector_query = VectorizedQuery(vector=self.generate_embeddings_chat(query['refined_query']), k_nearest_neighbors=50, fields="main_text_vector")
-            search_text = extract_data(query['refined_query'],start="etrieve_error_code:")[0].strip()
+                logger.info(f"###### search_result : {json.dumps(data,indent=4,ensure_ascii=False)}")
+                if data["score"] >= 0.03 :
+                    preprocessed.append(data)
+                    break
 
-            logger.info(f"############# ERROR_CODE : {search_text}")
+            else :
+                data = self.make_search_data(query, result, main_texts[idx_result], current_time)
+                logger.info(f"###### search_result : {json.dumps(data,indent=4,ensure_ascii=False)}")
+                preprocessed.append(data)
+       
+        return preprocessed
 
-            results = search_client.search(search_text=search_text,
-                        search_fields=['title'],
-                        top=50,
-                        vector_queries= [vector_query],
-                        vector_filter_mode=VectorFilterMode.PRE_FILTER,
-                        filter=filter_query
-                        )
-        else :
-            vector_query = VectorizedQuery(vector=self.generate_embeddings_chat(query['refined_query']), k_nearest_neighbors=top_k, fields="main_text_vector")
-            results = search_client.search(search_text=None,
-                                            vector_queries= [vector_query],
-                                            vector_filter_mode=VectorFilterMode.PRE_FILTER,
-                                            filter=filter_query
-                                            )
+    def typed_results(self, search_type, query, results, main_texts):
+        if search_type == "intent":
+            return self.intent_results(query, results, main_texts)
 
         korea_timezone = pytz.timezone('Asia/Seoul')
         korea_time = datetime.now(korea_timezone)
         current_time = korea_time.strftime('%Y-%m-%d %H:%M:%S')
-        
-        as_instance = AzureStorage(container_name='documents', storage_type='docst')
-        preprocessed = []
-
-        for i, result in enumerate(results) :
 
-            if i ==3 :
-                break   
-            
-            try :
-                text_data = json.load(as_instance.read_file(result['main_text_path'].split('documents/')[1]))
-                text_data = text_data['main_text']
-            
-            except :
-                text_data = ""
-
-            data = {"timestamp" : current_time,
-                    "id": result['id'],
-                    "type": result['type'],
-                    "iso_cd": result['iso_cd'],
-                    "language": result['language'],
-                    "product_group_code": result['product_group_code'],
-                    "product_code": result['product_code'],
-                    "product_model_code": result['product_model_code'],
-                    "data_id" :  result['data_id'],
-                    "mapping_key": result['mapping_key'],
-                    "chunk_num" : result['chunk_num'],
-                    "file_name": result['file_name'],
-                    "pages" : result['pages'],
-                    "url": result['url'],
-                    "title": result['title'],
-                    "main_text_path" : result['main_text_path'],
-                    "main_text": text_data,
-                    "question": query['question'],
-                    "score": result['@search.score']}
-            
-            preprocessed.append(data)
+        preprocessed = [self.make_search_data(query, result, main_texts[i], current_time) for i, result in enumerate(results)]
 
+        # spec_search 는 첫 번째 결과만 반환, 결과가 없으면 None ( 기존 동작 유지 )
+        if search_type == "spec" and len(preprocessed) == 0:
+            return None
         return preprocessed
-    
-    def manual_search(self, filter_df, index_name, query, top_k):
-        logger = setup_logger(query['chatid'],query['chat_session_id'], query['rag_order'])
-        logger.info("###### Function Name : manual_search")
-        search_client = SearchClient(self.service_endpoint, index_name, credential=AzureKeyCredential(self.account_key))
 
-        type = "manual"
+    @traced("AISearch.typed_search")
+    def typed_search(self, search_type, filter_df, index_name, query, top_k):
+        logger = setup_logger()
+        logger.info(f"###### Function Name : {search_type}_search")
+        search_client = self.get_search_client(index_name)
 
-        product_group_code_list = filter_df['PROD_GROUP_CD'].drop_duplicates().tolist()
-        product_code_list = filter_df['PROD_CD'].drop_duplicates().tolist()
-        product_group_code_filter_strings = " or ".join([f"product_group_code eq '{item}'" for item in product_group_code_list])
-        product_group_code_filter = f"({product_group_code_filter_strings})"
-        product_code_filter_strings = " or ".join([f"product_code eq '{item}'" for item in product_code_list])
-        product_code_filter = f"({product_code_filter_strings})"
-        
-        corp_cd = query['corp_cd'].upper()
-        local_cd = query['locale_cd'].upper()
-        lang = query['language']
-        type = "manual"
-        
-        if len(query['product_model_code']) == 0:
-            data_id_filter = f"data_id eq '{str(uuid.uuid4())}'"
+        filter_query = self.typed_filter_query(search_type, filter_df, query)
+        vector = self.generate_embeddings_chat(query['trans_question'] if search_type == "intent" else query['refined_query'])
+        results = search_client.search(**self.typed_search_kwargs(search_type, query, filter_query, top_k, vector))
 
-        else :
-            product_model_code_list = query['product_model_code'].split(',')
-            
-            if len(product_model_code_list) > 1 :
+        results = list(islice(results, SEARCH_RESULT_LIMIT.get(search_type, 3)))
+        main_texts = self.load_main_texts(query, self.main_text_jobs(search_type, results))
+        return self.typed_results(search_type, query, results, main_texts)
 
-                SALES_CODES = product_model_code_list 
-                patterns = [f'%{code.strip()}%' for code in SALES_CODES]
-                parameters = [corp_cd, local_cd] + patterns
-
-                sql_instance = MySql()
-                sql_query = f"""
-                SELECT DISTINCT PROD_MODEL_CD, SUFFIX_CD, MDMS_PROD_CD
-                FROM tb_sales_prod_map
-                WHERE CORP_CD = %s AND LOCALE_CD = %s AND ({' OR '.join([f'SALES_CD LIKE %s' for _ in patterns])})
-                """
-                sales_code_mst = sql_instance.get_table(query=sql_query, parameters=parameters)
-
-            else :
-                SALES_CODE = query['product_model_code']
-                pattern = f'%{SALES_CODE}%'
-                parameters = (corp_cd, local_cd, pattern)
-                sql_instance = MySql()
-                sales_code_mst = sql_instance.get_table(query ="""
-                                                        SELECT DISTINCT PROD_MODEL_CD, SUFFIX_CD, MDMS_PROD_CD
-                                                        FROM tb_sales_prod_map
-                                                        WHERE CORP_CD = %s AND LOCALE_CD = %s AND SALES_CD LIKE %s
-                                                        """, parameters=parameters)
-            
-            prod_model_cd_list = [item['PROD_MODEL_CD'] for item in sales_code_mst]
-
-            if len(prod_model_cd_list) == 0 :
-                data_id_filter = f"data_id eq '{str(uuid.uuid4())}'"
-            else:
-                #item_id_mst_2 = [[f"{item['PROD_MODEL_CD']}.{item['SUFFIX_CD']}",item['MDMS_PROD_CD'],item['ITEM_ID']] for item in product_model_code_mst]
-                #data_id_list = [item[2] for item in item_id_mst_2]
-                # item id를 이용해서 filtering
-                #data_id_list_index = self.item_id_list(index_name, query, type, product_group_code_filter, product_code_filter)
-
-                sql_instance = MySql()
-                format_strings = ','.join(['%s'] * len(prod_model_cd_list))
-                parameters = (corp_cd, lang) + tuple(prod_model_cd_list)
-
-                product_model_code_mst = sql_instance.get_table(query=f"""
-                                                                        SELECT DISTINCT ITEM_ID
-                                                                        FROM tb_if_manual_list
-                                                                        WHERE CORP_CD = %s AND LANGUAGE_LIST = %s AND PROD_MODEL_CD IN ({format_strings})
-                                                                    """, parameters=parameters)
-                if len(product_model_code_mst) == 0:
-                    data_id_filter = f"data_id eq '{str(uuid.uuid4())}'"
-                else :
-                    data_id_list_mst = [item['ITEM_ID'] for item in product_model_code_mst]
-                    
-                    # set_data_id_list_index = set(data_id_list_index)
-                    # set_data_id_list_mst = set(data_id_list_mst)
-
-                    # intersection = set_data_id_list_index.intersection(set_data_id_list_mst)
-                    # data_id_list = list(intersection)
+    def intent_search(self, filter_df, index_name, query, top_k):
+        return self.typed_search("intent", filter_df, index_name, query, top_k)
 
-                    data_id_list = data_id_list_mst[:30]
-                    
-                    # data_id_filter_strings = " or ".join([f"data_id eq '{item}'" for item in data_id_list])
-                    # data_id_filter = f"({data_id_filter_strings})"
+    def spec_search(self, filter_df, index_name, query, top_k):
+        return self.typed_search("spec", filter_df, index_name, query, top_k)
 
-                    data_id_filter_strings = ','.join(data_id_list)
-                    data_id_filter = f"search.in(data_id, '{data_id_filter_strings}', ',')"
-        
-        logger.info(data_id_filter)
-        logger.info(query)
-        filter_query = f"type eq '{type}' and type ne 'general-inquiry' and iso_cd eq '{query['iso_cd']}' and language eq '{query['language']}' and {product_group_code_filter} and {product_code_filter} and {data_id_filter}"
-        
-        logger.info("=" * 30 + " Manual Filtering " + "=" * 30)
-        logger.info(f"filter_query : {filter_query}")
+    def contents_search(self, filter_df, index_name, query, top_k):
+        return self.typed_search("contents", filter_df, index_name, query, top_k)
 
-        if 'retrieve_error_code:' in query['refined_query'] :
-            
-            vector_query = VectorizedQuery(vector=self.generate_embeddings_chat(query['refined_query']), k_nearest_neighbors=50, fields="main_text_vector")
-            search_text = extract_data(query['refined_query'],start="etrieve_error_code:")[0].strip()
+    def youtube_search(self, filter_df, index_name, query, top_k):
+        return self.typed_search("youtube", filter_df, index_name, query, top_k)
 
-            logger.info(f"############# ERROR_CODE : {search_text}")
+    def manual_search(self, filter_df, index_name, query, top_k):
+        return self.typed_search("manual", filter_df, index_name, query, top_k)
 
-            results = search_client.search(search_text=search_text,
-                        search_fields=['title'],
-                        top=50,
-                        vector_queries= [vector_query],
-                        vector_filter_mode=VectorFilterMode.PRE_FILTER,
-                        filter=filter_query
-                        )
-        else :
-            vector_query = VectorizedQuery(vector=self.generate_embeddings_chat(query['refined_query']), k_nearest_neighbors=top_k, fields="main_text_vector")
-            results = search_client.search(search_text=None,
-                                            vector_queries= [vector_query],
-                                            vector_filter_mode=VectorFilterMode.PRE_FILTER,
-                                            filter=filter_query
-                                            )
+    # async 검색 ( chat_async ) : aio SearchClient / Blob 사용, 모델 코드 조회 ( MySQL 적재 가능 ) 는 executor 에서 실행
+    def get_async_search_client(self, index_name):
+        return client_registry.get("search-aio", (self.service_endpoint, index_name, id(asyncio.get_running_loop())),
+                                   lambda: AsyncSearchClient(endpoint=self.service_endpoint, index_name=index_name, credential=AzureKeyCredential(self.account_key)))
 
-        korea_timezone = pytz.timezone('Asia/Seoul')
-        korea_time = datetime.now(korea_timezone)
-        current_time = korea_time.strftime('%Y-%m-%d %H:%M:%S')
-        
-        as_instance = AzureStorage(container_name='documents', storage_type='docst')
-        preprocessed = []
+    @traced("AISearch.aload_main_texts")
+    async def aload_main_texts(self, query, jobs, deadline=DOCUMENT_FETCH_DEADLINE):
+        logger = setup_logger()
+        logger.info("###### Function Name : aload_main_texts")
 
-        for i, result in enumerate(results) :
+        as_instance = AzureStorage(container_name='documents', storage_type='docst', use_cache=True,
+                                   cache_freshness=DOCUMENT_CACHE_FRESHNESS, cache=DOCUMENT_CACHE)
 
-            if i ==3 :
-                break   
-            
+        async def load_main_text(main_text_path, parse_json):
             try :
-                text_data = json.load(as_instance.read_file(result['main_text_path'].split('documents/')[1]))
-                text_data = text_data['main_text']
+                if parse_json :
+                    return json.load(await as_instance.aread_file(main_text_path.split('documents/')[1]))['main_text']
+                return await as_instance.aread_file(main_text_path.split('documents/')[1])
             except :
-                text_data = ""
-
-            data = {"timestamp" : current_time,
-                    "id": result['id'],
-                    "type": result['type'],
-                    "iso_cd": result['iso_cd'],
-                    "language": result['language'],
-                    "product_group_code": result['product_group_code'],
-                    "product_code": result['product_code'],
-                    "product_model_code": result['product_model_code'],
-                    "data_id" :  result['data_id'],
-                    "mapping_key": result['mapping_key'],
-                    "chunk_num" : result['chunk_num'],
-                    "file_name": result['file_name'],
-                    "pages" : result['pages'],
-                    "url": result['url'],
-                    "title": result['title'],
-                    "main_text_path" : result['main_text_path'],
-                    "main_text": text_data,
-                    "question": query['question'],
-                    "score": result['@search.score']}
-            
-            preprocessed.append(data)
+                return ""
+
+        tasks = [asyncio.ensure_future(load_main_text(*job)) if job is not None else None for job in jobs]
+        pending_tasks = [task for task in tasks if task is not None]
+        if not pending_tasks :
+            return [None for _ in jobs]
+
+        deadline = request_timeout(deadline)
+        done, not_done = await asyncio.wait(pending_tasks, timeout=deadline)
+        if not_done :
+            logger.error(f"########## document fetch timeout : {len(not_done)} / {len(pending_tasks)} ( {deadline}s )")
+
+        main_texts = []
+        for task in tasks :
+            if task is None :
+                main_texts.append(None)
+            elif task in done :
+                main_texts.append(task.result())
+            else :
+                task.cancel()
+                main_texts.append("")
+        return main_texts
+
+    @traced("AISearch.atyped_search")
+    async def atyped_search(self, search_type, filter_df, index_name, query, top_k, vector=None):
+        logger = setup_logger()
+        logger.info(f"###### Function Name : a{search_type}_search")
+        search_client = self.get_async_search_client(index_name)
+
+        if search_type in ("spec", "manual"):
+            filter_query = await to_thread(self.typed_filter_query, search_type, filter_df, query)
+        else:
+            filter_query = self.typed_filter_query(search_type, filter_df, query)
+        if vector is None:
+            vector = await self.agenerate_embeddings_chat(query['trans_question'] if search_type == "intent" else query['refined_query'])
+
+        limit = SEARCH_RESULT_LIMIT.get(search_type, 3)
+        results = []
+        async for result in await search_client.search(**self.typed_search_kwargs(search_type, query, filter_query, top_k, vector)):
+            results.append(result)
+            if len(results) >= limit:
+                break
 
-        return preprocessed
-        
\ No newline at end of file
+        main_texts = await self.aload_main_texts(query, self.main_text_jobs(search_type, results))
+        return self.typed_results(search_type, query, results, main_texts)
@@ -0,0 +1,162 @@
+import copy
+import time
+import threading
+import numpy as np
+import logging
+logger = logging.getLogger(__name__)
+
+# 대화 이력이 없는 질문의 답변 재사용 ( key : (index_name, product_group_code, product_code, model_code) + refined query embedding )
+ANSWER_CACHE_ENABLED = True
+# refined query embedding cosine 유사도 기준
+ANSWER_CACHE_THRESHOLD = 0.97
+ANSWER_CACHE_TTL = 86400
+# key 당 최대 답변 수 ( 초과 시 오래된 답변부터 제거 )
+ANSWER_CACHE_BUCKET_SIZE = 256
+# 전체 최대 답변 수 ( key 에 LLM 추출 model code 가 포함되어 key 수 제한 없음, 초과 시 전체에서 오래된 답변부터 제거 )
+ANSWER_CACHE_MAX_ENTRIES = 20000
+# 만료 답변 / 빈 key 정리 주기 (초)
+ANSWER_CACHE_SWEEP_INTERVAL = 300
+# 인덱스 변경 ( 전처리 / 인덱서 실행 ) 확인 주기 (초) : 변경 시 해당 인덱스 답변 전체 제거
+ANSWER_CACHE_VERSION_INTERVAL = 300
+
+class AnswerCache:
+    def __init__(self, threshold=ANSWER_CACHE_THRESHOLD, ttl=ANSWER_CACHE_TTL, bucket_size=ANSWER_CACHE_BUCKET_SIZE,
+                 version_interval=ANSWER_CACHE_VERSION_INTERVAL, max_entries=ANSWER_CACHE_MAX_ENTRIES, sweep_interval=ANSWER_CACHE_SWEEP_INTERVAL):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.bucket_size = bucket_size
+        self.version_interval = version_interval
+        self.max_entries = max_entries
+        self.sweep_interval = sweep_interval
+        self.buckets = {}
+        self.entries = 0
+        self.sweep_time = time.time()
+        self.evicted = 0
+        self.index_versions = {}
+        self.locale_stats = {}
+        self.invalidated = 0
+        self.lock = threading.Lock()
+
+    # 인덱스 version 이 바뀌면 해당 인덱스의 답변 제거 ( loader : index_name -> version )
+    def check_index_version(self, index_name, loader):
+        now = time.time()
+        with self.lock:
+            version, checked_time = self.index_versions.get(index_name, (None, 0))
+            if now - checked_time < self.version_interval:
+                return
+            # 확인 중 다른 요청은 기존 version 으로 진행
+            self.index_versions[index_name] = (version, now)
+
+        try:
+            new_version = loader(index_name)
+        except Exception as e:
+            logger.error(f"Index version check error : {index_name} - {e}")
+            return
+
+        with self.lock:
+            self.index_versions[index_name] = (new_version, now)
+            if version is not None and new_version != version:
+                keys = [key for key in self.buckets if key[0] == index_name]
+                for key in keys:
+                    count = len(self.buckets.pop(key))
+                    self.entries -= count
+                    self.invalidated += count
+                logger.info(f"Answer cache invalidated : {index_name}, {version} -> {new_version}")
+
+    def lookup(self, key, vector, locale):
+        if not ANSWER_CACHE_ENABLED:
+            return None, 0.0
+        now = time.time()
+        vector = normalize(vector)
+        with self.lock:
+            stats = self.locale_stats.setdefault(locale, {"lookups": 0, "hits": 0, "saved_time": 0.0})
+            stats["lookups"] += 1
+
+            bucket = self.prune(key, now)
+            if not bucket:
+                return None, 0.0
+
+            scores = np.stack([entry["vector"] for entry in bucket]) @ vector
+            best = int(np.argmax(scores))
+            score = float(scores[best])
+            if score < self.threshold:
+                return None, score
+
+            entry = bucket[best]
+            stats["hits"] += 1
+            stats["saved_time"] += entry["cost"]
+            return copy.deepcopy(entry["value"]), score
+
+    # value : 재사용할 검색/답변 결과, cost : 원 요청의 검색 + 답변 생성 시간
+    def store(self, key, vector, value, cost):
+        if not ANSWER_CACHE_ENABLED:
+            return
+        now = time.time()
+        entry = {"vector": normalize(vector),
+                 "value": copy.deepcopy(value),
+                 "cost": cost,
+                 "expire_time": now + self.ttl}
+        with self.lock:
+            bucket = self.buckets.setdefault(key, [])
+            bucket.append(entry)
+            self.entries += 1
+            if len(bucket) > self.bucket_size:
+                self.entries -= len(bucket) - self.bucket_size
+                del bucket[:len(bucket) - self.bucket_size]
+            if self.entries > self.max_entries or now - self.sweep_time >= self.sweep_interval:
+                self.sweep(now)
+
+    # 만료 답변 제거, 빈 key 삭제 ( lock 안에서 호출 )
+    def prune(self, key, now):
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            return None
+        alive = [entry for entry in bucket if entry["expire_time"] > now]
+        self.entries -= len(bucket) - len(alive)
+        if not alive:
+            del self.buckets[key]
+            return None
+        bucket[:] = alive
+        return bucket
+
+    # 전체 만료 정리 + 최대 답변 수 초과 시 만료 시간이 가장 이른 ( 오래된 ) 답변부터 제거 ( lock 안에서 호출 )
+    def sweep(self, now):
+        self.sweep_time = now
+        for key in list(self.buckets):
+            self.prune(key, now)
+        excess = self.entries - self.max_entries
+        if excess <= 0:
+            return
+        oldest = sorted((entry["expire_time"], key) for key, bucket in self.buckets.items() for entry in bucket)[:excess]
+        for _, key in oldest:
+            bucket = self.buckets[key]
+            # bucket 안은 저장 순서 ( 오래된 답변이 앞 )
+            del bucket[0]
+            if not bucket:
+                del self.buckets[key]
+        self.entries -= excess
+        self.evicted += excess
+
+    def stats(self):
+        with self.lock:
+            locales = {}
+            for locale, stats in self.locale_stats.items():
+                locales[locale] = dict(stats,
+                                       hit_rate=stats["hits"] / stats["lookups"] if stats["lookups"] else 0.0,
+                                       saved_time=round(stats["saved_time"], 3))
+            return {"keys": len(self.buckets),
+                    "entries": self.entries,
+                    "invalidated": self.invalidated,
+                    "evicted": self.evicted,
+                    "locales": locales}
+
+# 첫 질문은 현재 질문이 이미 저장되어 있어 chat history 가 '' ( None 아님 ) -> 이전 대화가 없으면 답변 재사용
+def use_answer_cache(chat_history):
+    return not chat_history
+
+def normalize(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+answer_cache = AnswerCache()
@@ -0,0 +1,568 @@
+import os
+import re
+import sys
+import json
+import time
+import types
+import hashlib
+import sqlite3
+import tempfile
+import threading
+from base64 import b64encode
+from contextvars import ContextVar
+from functools import lru_cache
+from types import SimpleNamespace
+import numpy as np
+
+from benchmark import fixtures
+
+# 외부 서비스 응답 지연 (초) : 기본 0 ( chat 경로의 순수 Python overhead 만 측정 )
+LATENCY = {"translator": 0.0,
+           "load_balancer": 0.0,
+           "embedding": 0.0,
+           "llm": 0.0,
+           "search": 0.0,
+           "blob": 0.0,
+           "cosmos": 0.0,
+           "mysql": 0.0}
+EMBEDDING_DIM = 1536
+ACCOUNT_KEY = b64encode(b"benchmark-account-key").decode()
+
+# 현재 재생 중인 corpus 항목 ( 감지 언어 / LLM 응답 선택 )
+current_case = ContextVar("benchmark_case", default=None)
+
+def wait(service):
+    latency = LATENCY.get(service, 0)
+    if latency:
+        time.sleep(latency)
+
+def case_value(key, default=None):
+    case = current_case.get()
+    if case is None:
+        return default
+    return case.get(key, default)
+
+# text 별 고정 embedding ( 같은 text -> 같은 vector, 검색 문서 제목과 같은 질문은 cosine 1 )
+@lru_cache(maxsize=8192)
+def embedding_array(text):
+    seed = int.from_bytes(hashlib.sha256(str(text).encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(EMBEDDING_DIM).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+def fake_embedding(text):
+    return embedding_array(text).tolist()
+
+def keyvault_values():
+    connection_string = f"DefaultEndpointsProtocol=https;AccountName={fixtures.ACCOUNT_NAME};AccountKey={ACCOUNT_KEY};EndpointSuffix=core.windows.net"
+    values = {"aisearch-account-key": "benchmark",
+              "aisearch-account-name": "benchmark",
+              "aisearch-endpoint": "https://benchmark.search.windows.net",
+              "cosmosdb-key": "benchmark",
+              "cosmosdb-url": "https://benchmark.documents.azure.com:443/",
+              "mysql-host": "benchmark.mysql.database.azure.com",
+              "mysql-password": "benchmark",
+              "mysql-user": "benchmark",
+              "translator-account-key": "benchmark",
+              "translator-endpoint": "https://benchmark.cognitiveservices.azure.com/translator/text/v3.0/",
+              "translator-region": "koreacentral",
+              "openai-api-key": "benchmark",
+              "openai-api-base": "https://benchmark.openai.azure.com/",
+              "openai-api-version": "2023-12-01-preview",
+              "Authorization": ""}
+    for storage in ["doc", "raw", "log"]:
+        values[f"storage-{storage}-account-key"] = ACCOUNT_KEY
+        values[f"storage-{storage}-account-name"] = fixtures.ACCOUNT_NAME
+        values[f"storage-{storage}-account-str"] = connection_string
+    return values
+
+# credential 은 import 시 Key Vault 를 조회하므로 app module import 전에 교체
+def install_credential(values):
+    module = types.ModuleType("credential")
+    module.keyvault_values = values
+    module.fetch_keyvault_values = lambda: None
+    sys.modules["credential"] = module
+    return module
+
+class FakeResponse:
+    def __init__(self, payload, status_code=200):
+        self.payload = payload
+        self.status_code = status_code
+
+    def json(self):
+        return self.payload
+
+    def raise_for_status(self):
+        pass
+
+# Translator ( requests.Session 대체 ) : 번역 결과는 원문 그대로
+class FakeTranslatorSession:
+    def post(self, url, params=None, headers=None, json=None):
+        wait("translator")
+        language = case_value("detected_language", "en")
+        if url.endswith("detect"):
+            return FakeResponse([{"language": language, "score": 1.0, "isTranslationSupported": True} for _ in json])
+
+        language_to = params["to"]
+        languages = language_to if isinstance(language_to, list) else [language_to]
+        response = []
+        for item in json:
+            result = {"translations": [{"text": item["text"], "to": to} for to in languages]}
+            if "from" not in params:
+                result["detectedLanguage"] = {"language": language, "score": 1.0}
+            response.append(result)
+        return FakeResponse(response)
+
+    def close(self):
+        pass
+
+# tiktoken 대체 ( cl100k_base 다운로드 없이 공백 단위 token ) : token 수는 근사치, decode(encode(text)) == text
+class FakeEncoder:
+    def encode(self, text):
+        return re.findall(r"\s*\S+|\s+", text)
+
+    def decode(self, tokens):
+        return "".join(tokens)
+
+fake_encoder = FakeEncoder()
+
+def fake_get_encoder(model):
+    return fake_encoder
+
+def fake_load_balancing(token_size, type):
+    wait("load_balancer")
+    model = "gpt-35-turbo" if type == "gpt" else "text-embedding-ada-002"
+    return f"https://benchmark-{type}.openai.azure.com/openai/deployments/{model}", "benchmark", "2023-12-01-preview", model
+
+# Azure OpenAI embeddings / chat completions ( evaluation )
+class FakeOpenAIClient:
+    def __init__(self):
+        self.embeddings = SimpleNamespace(create=self.create_embeddings)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create_completion))
+
+    def create_embeddings(self, input, model=None):
+        wait("embedding")
+        return SimpleNamespace(data=[SimpleNamespace(embedding=fake_embedding(text)) for text in input])
+
+    def create_completion(self, model=None, messages=None, **kwargs):
+        wait("llm")
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=fake_completion()))])
+
+    def close(self):
+        pass
+
+# refinement / QA 공통 응답 ( preprocessing_refinement, preprocessing_answer 가 모두 읽을 수 있는 dict )
+def fake_completion():
+    question = case_value("question", "How do I reset my appliance?")
+    completion = {"response_language": case_value("detected_language", "en"),
+                  "evaluation": {"device_score": "1.0", "intention_score": "1.0"},
+                  "refinement": {"question": question,
+                                 "additional_sentences": [f"{question} (detail {i})" for i in range(1, 4)],
+                                 "keywords": case_value("keywords", "reset, power, door"),
+                                 "symptom": case_value("symptom", "appliance does not start"),
+                                 "Model_Number": case_value("model_number", "None"),
+                                 "Error_Code": case_value("error_code", "None")},
+                  "response_body": [fixtures.SENTENCE.strip()] * case_value("answer_paragraphs", 3),
+                  "solution": case_value("solution", "Yes"),
+                  "additional_questions": [f"{i}. {question} (follow-up {i})" for i in range(1, 4)]}
+    return json.dumps(completion, ensure_ascii=False, indent=4)
+
+def fake_chat_model_class():
+    from langchain_core.language_models.chat_models import BaseChatModel
+    from langchain_core.messages import AIMessage
+    from langchain_core.outputs import ChatGeneration, ChatResult
+
+    class FakeChatModel(BaseChatModel):
+        @property
+        def _llm_type(self):
+            return "benchmark-azure-chat"
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            wait("llm")
+            return ChatResult(generations=[ChatGeneration(message=AIMessage(content=fake_completion()))])
+
+    return FakeChatModel
+
+# AI Search : 로컬 vector store ( filter 는 eq / ne / search.in 만 해석 )
+FILTER_PATTERN = re.compile(r"(\w+) (eq|ne) '([^']*)'")
+SEARCH_IN_PATTERN = re.compile(r"search\.in\((\w+), '([^']*)', ','\)")
+RRF_K = 60
+
+class SearchStore:
+    def __init__(self, indexes):
+        self.indexes = {}
+        for index_name, documents in indexes.items():
+            vectors = np.stack([embedding_array(document["title"]) for document in documents]) if documents else np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+            self.indexes[index_name] = (documents, vectors)
+
+    def filter(self, documents, filter_query):
+        if not filter_query:
+            return list(range(len(documents)))
+        allowed = {}
+        excluded = {}
+        for field, operator, value in FILTER_PATTERN.findall(filter_query):
+            (allowed if operator == "eq" else excluded).setdefault(field, set()).add(value)
+        for field, values in SEARCH_IN_PATTERN.findall(filter_query):
+            allowed.setdefault(field, set()).update(values.split(","))
+        return [i for i, document in enumerate(documents)
+                if all(document.get(field) in values for field, values in allowed.items())
+                and not any(document.get(field) in values for field, values in excluded.items())]
+
+    # vector 검색 : 1 / (2 - cosine), hybrid ( search_text ) : RRF ( 제목 단어 일치 순위 + vector 순위 )
+    def search(self, index_name, search_text=None, vector_queries=None, filter=None, top=None, select=None, **kwargs):
+        documents, vectors = self.indexes.get(index_name, ([], None))
+        candidates = self.filter(documents, filter)
+        if not candidates:
+            return []
+
+        scores = {}
+        if vector_queries:
+            vector_query = vector_queries[0]
+            similarities = vectors[candidates] @ np.asarray(vector_query.vector, dtype=np.float32)
+            order = np.argsort(-similarities)[:vector_query.k_nearest_neighbors]
+            for rank, position in enumerate(order):
+                index = candidates[position]
+                scores[index] = 1 / (RRF_K + rank + 1) if search_text else 1 / (2 - float(similarities[position]))
+
+        if search_text and search_text != "*":
+            words = title_words(search_text)
+            matched = [index for index in candidates if words & title_words(documents[index]["title"])]
+            matched.sort(key=lambda index: -len(words & title_words(documents[index]["title"])))
+            for rank, index in enumerate(matched):
+                scores[index] = scores.get(index, 0) + 1 / (RRF_K + rank + 1)
+        elif search_text == "*":
+            scores = {index: 1.0 for index in candidates}
+
+        ranked = sorted(scores.items(), key=lambda item: -item[1])[:top or 50]
+        results = []
+        for index, score in ranked:
+            document = documents[index]
+            if select:
+                document = {field: document[field] for field in select}
+            results.append(dict(document, **{"@search.score": score}))
+        return results
+
+# 제목 검색 단어 ( 짧은 단어 제외 )
+def title_words(text):
+    return set(re.findall(r"\w{4,}", text.lower()))
+
+search_store = None
+
+class FakeSearchClient:
+    def __init__(self, endpoint=None, index_name=None, credential=None):
+        self.index_name = index_name
+
+    def search(self, **kwargs):
+        wait("search")
+        return iter(search_store.search(self.index_name, **kwargs))
+
+    def close(self):
+        pass
+
+class FakeSearchIndexClient:
+    def __init__(self, endpoint=None, credential=None):
+        pass
+
+    def get_index_statistics(self, index_name):
+        wait("search")
+        documents, _ = search_store.indexes.get(index_name, ([], None))
+        return {"document_count": len(documents), "storage_size": len(documents) * EMBEDDING_DIM * 4}
+
+    def close(self):
+        pass
+
+# Blob : 메모리 저장소 ( account, container ) -> { path : (data, etag) }
+class BlobStore:
+    def __init__(self):
+        self.containers = {}
+        self.lock = threading.Lock()
+        self.version = 0
+
+    def put(self, container_name, path, data):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        with self.lock:
+            self.version += 1
+            self.containers.setdefault(container_name, {})[path] = (bytes(data), f'"0x{self.version:016X}"')
+
+    def get(self, container_name, path):
+        with self.lock:
+            return self.containers.get(container_name, {}).get(path)
+
+    def append(self, container_name, path, data):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        with self.lock:
+            self.version += 1
+            container = self.containers.setdefault(container_name, {})
+            current, _ = container.get(path, (b"", None))
+            container[path] = (current + data, f'"0x{self.version:016X}"')
+
+blob_store = BlobStore()
+
+class FakeDownloader:
+    def __init__(self, data, etag):
+        self.data = data
+        self.properties = SimpleNamespace(etag=etag)
+
+    def readall(self):
+        return self.data
+
+class FakeBlobClient:
+    def __init__(self, container_name, blob_name):
+        self.container_name = container_name
+        self.blob_name = blob_name
+        self.url = f"https://{fixtures.ACCOUNT_NAME}.blob.core.windows.net/{container_name}/{blob_name}"
+
+    def download_blob(self, etag=None, match_condition=None):
+        from azure.core import MatchConditions
+        from azure.core.exceptions import HttpResponseError, ResourceNotFoundError
+
+        wait("blob")
+        item = blob_store.get(self.container_name, self.blob_name)
+        if item is None:
+            raise ResourceNotFoundError(f"The specified blob does not exist : {self.blob_name}")
+        data, current_etag = item
+        if etag is not None and match_condition == MatchConditions.IfModified and etag == current_etag:
+            error = HttpResponseError(message="The condition specified using HTTP conditional header(s) is not met.")
+            error.status_code = 304
+            raise error
+        return FakeDownloader(data, current_etag)
+
+    def exists(self):
+        return blob_store.get(self.container_name, self.blob_name) is not None
+
+    def create_append_blob(self, content_settings=None):
+        wait("blob")
+        blob_store.put(self.container_name, self.blob_name, b"")
+
+    def append_block(self, data):
+        wait("blob")
+        blob_store.append(self.container_name, self.blob_name, data)
+
+class FakeContainerClient:
+    def __init__(self, container_name):
+        self.container_name = container_name
+
+    def get_blob_client(self, blob):
+        return FakeBlobClient(self.container_name, blob)
+
+    def upload_blob(self, name, data, content_settings=None, overwrite=False):
+        from azure.core.exceptions import ResourceExistsError
+
+        wait("blob")
+        if not overwrite and blob_store.get(self.container_name, name) is not None:
+            raise ResourceExistsError(f"The specified blob already exists : {name}")
+        blob_store.put(self.container_name, name, data)
+        return FakeBlobClient(self.container_name, name)
+
+    def list_blobs(self, name_starts_with=None):
+        with blob_store.lock:
+            names = list(blob_store.containers.get(self.container_name, {}))
+        return [{"name": name} for name in names if name_starts_with is None or name.startswith(name_starts_with)]
+
+class FakeBlobServiceClient:
+    @classmethod
+    def from_connection_string(cls, connection_string):
+        return cls()
+
+    def get_container_client(self, container_name):
+        return FakeContainerClient(container_name)
+
+    def close(self):
+        pass
+
+class FakeShareServiceClient:
+    @classmethod
+    def from_connection_string(cls, connection_string):
+        return cls()
+
+    def get_share_client(self, share_name):
+        return SimpleNamespace(share_name=share_name)
+
+    def close(self):
+        pass
+
+# Cosmos : 메모리 container ( parameter 조건 c.field = @p / c.field > @p 와 SELECT c.field 만 해석 )
+CONDITION_PATTERN = re.compile(r"c\.(\w+)\s*(=|>)\s*(@\w+)")
+PROJECTION_PATTERN = re.compile(r"SELECT\s+(.*?)\s+FROM", re.IGNORECASE | re.DOTALL)
+
+class FakeCosmosContainer:
+    def __init__(self):
+        self.items = {}
+        self.lock = threading.Lock()
+
+    def create_item(self, body):
+        wait("cosmos")
+        with self.lock:
+            self.items[body["id"]] = json.loads(json.dumps(body))
+        return body
+
+    def upsert_item(self, body):
+        return self.create_item(body)
+
+    def query_items(self, query, parameters=None, partition_key=None, enable_cross_partition_query=None):
+        wait("cosmos")
+        values = {parameter["name"]: parameter["value"] for parameter in parameters or []}
+        conditions = CONDITION_PATTERN.findall(query)
+        projection = PROJECTION_PATTERN.search(query).group(1).strip()
+        fields = None if projection == "*" else re.findall(r"c\.(\w+)", projection)
+
+        with self.lock:
+            items = list(self.items.values())
+        results = []
+        for item in items:
+            matched = True
+            for field, operator, name in conditions:
+                value = item.get(field)
+                if operator == "=" and value != values[name]:
+                    matched = False
+                elif operator == ">" and not (value is not None and value > values[name]):
+                    matched = False
+            if matched:
+                results.append(dict(item) if fields is None else {field: item.get(field) for field in fields})
+        return iter(results)
+
+class FakeCosmosClient:
+    containers = {}
+    lock = threading.Lock()
+
+    def __init__(self, url=None, credential=None):
+        pass
+
+    def get_database_client(self, database_name):
+        return SimpleNamespace(get_container_client=lambda container_name: self.container(database_name, container_name))
+
+    @classmethod
+    def container(cls, database_name, container_name):
+        with cls.lock:
+            return cls.containers.setdefault((database_name, container_name), FakeCosmosContainer())
+
+    def close(self):
+        pass
+
+# MySQL : SQLite 파일 DB ( %s -> ? ), pool / connection 인터페이스는 mysql.connector 와 동일하게 사용
+class FakeMySqlCursor:
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    @property
+    def description(self):
+        return self.cursor.description
+
+    def execute(self, query, parameters=None):
+        wait("mysql")
+        self.cursor.execute(query.replace("%s", "?"), tuple(parameters) if parameters is not None else ())
+
+    def executemany(self, query, parameters_list):
+        wait("mysql")
+        self.cursor.executemany(query.replace("%s", "?"), [tuple(parameters) for parameters in parameters_list])
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+    def close(self):
+        self.cursor.close()
+
+class FakeMySqlConnection:
+    unread_result = False
+
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.closed = False
+
+    @property
+    def in_transaction(self):
+        return self.connection.in_transaction
+
+    def cursor(self):
+        return FakeMySqlCursor(self.connection.cursor())
+
+    def commit(self):
+        self.connection.commit()
+
+    def rollback(self):
+        self.connection.rollback()
+
+    def consume_results(self):
+        pass
+
+    def ping(self, reconnect=False):
+        pass
+
+    def is_connected(self):
+        return not self.closed
+
+    def close(self):
+        self.closed = True
+        self.connection.close()
+
+def create_mysql_database(path):
+    connection = sqlite3.connect(path)
+    for table, (columns, rows) in fixtures.mysql_tables().items():
+        connection.execute(f"CREATE TABLE {table} ({', '.join(f'{column} TEXT' for column in columns)})")
+        if rows:
+            connection.executemany(f"INSERT INTO {table} VALUES ({', '.join('?' * len(columns))})", rows)
+    connection.commit()
+    connection.close()
+
+# 대화 이력 ( lgcontainer ) 적재 : 이전 turn + 현재 질문
+def seed_chat_history(chatid, chat_session_id, history, question):
+    container = FakeCosmosClient.container("lgdb", "lgcontainer")
+    turns = list(history) + [{"chat_role": "user", "message": [question]}]
+    for order, turn in enumerate(turns, start=1):
+        container.create_item({"id": f"{chatid}-{chat_session_id}-{order}",
+                               "chatid": chatid,
+                               "chat_session_id": int(chat_session_id),
+                               "chat_order": order,
+                               "chat_role": turn["chat_role"],
+                               "message": turn["message"]})
+
+# app module import 및 외부 서비스 교체 ( credential 교체 후 import 해야 함 )
+def install(work_dir=None, documents_per_type=10, main_text_chars=1500):
+    global search_store
+
+    work_dir = work_dir or tempfile.mkdtemp(prefix="chatbot-benchmark-")
+    os.environ.setdefault("WRITE_BEHIND_SPILL_DIR", os.path.join(work_dir, "write-behind"))
+    values = keyvault_values()
+    install_credential(values)
+
+    import mysql.connector
+    import database
+    import model
+    import ai_search
+    import scheduler
+    import tools
+
+    mysql_path = os.path.join(work_dir, "mysql.sqlite3")
+    create_mysql_database(mysql_path)
+    mysql.connector.connect = lambda **config: FakeMySqlConnection(mysql_path)
+
+    database.BlobServiceClient = FakeBlobServiceClient
+    database.ShareServiceClient = FakeShareServiceClient
+    database.CosmosClient = FakeCosmosClient
+
+    translator_session = FakeTranslatorSession()
+    openai_client = FakeOpenAIClient()
+    llm_client = fake_chat_model_class()()
+    model.get_http_session = lambda service, key: translator_session
+    model.get_openai_client = lambda api_base, api_key, api_version: openai_client
+    model.get_llm_client = lambda api_base, api_key, api_version, deployment_name: llm_client
+    scheduler.load_balancing = fake_load_balancing
+    # model 은 get_encoder 를 이름으로 import
+    tools.get_encoder = fake_get_encoder
+    model.get_encoder = fake_get_encoder
+    tools.count_tokens.cache_clear()
+
+    ai_search.SearchClient = FakeSearchClient
+    ai_search.SearchIndexClient = FakeSearchIndexClient
+
+    indexes, blobs = fixtures.search_documents(documents_per_type, main_text_chars)
+    search_store = SearchStore(indexes)
+    blob_store.put("raw-data", "Contents_Manual_List_Mst_Data/PRODUCT_MST.csv", fixtures.product_mst_csv())
+    for path, data in blobs.items():
+        blob_store.put("documents", path, data)
+
+    # Authorization header : AES 키 ( hex ) 로 "DEV" 복호화
+    key = os.urandom(16)
+    values["Authorization"] = b64encode(tools.encrypt(key, b"DEV")).decode()
+    return {"work_dir": work_dir, "authorization": key.hex()}
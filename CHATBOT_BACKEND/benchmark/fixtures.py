@@ -0,0 +1,145 @@
+import io
+import csv
+import json
+
+# benchmark 용 로컬 데이터 ( MySQL 마스터 테이블 / PRODUCT_MST.csv / 검색 인덱스 / 검색 결과 본문 )
+ACCOUNT_NAME = "benchmark"
+
+# (LOCALE_CD, CORP_CD, LANGUAGE_CD, CODE_NAME, iso_cd)
+LOCALES = [("UK_EN", "LGEUK", "en", "English", "UK"),
+           ("DE_DE", "LGEDG", "de", "German", "DE")]
+
+# (DISP_GROUP_CD, DISP_PROD_CD, PROD_GROUP_CD, PROD_CD)
+PRODUCTS = [("REF", "REF", "REF", "REF"),
+            ("REF", "SBS", "REF", "SBS"),
+            ("WM", "WM", "WM", "WM"),
+            ("WM", "DRW", "WM", "DRW"),
+            ("TV", "TV", "TV", "TV"),
+            ("COK", "MWO", "COK", "MWO")]
+
+# 모델 코드 ( tb_sales_prod_map / tb_if_manual_list, spec / manual 검색 filter )
+MODELS = {"REF": ["GBB72PZEFN", "GBB92STBAP"],
+          "SBS": ["GSX960NSVZ", "GSLV71PZTM"],
+          "WM": ["F4V909BTSE", "F2WV3S8S6E"],
+          "DRW": ["FDV909W", "FDV1110B"],
+          "TV": ["OLED55C46LA", "65QNED816RE"],
+          "MWO": ["MH6535GIS", "MS2336GIB"]}
+
+SEARCH_TYPES = ["contents", "youtube", "manual", "spec"]
+
+# general-inquiry 의도 ( tb_chat_intent_mst, 제목이 같은 질문은 intent search 에서 고정 답변 )
+INTENTS = [("ORDER_STATUS", "Where is my order", "EV_ORDER", "https://www.lg.com/uk/order-status", "Order status"),
+           ("WARRANTY", "How long is the warranty", "EV_WARRANTY", "https://www.lg.com/uk/warranty", "Warranty"),
+           ("REPAIR_REQUEST", "I want to book a repair", "EV_REPAIR", "https://www.lg.com/uk/support/repair", "Book a repair")]
+
+SENTENCE = ("Check that the appliance is connected to a working power outlet and that the door is fully closed. "
+            "If the issue continues, reset the appliance by unplugging it for five minutes, then review the "
+            "troubleshooting steps in the owner's manual before contacting the service centre. ")
+
+def main_text(title, chars):
+    repeat = max(1, chars // len(SENTENCE) + 1)
+    return (title + "\n" + SENTENCE * repeat)[:chars]
+
+def index_name(locale_cd, language_cd):
+    return locale_cd.split('_')[0].lower() + '-' + language_cd.lower()
+
+def product_mst_csv():
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(["DISP_GROUP_CD", "DISP_PROD_CD", "PROD_GROUP_CD", "PROD_CD"])
+    for row in PRODUCTS:
+        writer.writerow(row)
+    return output.getvalue().encode("utf-8")
+
+def mysql_tables():
+    tables = {"tb_code_mst": (["GROUP_CD", "CODE_CD", "CODE_NAME"], []),
+              "tb_corp_lan_map": (["CORP_CD", "LOCALE_CD", "LANGUAGE_CD"], []),
+              "tb_chat_intent_mst": (["INTENT_CODE", "LOCALE_CD", "EVENT_CD", "RELATED_LINK_URL", "CHATBOT_RESPONSE", "RELATED_LINK_NAME"], []),
+              "tb_sales_prod_map": (["CORP_CD", "LOCALE_CD", "SALES_CD", "MATCHED_MODEL_CD", "PROD_MODEL_CD", "SUFFIX_CD", "MDMS_PROD_CD"], []),
+              "tb_if_manual_list": (["CORP_CD", "LANGUAGE_LIST", "PROD_MODEL_CD", "ITEM_ID"], [])}
+
+    for locale_cd, corp_cd, language_cd, code_name, iso_cd in LOCALES:
+        # 값 뒤 공백 ( master_data.strip_values ) 포함
+        tables["tb_code_mst"][1].append(("B00003", language_cd, code_name + " "))
+        tables["tb_code_mst"][1].append(("B00006", language_cd, code_name))
+        tables["tb_corp_lan_map"][1].append((corp_cd, locale_cd, language_cd))
+
+        for intent_code, title, event_cd, url, name in INTENTS:
+            tables["tb_chat_intent_mst"][1].append((intent_code, locale_cd, event_cd, url, f"{name} : please visit {url}", name))
+
+        for prod_cd, models in MODELS.items():
+            for model in models:
+                tables["tb_sales_prod_map"][1].append((corp_cd, locale_cd, f"{model}.A{iso_cd}", f"SPEC_{model}", model, f"A{iso_cd}", f"{model}.A{iso_cd}"))
+                tables["tb_if_manual_list"][1].append((corp_cd, code_name, model, f"MANUAL_{model}"))
+
+    # 요약 저장 ( write-behind, CHAT_SUMMARY_INSERT_QUERY )
+    summary_columns = ["CHAT_ID", "CHAT_SESSION_ID", "COUNTRY_CD", "LANGUAGE_CD", "RAG_ORDER", "PROD_CD", "USER",
+                       "ASSISTANT", "QUERY_ORI", "GPT_ANSWER", "DETECTLANGUAGE", "USERSELECTLANGUAGE",
+                       "INDEXNAME", "REFINEMENT_TOKEN", "QA_TOKEN", "RAG_TOTAL_TIME", "REFINE_INPUT_QUESTION",
+                       "REFINE_INTENT", "REFINE_KEYWORDS", "REFINE_SYMPTOM", "REFINE_OUTPUT_QUESTION_1",
+                       "REFINE_OUTPUT_QUESTION_2", "REFINE_OUTPUT_QUESTION_3", "CONTEXTS",
+                       "REF_DOC_1_TYPE", "REF_DOC_1_ID", "REF_DOC_1_SCORE",
+                       "REF_DOC_2_TYPE", "REF_DOC_2_ID", "REF_DOC_2_SCORE",
+                       "REF_DOC_3_TYPE", "REF_DOC_3_ID", "REF_DOC_3_SCORE",
+                       "CREATE_DATE", "CREATE_USER", "UPDATE_DATE", "UPDATE_USER", "GPT_EVAL", "EVAL_YN"]
+    tables["tmp_chat_summary_dash"] = (summary_columns, [])
+    return tables
+
+# 검색 문서 ( index 별 ) + 본문 blob ( documents 컨테이너 )
+def search_documents(documents_per_type=10, main_text_chars=1500):
+    indexes = {}
+    blobs = {}
+    for locale_cd, corp_cd, language_cd, code_name, iso_cd in LOCALES:
+        documents = []
+        for group_cd, disp_prod_cd, prod_group_cd, prod_cd in PRODUCTS:
+            models = MODELS[prod_cd]
+            for search_type in SEARCH_TYPES:
+                for i in range(documents_per_type):
+                    model = models[i % len(models)]
+                    if search_type == "spec":
+                        data_id = f"SPEC_{model}"
+                    elif search_type == "manual":
+                        data_id = f"MANUAL_{model}"
+                    else:
+                        data_id = f"{search_type.upper()}_{prod_cd}_{i}"
+                    title = f"{prod_group_cd} {prod_cd} {search_type} guide {i} for {model}"
+                    # ai_search.JSON_TEXT_TYPES ( youtube / manual ) 만 JSON, contents / spec 은 전처리와 같이 text
+                    json_text = search_type in ("youtube", "manual")
+                    path = f"{iso_cd}/{code_name}/{search_type}/{prod_cd}/{data_id}_{i}.{'json' if json_text else 'txt'}"
+                    text = main_text(title, main_text_chars)
+                    blobs[path] = json.dumps({"main_text": text}, ensure_ascii=False).encode("utf-8") if json_text else text.encode("utf-8")
+                    documents.append({"id": f"{iso_cd}-{search_type}-{prod_cd}-{i}",
+                                      "type": search_type,
+                                      "iso_cd": iso_cd,
+                                      "language": code_name,
+                                      "product_group_code": prod_group_cd,
+                                      "product_code": prod_cd,
+                                      "product_model_code": model,
+                                      "data_id": data_id,
+                                      "mapping_key": f"{iso_cd}_{language_cd}_{prod_group_cd}_{prod_cd}_{search_type}_{i}",
+                                      "chunk_num": str(i),
+                                      "file_name": f"{data_id}.pdf" if search_type == "manual" else data_id,
+                                      "pages": f"{i + 1},{i + 2}" if search_type == "manual" else "",
+                                      "url": f"manual/{model}.pdf" if search_type == "manual" else f"https://www.lg.com/{iso_cd.lower()}/{search_type}/{data_id}",
+                                      "title": title,
+                                      "main_text_path": f"https://{ACCOUNT_NAME}.blob.core.windows.net/documents/{path}"})
+
+            for intent_code, title, event_cd, url, name in INTENTS:
+                documents.append({"id": f"{iso_cd}-general-inquiry-{prod_cd}-{intent_code}",
+                                  "type": "general-inquiry",
+                                  "iso_cd": iso_cd,
+                                  "language": code_name,
+                                  "product_group_code": prod_group_cd,
+                                  "product_code": prod_cd,
+                                  "product_model_code": "",
+                                  "data_id": intent_code,
+                                  "mapping_key": f"{iso_cd}_{language_cd}_{prod_group_cd}_{prod_cd}_gi_{intent_code}",
+                                  "chunk_num": "0",
+                                  "file_name": event_cd,
+                                  "pages": "",
+                                  "url": url,
+                                  "title": title,
+                                  "main_text_path": ""})
+
+        indexes[index_name(locale_cd, language_cd)] = documents
+    return indexes, blobs
@@ -0,0 +1,236 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import itertools
+import tracemalloc
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+# chat/__init__.py::main 을 로컬 fake 서비스로 재생 ( CHATBOT_BACKEND 에서 python -m benchmark.run )
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CORPUS = os.path.join(APP_ROOT, "benchmark", "corpus.jsonl")
+PERCENTILES = (50, 95, 99)
+
+def load_corpus(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def make_body(case, chatid, chat_session_id, spans):
+    return {"param": {"countryCode": case["country_code"],
+                      "productCode": case.get("product_code", ""),
+                      "productModelCode": case.get("product_model_code", ""),
+                      "productGroupCode": case.get("product_group_code", ""),
+                      "language": case["language"],
+                      "chatSessionId": chat_session_id,
+                      "localeCode": case["locale_cd"],
+                      "chatId": chatid,
+                      "ragOrder": len(case.get("history", [])) // 2 + 1,
+                      "platform": "WEB",
+                      "currentUser": 1,
+                      "debug": spans},
+            "message": [{"role": "user", "content": case["question"]}]}
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+def summarize(values):
+    summary = {f"p{p}": round(percentile(values, p) * 1000, 3) for p in PERCENTILES}
+    summary["mean"] = round(sum(values) / len(values) * 1000, 3) if values else 0.0
+    summary["max"] = round(max(values) * 1000, 3) if values else 0.0
+    summary["count"] = len(values)
+    return summary
+
+def collect_spans(node, durations):
+    for child in node.get("children", []):
+        durations.setdefault(child["name"], []).append(child["duration"])
+        collect_spans(child, durations)
+
+class Runner:
+    def __init__(self, corpus, authorization, spans=False):
+        import azure.functions as func
+        import chat
+        from benchmark import fakes
+
+        self.func = func
+        self.main = chat.main
+        self.fakes = fakes
+        self.corpus = corpus
+        self.authorization = authorization
+        self.spans = spans
+        self.sequence = itertools.count(1)
+
+    # 요청 1건 : chatid / session 은 매번 새로 발급 ( 세션 캐시 재사용 없이 corpus 그대로 재생 )
+    def run_case(self, case):
+        sequence = next(self.sequence)
+        chatid = f"benchmark-{case['name']}-{sequence}"
+        chat_session_id = sequence
+        self.fakes.seed_chat_history(chatid, chat_session_id, case.get("history", []), case["question"])
+        body = json.dumps(make_body(case, chatid, chat_session_id, self.spans), ensure_ascii=False).encode("utf-8")
+        request = self.func.HttpRequest(method="POST", url="/api/chat", headers={"Authorization": self.authorization}, body=body)
+
+        self.fakes.current_case.set(case)
+        start_time = time.perf_counter()
+        response = self.main(request)
+        latency = time.perf_counter() - start_time
+        return latency, self.check(case, response)
+
+    def check(self, case, response):
+        body = response.get_body().decode("utf-8")
+        output = json.loads(body)
+        trace = output.get("additionalInfo", {}).get("trace", {})
+        return {"ok": bool(output.get("gpt")) and output.get("eventCd", "") != "", "trace": trace}
+
+    def run(self, requests, concurrency):
+        cases = [self.corpus[i % len(self.corpus)] for i in range(requests)]
+        # case 별 context 분리 ( worker thread 재사용 시 이전 case 가 남지 않도록 )
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            start_time = time.perf_counter()
+            results = list(executor.map(lambda case: contextvars.copy_context().run(self.run_case, case), cases))
+            wall_time = time.perf_counter() - start_time
+        return cases, results, wall_time
+
+    # 순차 실행 + tracemalloc : 요청 당 peak, 전체 pass 후 남은 메모리 ( 누수 ) 상위 위치
+    def measure_allocations(self, top=10):
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        peaks = []
+        for case in self.corpus:
+            tracemalloc.reset_peak()
+            current, _ = tracemalloc.get_traced_memory()
+            contextvars.copy_context().run(self.run_case, case)
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - current)
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+
+        filters = [tracemalloc.Filter(True, os.path.join(APP_ROOT, "*"))]
+        stats = after.filter_traces(filters).compare_to(before.filter_traces(filters), "lineno")
+        return {"peak_bytes_p50": percentile(peaks, 50),
+                "peak_bytes_max": max(peaks) if peaks else 0,
+                "retained_bytes": sum(stat.size_diff for stat in stats),
+                "top": [{"location": f"{os.path.relpath(stat.traceback[0].filename, APP_ROOT)}:{stat.traceback[0].lineno}",
+                         "size_diff": stat.size_diff,
+                         "count_diff": stat.count_diff} for stat in stats[:top]]}
+
+def make_report(args, cases, results, wall_time, write_behind_stats):
+    latencies = [latency for latency, _ in results]
+    by_case = {}
+    span_durations = {}
+    for case, (latency, result) in zip(cases, results):
+        by_case.setdefault(case["name"], []).append(latency)
+        collect_spans(result["trace"], span_durations)
+
+    report = {"requests": len(results),
+              "concurrency": args.concurrency,
+              "errors": sum(1 for _, result in results if not result["ok"]),
+              "wall_time": round(wall_time, 3),
+              "throughput": round(len(results) / wall_time, 3) if wall_time else 0.0,
+              "latency_ms": summarize(latencies),
+              "cases": {name: summarize(values) for name, values in by_case.items()},
+              "write_behind": write_behind_stats}
+    if span_durations:
+        report["spans_ms"] = {name: summarize(values) for name, values in sorted(span_durations.items())}
+    return report
+
+# baseline 대비 p50 / p95 / throughput 이 tolerance 이상 나빠지면 회귀
+def compare(report, baseline, tolerance):
+    regressions = []
+    for key in ["p50", "p95"]:
+        current, previous = report["latency_ms"][key], baseline["latency_ms"][key]
+        if previous and current > previous * (1 + tolerance):
+            regressions.append(f"latency {key} : {previous}ms -> {current}ms")
+    if baseline["throughput"] and report["throughput"] < baseline["throughput"] * (1 - tolerance):
+        regressions.append(f"throughput : {baseline['throughput']} -> {report['throughput']} req/s")
+    return regressions
+
+def print_report(report):
+    latency = report["latency_ms"]
+    print(f"requests {report['requests']} / concurrency {report['concurrency']} / errors {report['errors']}")
+    print(f"throughput {report['throughput']} req/s ( wall {report['wall_time']}s )")
+    print(f"latency ms : p50 {latency['p50']}  p95 {latency['p95']}  p99 {latency['p99']}  mean {latency['mean']}  max {latency['max']}")
+    for name, summary in report["cases"].items():
+        print(f"  {name:<32} p50 {summary['p50']:>10}  p95 {summary['p95']:>10}  n {summary['count']}")
+    for name, summary in report.get("spans_ms", {}).items():
+        print(f"  span {name:<40} p50 {summary['p50']:>10}  p95 {summary['p95']:>10}  n {summary['count']}")
+    if "allocations" in report:
+        allocations = report["allocations"]
+        print(f"allocations : peak p50 {allocations['peak_bytes_p50']} B, peak max {allocations['peak_bytes_max']} B, retained {allocations['retained_bytes']} B")
+        for stat in allocations["top"]:
+            print(f"  {stat['location']:<40} {stat['size_diff']:>10} B  {stat['count_diff']:>6}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmark for chat/__init__.py::main with local service fakes")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--documents-per-type", type=int, default=10)
+    parser.add_argument("--main-text-chars", type=int, default=1500)
+    parser.add_argument("--latency", action="append", default=[], metavar="SERVICE=SECONDS",
+                        help="fake service latency, e.g. --latency llm=0.5 ( translator, load_balancer, embedding, llm, search, blob, cosmos, mysql )")
+    parser.add_argument("--answer-cache", action="store_true", help="keep the answer cache enabled ( off by default so every request runs the full pipeline )")
+    parser.add_argument("--spans", action="store_true", help="request additionalInfo.trace and report per-span latency")
+    parser.add_argument("--allocations", action="store_true", help="run one tracemalloc pass over the corpus")
+    parser.add_argument("--output", help="write the JSON report to this path")
+    parser.add_argument("--baseline", help="previous JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    parser.add_argument("--verbose", action="store_true")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.chdir(APP_ROOT)
+    if APP_ROOT not in sys.path:
+        sys.path.insert(0, APP_ROOT)
+    if not args.verbose:
+        logging.getLogger().addHandler(logging.NullHandler())
+    # Functions host 처럼 동시 처리 수 = worker thread 수 ( admission 한도 산정 기준, admission import 전에 설정 )
+    os.environ.setdefault("PYTHON_THREADPOOL_THREAD_COUNT", str(args.concurrency))
+
+    from benchmark import fakes
+    for item in args.latency:
+        service, seconds = item.split("=")
+        if service not in fakes.LATENCY:
+            raise SystemExit(f"Unknown service : {service}")
+        fakes.LATENCY[service] = float(seconds)
+
+    installed = fakes.install(documents_per_type=args.documents_per_type, main_text_chars=args.main_text_chars)
+    import answer_cache
+    from write_behind import write_behind_queue
+    answer_cache.ANSWER_CACHE_ENABLED = args.answer_cache
+
+    runner = Runner(load_corpus(args.corpus), installed["authorization"], spans=args.spans)
+    if args.warmup:
+        runner.run(args.warmup, args.concurrency)
+
+    cases, results, wall_time = runner.run(args.requests, args.concurrency)
+    report = make_report(args, cases, results, wall_time, write_behind_queue.stats())
+    if args.allocations:
+        report["allocations"] = runner.measure_allocations()
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4, ensure_ascii=False)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+    # 오류 응답 ( apology / 검증 실패 ) 이 섞이면 측정값이 오류 경로 시간 -> 실패 처리
+    if report["errors"]:
+        print(f"ERRORS {report['errors']}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
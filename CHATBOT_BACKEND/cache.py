@@ -0,0 +1,158 @@
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+import logging
+logger = logging.getLogger(__name__)
+
+class TTLCache:
+    def __init__(self, maxsize=1024, ttl=3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+        self.inflight = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, key):
+        with self.lock:
+            return self._get(key)
+
+    def _get(self, key):
+        item = self.data.get(key)
+        if item is None:
+            return False, None
+
+        value, expire_time = item
+        if expire_time is not None and expire_time < time.time():
+            del self.data[key]
+            return False, None
+
+        self.data.move_to_end(key)
+        return True, value
+
+    def set(self, key, value, ttl=None):
+        with self.lock:
+            self._set(key, value, ttl)
+
+    def _set(self, key, value, ttl=None):
+        if ttl is None:
+            ttl = self.ttl
+        expire_time = time.time() + ttl if ttl is not None else None
+        self.data[key] = (value, expire_time)
+        self.data.move_to_end(key)
+        while len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+
+    def invalidate(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+    # 캐시 조회 후 없으면 flight 등록 ( lock 안에서 호출 ) : (found, value, flight, leader, future)
+    # flight : 동기 대기는 event, async 대기 ( loop 지정 ) 는 waiters 의 (loop, future)
+    def _join(self, key, loop=None):
+        found, value = self._get(key)
+        if found:
+            self.hits += 1
+            return True, value, None, False, None
+
+        flight = self.inflight.get(key)
+        if flight is None:
+            flight = {"event": threading.Event(), "waiters": [], "value": None, "error": None}
+            self.inflight[key] = flight
+            self.misses += 1
+            return False, None, flight, True, None
+
+        self.coalesced += 1
+        future = None
+        if loop is not None:
+            future = loop.create_future()
+            flight["waiters"].append((loop, future))
+        return False, None, flight, False, future
+
+    def _finish(self, key, flight):
+        with self.lock:
+            self.inflight.pop(key, None)
+            waiters = list(flight["waiters"])
+        flight["event"].set()
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(lambda future=future: future.done() or future.set_result(True))
+            except RuntimeError:
+                # 대기 중 종료된 event loop
+                pass
+
+    def _fail(self, key, flight, error):
+        # 취소 ( CancelledError ) 는 다른 대기 요청에 그대로 전달하지 않음
+        flight["error"] = error if isinstance(error, Exception) else RuntimeError(f"Cache load cancelled : {key}")
+
+    # 캐시에 없으면 loader 실행, 같은 key 동시 요청은 한 번만 실행 (single-flight)
+    def get_or_load(self, key, loader, ttl=None):
+        with self.lock:
+            found, value, flight, leader, _ = self._join(key)
+        if found:
+            return value
+
+        if not leader:
+            flight["event"].wait()
+            if flight["error"] is not None:
+                raise flight["error"]
+            return flight["value"]
+
+        try:
+            value = loader()
+            flight["value"] = value
+            with self.lock:
+                self._set(key, value, ttl)
+            return value
+
+        except BaseException as e:
+            self._fail(key, flight, e)
+            raise
+
+        finally:
+            self._finish(key, flight)
+
+    # async single-flight ( loader : coroutine 함수 ), 동기 get_or_load 와 같은 flight 공유
+    async def aget_or_load(self, key, loader, ttl=None):
+        loop = asyncio.get_running_loop()
+        with self.lock:
+            found, value, flight, leader, future = self._join(key, loop)
+        if found:
+            return value
+
+        if not leader:
+            await future
+            if flight["error"] is not None:
+                raise flight["error"]
+            return flight["value"]
+
+        try:
+            value = await loader()
+            flight["value"] = value
+            with self.lock:
+                self._set(key, value, ttl)
+            return value
+
+        except BaseException as e:
+            self._fail(key, flight, e)
+            raise
+
+        finally:
+            self._finish(key, flight)
+
+    def stats(self):
+        with self.lock:
+            total = self.hits + self.misses + self.coalesced
+            return {"size": len(self.data),
+                    "maxsize": self.maxsize,
+                    "hits": self.hits,
+                    "misses": self.misses,
+                    "coalesced": self.coalesced,
+                    "hit_rate": (self.hits + self.coalesced) / total if total else 0.0}
@@ -0,0 +1,12 @@
+import azure.functions as func
+import credential
+
+# 처리 흐름은 chat_pipeline.run_chat ( chat 과 공유 ), aio SDK 호출 + 동기 후처리는 executor
+async def main(req: func.HttpRequest) -> func.HttpResponse:
+
+        if not credential.keyvault_values:
+                credential.fetch_keyvault_values()
+
+        from chat_pipeline import run_chat, AsyncChatIO
+
+        return await run_chat(req, AsyncChatIO())
@@ -0,0 +1,466 @@
+import azure.functions as func
+import time
+from datetime import datetime
+import json
+import pytz
+import traceback
+import credential
+from ai_search import AISearch
+from model import OpenAI, Translator
+from database import CosmosDB, AzureStorage, mysql_pool_stats
+from master_data import get_master_data
+from scheduler import deployment_scheduler
+from answer_cache import answer_cache, use_answer_cache
+from tools import ( preprocess_thoughts_process,
+                    load_chat_data,
+                    aload_chat_data,
+                    preprocess_answer,
+                    preprocess_output_data,
+                    preprocess_documents,
+                    apreprocess_documents,
+                    preprocess_intent_search,
+                    apreprocess_intent_search,
+                    preprocess_query,
+                    refinement_flag,
+                    answer_solution_flag,
+                    make_error_result,
+                    lookup_answer_cache,
+                    alookup_answer_cache,
+                    store_answer_cache,
+                    restore_cached_answer,
+                    upload_chat_log,
+                    to_thread,
+                    Authorization,
+                    OpenAIResourceError,
+                    AuthorizationError,
+                    FIXED_ANSWERS,
+                    OVERLOAD_ANSWER,
+                    APOLOGY_ANSWER)
+from log import setup_logger, start_log_buffer, end_log_buffer
+from request_context import start_request_context, end_request_context
+from tracing import start_trace, end_trace
+from admission import admission_controller, AdmissionRejected
+
+# chat / chat_async 공통 처리 흐름 : I/O 만 SyncChatIO ( 동기 SDK ) / AsyncChatIO ( aio SDK + executor ) 로 구분
+class SyncChatIO:
+    name = "chat"
+
+    # CPU / 동기 전용 함수 ( 후처리, 고정 답변 등 )
+    async def run(self, func, *args, **kwargs):
+        return func(*args, **kwargs)
+
+    async def get_master_data(self):
+        return get_master_data()
+
+    # 한도 초과 시 대기 없이 과부하 응답 ( async 는 locale 별 대기열에서 잠시 대기 )
+    async def admit(self, locale, timeout):
+        return admission_controller.acquire(locale)
+
+    async def detect_and_translate(self, trans_instance, body, language_to):
+        return trans_instance.detect_and_translate(body=body, language_to=language_to)
+
+    async def detect_language(self, trans_instance, body):
+        return trans_instance.detect_language(body=body)
+
+    async def translate_question(self, trans_instance, body, language_to, language_from=None):
+        return trans_instance.translate_question(body=body, language_from=language_from, language_to=language_to)
+
+    async def read_file(self, as_instance, file_path):
+        return as_instance.read_file(file_path)
+
+    async def intent_search(self, filter_df, search_instance, query):
+        return preprocess_intent_search(filter_df, search_instance, query)
+
+    async def search_documents(self, filter_df, search_instance, query):
+        return preprocess_documents(filter_df, search_instance, query)
+
+    async def load_chat_data(self, db_instance, **kwargs):
+        return load_chat_data(db_instance, **kwargs)
+
+    async def lookup_answer_cache(self, search_instance, query):
+        return lookup_answer_cache(search_instance, query)
+
+    async def generate_answer(self, openai_instance, **kwargs):
+        return openai_instance.generate_answer(**kwargs)
+
+class AsyncChatIO(SyncChatIO):
+    name = "async chat"
+
+    async def run(self, func, *args, **kwargs):
+        return await to_thread(func, *args, **kwargs)
+
+    # 최초 로드 시 MySQL 조회 -> executor 에서 실행
+    async def get_master_data(self):
+        return await to_thread(get_master_data)
+
+    async def admit(self, locale, timeout):
+        return await admission_controller.aacquire(locale, timeout=timeout)
+
+    async def detect_and_translate(self, trans_instance, body, language_to):
+        return await trans_instance.adetect_and_translate(body=body, language_to=language_to)
+
+    async def detect_language(self, trans_instance, body):
+        return await trans_instance.adetect_language(body=body)
+
+    async def translate_question(self, trans_instance, body, language_to, language_from=None):
+        return await trans_instance.atranslate_question(body=body, language_from=language_from, language_to=language_to)
+
+    async def read_file(self, as_instance, file_path):
+        return await as_instance.aread_file(file_path)
+
+    async def intent_search(self, filter_df, search_instance, query):
+        return await apreprocess_intent_search(filter_df, search_instance, query)
+
+    async def search_documents(self, filter_df, search_instance, query):
+        return await apreprocess_documents(filter_df, search_instance, query)
+
+    async def load_chat_data(self, db_instance, **kwargs):
+        return await aload_chat_data(db_instance, **kwargs)
+
+    async def lookup_answer_cache(self, search_instance, query):
+        return await alookup_answer_cache(search_instance, query)
+
+    async def generate_answer(self, openai_instance, **kwargs):
+        return await openai_instance.agenerate_answer(**kwargs)
+
+def upload_request_log(as_instance_log, log_buffer, query, folder, prefix=""):
+    korea_timezone = pytz.timezone('Asia/Seoul')
+    now = datetime.now(korea_timezone)
+    formatted_date = now.strftime('%Y%m%d')
+    logs_str = log_buffer.getvalue()
+    log_file_path = f"chatapi/{folder}/{formatted_date}/{query['iso_cd']}/{query['language']}/{prefix}{query['chatid']}_{query['chat_session_id']}.log"
+    upload_chat_log(as_instance_log, logs_str, log_file_path)
+
+
+def product_filter(product_mst, query):
+    if len(query['product_code']) == 0:
+        return product_mst[product_mst['DISP_GROUP_CD'] == query['product_group_code']][['PROD_GROUP_CD','PROD_CD']], False
+    filter_df = product_mst[(product_mst['DISP_GROUP_CD'] == query['product_group_code'])&(product_mst['DISP_PROD_CD'] == query['product_code'])][['PROD_GROUP_CD','PROD_CD']]
+    if len(filter_df) == 0 :
+        return product_mst[product_mst['DISP_GROUP_CD'] == query['product_group_code']][['PROD_GROUP_CD','PROD_CD']], True
+    return filter_df, False
+
+def answer_language(query):
+    if query.get('trans_language_code_score', 0) != 1:
+        return query['user_selected_language_code']
+    return query['trans_language_code']
+
+async def run_chat(req, io):
+    auth_header = req.headers.get('Authorization')
+    auth = Authorization(value=credential.keyvault_values['Authorization'], key=auth_header)
+
+    # 요청 context ( id / deadline / 구간 시간 / 요청 캐시 ) + 구간 추적 + 로그 버퍼 : 요청 종료 시 해제
+    request_context = start_request_context()
+    trace = start_trace()
+    log_buffer = start_log_buffer()
+
+    # Get query
+    data = req.get_json()
+    query = preprocess_query(data)
+    request_context.set_ids(query['chatid'], query['chat_session_id'], query['rag_order'])
+    logger = setup_logger()
+
+    logger.info("=" * 30 + " POD_NAME " + "=" * 30)
+    # logger.info(dict(os.environ)['HOSTNAME'])
+    # query['pod_name'] = dict(os.environ)['HOSTNAME']
+    query['pod_name'] = 'DEV'
+
+    if query['iso_cd'] == 'GB' :
+        query['iso_cd'] = 'UK'
+
+    logger.info(f"Get KeyVault Values : {json.dumps(credential.keyvault_values,indent=4,ensure_ascii=False)}")
+    logger.info("=" * 30 + f" Start {io.name} API " + "=" * 30)
+    # Create instance
+    gpt_model='gpt-35-turbo'
+    openai_instance = OpenAI(gpt_model=gpt_model)
+    db_instance = CosmosDB()
+    as_instance_log = AzureStorage(container_name='logs', storage_type='datast')
+    as_instance_raw = AzureStorage(container_name='raw-data', storage_type='datast', use_cache=True)
+
+    search_instance = AISearch()
+    trans_instance = Translator()
+
+    logger.info("=" * 30 + " Load query " + "=" * 30)
+
+    logger.info(f"first query : {json.dumps(query,indent=4,ensure_ascii=False)}")
+    start_time = time.time()
+    search_time = {}
+
+    master_data = await io.get_master_data()
+    trans_instance.prewarm(FIXED_ANSWERS, master_data.translation_language_codes())
+
+    logger.info("=" * 30 + " 1st Query Preprocessing " + "=" * 30)
+    # Find Index Name
+    query['user_selected_language_code'] = query['language_code']
+    query['user_selected_language'] = master_data.get_locale_language_name(query['user_selected_language_code'])
+
+    locale = master_data.get_locale(query['locale_cd'])
+    query['corp_cd'] = locale['CORP_CD']
+    query['language_code'] = locale['LANGUAGE_CD']
+    query['language'] = locale['CODE_NAME']
+
+    # 수용 제어 ticket ( finally 에서 LLM 응답 시간과 함께 반납 ), overloaded : OpenAI 리소스 부족
+    admission_ticket = None
+    overloaded = False
+
+    try :
+
+        if auth != "DEV" :
+            logger.error(f"####### Authorizaion Error : {auth} != DEV")
+            raise AuthorizationError(f"####### Authorizaion Error : {auth} != DEV")
+
+        # 서버 측 수용 제어 ( 처리 중 요청 수 / LLM 응답 시간 기준 한도, 초과 시 과부하 응답 )
+        admission_ticket = await io.admit(query['locale_cd'], request_context.remaining())
+        request_context.add_timing("admission_wait", admission_ticket.wait_time)
+        # Detect language
+        #query['index_name'] = query['iso_cd'].lower()+'-'+query['language_code'].lower()
+        query['index_name'] = query['locale_cd'].split('_')[0].lower()+'-'+query['language_code'].lower()
+        body = [{'text': query['question']}]
+
+        # Detect language + Translate Query to Locale cd ( 1회 호출 )
+        trans_question = None
+        try:
+            detect_output = await io.detect_and_translate(trans_instance, body, query['language_code'])
+            query['trans_language_code'] = detect_output[0]['detectedLanguage']['language'].split('-')[0]
+            query['trans_language_code_score'] = detect_output[0]['detectedLanguage']['score']
+            language = master_data.get_language_name(query['trans_language_code'])
+            query['trans_language'] = language
+            trans_question = detect_output
+        except :
+            query['trans_language_code'] = query['user_selected_language_code']
+            query['trans_language_code_score'] = 1.0
+            query['trans_language'] = query['user_selected_language']
+
+        try :
+            if trans_question is None :
+                trans_question = await io.translate_question(trans_instance, body, query['language_code'], language_from=query['trans_language_code'])
+            query['trans_question'] = trans_question[0]['translations'][0]['text']
+        except :
+            query['trans_question'] = query['question']
+
+        logger.info(f"1st query : {json.dumps(query,indent=4,ensure_ascii=False)}")
+        logger.info("=" * 30 + " Start General Inquiry Search" + "=" * 30)
+        product_mst = await io.read_file(as_instance_raw, 'Contents_Manual_List_Mst_Data/PRODUCT_MST.csv')
+
+        if query['product_code'] == 'W/M' :
+            query['product_code'] = 'WM'
+
+        if len(query['product_group_code']) == 0:
+            query['product_group_code'] = product_mst[product_mst['DISP_PROD_CD'] == query['product_code']][['PROD_GROUP_CD']].iloc[0].values[0]
+
+        filter_df, filter_error = product_filter(product_mst, query)
+        if filter_error :
+            logger.error(f"########## FILTER ERROR ##########\nPROD_GROUP_CD : {query['product_group_code']}\nPROD_CD : {query['product_code']}")
+            upload_request_log(as_instance_log, log_buffer, query, "error_log", prefix="FILTER_ERROR_")
+
+        preprocessed, documents, all_data = await io.intent_search(filter_df, search_instance, query)
+
+        use_memory = True
+        chat_history = await io.load_chat_data(db_instance, db_name='lgdb', container_name='lgcontainer', chatid=query['chatid'], chat_session_id = query['chat_session_id'])
+
+        if any(item["type"] == "general-inquiry" for item in preprocessed):
+
+            query['flag'] = "general-inquiry"
+            logger.info("=" * 30 + " General Inquiry " + "=" * 30)
+            logger.info(f" Document search results : {json.dumps(all_data,indent=4,ensure_ascii=False)}")
+            answer = preprocessed[0]['main_text']
+
+            detectLang = answer_language(query)
+
+            body = [{'text': f"{answer}"}]
+
+            trans_response = await io.translate_question(trans_instance, body, detectLang)
+            answer = trans_response[0]['translations'][0]['text']
+
+            EVENT_CODE = preprocessed[0]['file_name']
+            INTENT_CODE = preprocessed[0]['pages']
+            thoughts_process = ""
+            query['eventcd'] = EVENT_CODE
+            query['intent'] = INTENT_CODE
+            query['refined_query'] = ""
+            query["refined_answer"] = ""
+            paa = ""
+            prompt = ""
+            end_time = time.time()
+            IR_time = end_time - start_time
+            refinement_time = 0
+            start_time = time.time()
+
+        else :
+
+            logger.info("=" * 30 + " Start Refinement " + "=" * 30)
+            # Refinement
+            refined_answer, refined_info, refined_query, refined_flag, model_code, prompt = await io.generate_answer(openai_instance, logger=logger, query=query, use_memory=use_memory, chat_history=chat_history, refinement=True)
+
+            if len(query['product_model_code']) != 0:
+                logger.info("=" * 30 + " product model code detected " + "=" * 30)
+                logger.info(f"product_model_code : {query['product_model_code']}")
+            else :
+                if model_code == 'None' :
+                    logger.info("=" * 30 + " No product model code detected " + "=" * 30)
+                    query['product_model_code'] = ""
+                else :
+                    logger.info("=" * 30 + " product model code detected " + "=" * 30)
+                    logger.info(f"product_model_code : {model_code}")
+                    query['product_model_code'] = model_code
+
+            query["refined_query"] = refined_query
+            query["refined_answer"] = refined_answer
+            end_time = time.time()
+            refinement_time = end_time - start_time
+            logger.info("=" * 30 + " End Refinement " + "=" * 30)
+            logger.info(f"2nd query : {json.dumps(query,indent=4,ensure_ascii=False)}")
+
+            if "FIX" in refined_flag:
+                start_time = time.time()
+                # query['flag'] = "FIX"
+                query['flag'] = refined_flag
+                logger.info("=" * 30 + " Create fixed answer " + "=" * 30)
+                documents, thoughts_process, paa, all_data, query, preprocessed, answer = await io.run(refinement_flag, trans_instance, query)
+                query['intent'] = "FIX"
+                IR_time = 0
+
+            else :
+
+                logger.info("=" * 30 + " Start AI Search " + "=" * 30)
+                # Search related documents
+                start_time = time.time()
+                product_mst = await io.read_file(as_instance_raw, 'Contents_Manual_List_Mst_Data/PRODUCT_MST.csv')
+
+                if query['product_code'] == 'W/M' :
+                    query['product_code'] = 'WM'
+
+                if query['product_group_code'] == 'REF' or query['product_group_code'] == 'TV' or query['product_group_code'] == 'WM':
+                    query['product_code'] = ""
+
+                filter_df, _ = product_filter(product_mst, query)
+
+                # 대화 이력이 없는 질문은 이전 답변 재사용 ( refined query embedding 유사도 )
+                cached = None
+                if use_answer_cache(chat_history) :
+                    cache_vector, cached = await io.lookup_answer_cache(search_instance, query)
+
+                if cached is not None :
+                    preprocessed, documents, all_data, search_time, answer_dict, thoughts_process = await io.run(restore_cached_answer, trans_instance, query, cached)
+                    end_time = time.time()
+                    IR_time = end_time - start_time
+                    start_time = time.time()
+                    logger.info(f"Document search results ( answer cache ) : {json.dumps(all_data,indent=4,ensure_ascii=False)}")
+
+                else :
+                    preprocessed, documents, all_data, search_time = await io.search_documents(filter_df, search_instance, query)
+                    end_time = time.time()
+                    IR_time = end_time - start_time
+                    logger.info(f"Embedding cache : {search_instance.embedding_cache_stats()}")
+
+                    start_time = time.time()
+
+                    logger.info(f"Document search results : {json.dumps(all_data,indent=4,ensure_ascii=False)}")
+                    answer_dict, thoughts_process = await io.generate_answer(openai_instance, logger=logger, query=query, use_memory=use_memory, chat_history=chat_history, refinement=False, documents=documents)
+
+                    if use_answer_cache(chat_history) :
+                        store_answer_cache(query, cache_vector, IR_time + time.time() - start_time, preprocessed, documents, all_data, answer_dict, thoughts_process)
+
+                logger.info("=" * 30 + " Start Generating Answers " + "=" * 30)
+
+                if answer_dict["solution"] != "Yes":
+                    answer, paa, preprocessed = await io.run(answer_solution_flag, trans_instance, query, answer_dict)
+                    all_data['result'] = preprocessed
+                    query['intent'] = "FIX"
+
+                else:
+                    answer, paa = answer_dict["response"], answer_dict["additional_questions"]
+                    answer = await io.run(preprocess_answer, trans_instance, query, answer, preprocessed, refined_info)
+                    query['intent'] = "RAG"
+
+                logger.info(f"Answer : {answer}")
+                query['flag'] = "RAG"
+                query['eventcd'] = "RAG"
+
+        # Prompt replace (for display)
+        thoughts_process = preprocess_thoughts_process(thoughts_process, documents, query, chat_history, answer)
+        end_time = time.time()
+        answer_time = end_time - start_time
+        time_info = {"IR" : IR_time,
+                "Refinement" : refinement_time,
+                "answer" : answer_time,
+                "total" : IR_time+refinement_time+answer_time,
+                "IR_detail" : search_time}
+
+        logger.info("=" * 30 + " Make Final Output " + "=" * 30)
+        # Create the final output
+        output = await io.run(preprocess_output_data, trans_instance, preprocessed, query, thoughts_process, answer, paa, time_info, prompt, gpt_model, all_data)
+
+        logger.info(f"Final Output : {output}")
+        logger.info(f"MySQL pool : {mysql_pool_stats()}")
+        logger.info(f"Deployment scheduler : {deployment_scheduler.stats()}")
+        logger.info(f"Request timings : {request_context.timings}")
+        logger.info(f"Answer cache : {answer_cache.stats()}")
+        logger.info(f"Admission : {admission_controller.stats()}")
+        upload_request_log(as_instance_log, log_buffer, query, "log")
+
+    except (AdmissionRejected, OpenAIResourceError) as e:
+
+        logger.error(str(e))
+        error_contents = f"{type(e).__name__} : '{e}'"
+        logger.error(error_contents)
+        if isinstance(e, OpenAIResourceError) :
+            logger.error(traceback.format_exc())
+            overloaded = True
+        else :
+            logger.info(f"Admission : {admission_controller.stats()}")
+
+        try :
+            # 사전 번역된 과부하 응답 ( 언어 감지 / 번역 호출 없음, 감지 전이면 사용자 선택 언어 )
+            trans_error_answer = trans_instance.fixed_answer(OVERLOAD_ANSWER, answer_language(query))
+            trans_error_answer = trans_error_answer.replace("\n","<br>")
+        except :
+            trans_error_answer = APOLOGY_ANSWER
+
+        output = make_error_result(trans_error_answer)
+        logger.info(f"Final Output : {output}")
+        upload_request_log(as_instance_log, log_buffer, query, "error_log")
+
+    except Exception as e :
+        logger.error(str(e))
+        logger.error(traceback.format_exc())
+        error_contents = f"{type(e).__name__} : '{e}'"
+        logger.error(error_contents)
+
+        try:
+            # 이미 감지된 경우 재사용
+            if 'trans_language' not in query :
+                body = [{'text': query['question']}]
+                detect_output = await io.detect_language(trans_instance, body)
+                query['trans_language_code'] = detect_output[0]['language'].split('-')[0]
+                query['trans_language_code_score'] = detect_output[0]['score']
+                language = master_data.get_language_name(query['trans_language_code'])
+                query['trans_language'] = language
+        except :
+            query['trans_language_code'] = query['user_selected_language_code']
+            query['trans_language_code_score'] = 1.0
+            query['trans_language'] = query['user_selected_language']
+        try :
+            body = [{'text': APOLOGY_ANSWER}]
+            trans_error_answer_response = await io.translate_question(trans_instance, body, answer_language(query), language_from='en')
+            trans_error_answer = trans_error_answer_response[0]['translations'][0]['text']
+            trans_error_answer = trans_error_answer.replace("\n","<br>")
+        except :
+            trans_error_answer = APOLOGY_ANSWER
+
+        output = make_error_result(trans_error_answer)
+        logger.info(f"Final Output : {output}")
+        upload_request_log(as_instance_log, log_buffer, query, "error_log")
+
+    finally:
+        logger.info("=" * 30 + f" End {io.name} API " + "=" * 30)
+        if admission_ticket is not None :
+            llm_times = [request_context.timings[name] for name in ("llm_refinement", "llm_answer") if name in request_context.timings]
+            admission_controller.release(admission_ticket, latency=sum(llm_times) if llm_times else None, overloaded=overloaded)
+        end_log_buffer(log_buffer)
+        end_trace(trace, chatid=query['chatid'], chat_session_id=query['chat_session_id'], rag_order=query['rag_order'], index_name=query.get('index_name', ''))
+        end_request_context(request_context)
+
+    return func.HttpResponse(body=output,
+                    mimetype="application/json",
+                    status_code=200)
@@ -0,0 +1,49 @@
+import atexit
+import hashlib
+import inspect
+import threading
+import logging
+logger = logging.getLogger(__name__)
+
+class ClientRegistry:
+    def __init__(self):
+        self.clients = {}
+        self.lock = threading.Lock()
+
+    # (service, key) 당 하나의 client 만 생성하여 프로세스 전체에서 공유
+    def get(self, service, key, factory):
+        registry_key = (service, key)
+        client = self.clients.get(registry_key)
+        if client is not None:
+            return client
+
+        with self.lock:
+            client = self.clients.get(registry_key)
+            if client is None:
+                client = factory()
+                self.clients[registry_key] = client
+                logger.info(f"Client created : {service}")
+        return client
+
+    def close_all(self):
+        with self.lock:
+            clients, self.clients = self.clients, {}
+
+        for (service, key), client in clients.items():
+            try:
+                if hasattr(client, 'close'):
+                    result = client.close()
+                    # aio client 는 event loop 종료 후 close 불가 -> coroutine 정리만
+                    if inspect.iscoroutine(result):
+                        result.close()
+                elif hasattr(client, '__exit__'):
+                    client.__exit__(None, None, None)
+            except Exception as e:
+                logger.error(f"Client close error : {service} - {e}")
+
+# key 변경(rotation) 시 새 client 를 만들기 위한 식별값 ( key 원문은 registry key 에 남기지 않음 )
+def fingerprint(secret):
+    return hashlib.sha256(str(secret).encode('utf-8')).hexdigest()[:16]
+
+client_registry = ClientRegistry()
+atexit.register(client_registry.close_all)
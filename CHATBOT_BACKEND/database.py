@@ -1,27 +1,69 @@
 from azure.storage.blob import BlobServiceClient, generate_blob_sas, BlobSasPermissions, ContentSettings, generate_container_sas, ContainerSasPermissions
 from azure.core.exceptions import *
+from azure.core import MatchConditions
 from azure.storage.fileshare import ShareServiceClient, ShareClient, ShareFileClient
 
+from azure.storage.blob.aio import BlobServiceClient as AsyncBlobServiceClient
+
 from azure.cosmos import CosmosClient, PartitionKey
+from azure.cosmos.aio import CosmosClient as AsyncCosmosClient
 from azure.cosmos.exceptions import *
 
 import mysql.connector
 from mysql.connector import Error
+from mysql.connector.errors import PoolError
 
 import yaml
+import asyncio
 import datetime
+import time
+import threading
 import io
 import pandas as pd
 import json
 from dateutil import parser
 from credential import keyvault_values
+from cache import TTLCache
+from clients import client_registry
+from tracing import traced
 import logging
 logger = logging.getLogger(__name__)
 
+# read_file 캐시 ( key : (account_name, container_name, file_path, sheet_name) )
+BLOB_CACHE = TTLCache(maxsize=256, ttl=None)
+# 캐시 재검증 주기 (초) : 이 시간 이후에는 ETag 조건부 요청으로 변경 여부 확인
+BLOB_CACHE_FRESHNESS = 300
+# 존재하지 않는 blob 캐시 유지 시간 (초)
+BLOB_CACHE_NEGATIVE_TTL = 60
+# 검색 결과 본문 캐시 ( documents 컨테이너 : 전처리 실행 시에만 변경 )
+DOCUMENT_CACHE = TTLCache(maxsize=4096, ttl=None)
+DOCUMENT_CACHE_FRESHNESS = 600
+# SAS URL 캐시 ( key : (account_name, container_name, blob_path, permission, expiry_time) )
+SAS_CACHE = TTLCache(maxsize=4096, ttl=None)
+# 만료까지 남은 시간이 유효 기간의 이 비율 ( 최소 SAS_CACHE_MIN_MARGIN 초 ) 보다 적어지면 재발급
+SAS_CACHE_MARGIN_RATIO = 0.5
+SAS_CACHE_MIN_MARGIN = 300
+# 매뉴얼 뷰어 ( $web html ) 용 읽기 전용 권한
+VIEWER_SAS_PERMISSION = BlobSasPermissions(read=True)
+
+# 캐시 유지 시간 : 만료 없는 SAS 는 계속 재사용, 나머지는 만료 전 여유 시간을 두고 재발급
+def sas_cache_ttl(start_time_utc, expiry_time_utc, expiry_time=True):
+    if not expiry_time:
+        return None
+    lifetime = (expiry_time_utc - start_time_utc).total_seconds()
+    margin = max(SAS_CACHE_MIN_MARGIN, lifetime * SAS_CACHE_MARGIN_RATIO)
+    remaining = (expiry_time_utc - datetime.datetime.now(datetime.timezone.utc)).total_seconds()
+    return max(0, remaining - margin)
+
 class AzureStorage:
 
-    def __init__(self, container_name='sample-data', storage_type = None):
+    def __init__(self, container_name='sample-data', storage_type = None, use_cache=False, cache_freshness=BLOB_CACHE_FRESHNESS, cache=None):
     
+        self.use_cache = use_cache
+        self.storage_type = storage_type
+        self.cache_freshness = cache_freshness
+        self.cache = cache if cache is not None else BLOB_CACHE
+
         if storage_type == 'docst' :
 
             self.account_key = keyvault_values["storage-doc-account-key"]
@@ -39,47 +81,157 @@ class AzureStorage:
 
         if storage_type == 'log' :
 
-            self.log_service_client = ShareServiceClient.from_connection_string(self.account_str)
-            self.log_share_client = self.log_service_client.get_share_client(container_name)
+            self.log_service_client = client_registry.get("file-share", self.account_name,
+                                                          lambda: ShareServiceClient.from_connection_string(self.account_str))
+            self.log_share_client = client_registry.get("file-share-client", (self.account_name, container_name),
+                                                        lambda: self.log_service_client.get_share_client(container_name))
 
         else :
-            # client 초기화
-            self.blob_service_client = BlobServiceClient.from_connection_string(self.account_str)
+            # client 초기화 ( 계정/컨테이너 별 client 는 registry 에서 공유 )
+            self.blob_service_client = client_registry.get("blob", self.account_name,
+                                                           lambda: BlobServiceClient.from_connection_string(self.account_str))
             self.container_name = container_name
             try : 
-                self.container_client = self.blob_service_client.get_container_client(self.container_name)
+                self.container_client = client_registry.get("blob-container", (self.account_name, self.container_name),
+                                                            lambda: self.blob_service_client.get_container_client(self.container_name))
                 logger.info(f"Container connection completed \nContainer name : {container_name}")
             
             except Exception as e :
                 logger.error(f"Container connection error \nContainer name : {container_name} \nError message : {str(e)}")
 
-    def read_file(self, file_path, sheet_name=None):
+    @traced("AzureStorage.read_file")
+    def read_file(self, file_path, sheet_name=None, use_cache=None):
         logger.info("###### Function Name : read_file")
+        if use_cache is None:
+            use_cache = self.use_cache
+        if use_cache:
+            return self.read_file_cached(file_path, sheet_name)
+
         try:
             file_client = self.container_client.get_blob_client(file_path)
+            file = self.parse_file(file_path, file_client.download_blob().readall(), sheet_name)
+            logger.info(f"File load completed \nPath : {file_path}")
+            return file
 
-            if file_path.split('.')[-1] == 'xlsx' or file_path.split('.')[-1] == 'csv':
-                with io.BytesIO() as blob_io:
-                    file_client.download_blob().readinto(blob_io)
-                    blob_io.seek(0)
-                    if file_path.split('.')[-1] == 'xlsx' : 
-                        file = pd.read_excel(blob_io, sheet_name=sheet_name if sheet_name is not None else 0)
-                    else :
-                        file = pd.read_csv(blob_io)
-                logger.info(f"File load completed \nPath : {file_path}")
-                return file
-            
-            elif file_path.split('.')[-1] == 'pdf' or file_path.split('.')[-1] == 'json':
-                download = file_client.download_blob()
-                file = io.BytesIO(download.readall())
-                logger.info(f"File load completed \nPath : {file_path}")
-                return file
-            
+        except Exception as e:
+            logger.error(f"File load error \nPath : {file_path} \nError message : {str(e)}")
+            return None
+
+    def parse_file(self, file_path, data, sheet_name=None):
+        if file_path.split('.')[-1] == 'xlsx' or file_path.split('.')[-1] == 'csv':
+            with io.BytesIO(data) as blob_io:
+                if file_path.split('.')[-1] == 'xlsx' : 
+                    file = pd.read_excel(blob_io, sheet_name=sheet_name if sheet_name is not None else 0)
+                else :
+                    file = pd.read_csv(blob_io)
+            return file
+        
+        elif file_path.split('.')[-1] == 'pdf' or file_path.split('.')[-1] == 'json':
+            return io.BytesIO(data)
+        
+        else:
+            return data.decode("utf-8")
+
+    # 캐시된 객체는 호출마다 새로 감싸서 반환 ( BytesIO 위치, DataFrame 변경이 캐시에 영향 주지 않도록 )
+    def cached_value(self, entry):
+        value = entry['value']
+        if value is None:
+            return None
+        if isinstance(value, bytes):
+            return io.BytesIO(value)
+        if isinstance(value, pd.DataFrame):
+            return value.copy()
+        if isinstance(value, dict):
+            return {key: item.copy() if isinstance(item, pd.DataFrame) else item for key, item in value.items()}
+        return value
+
+    def cache_key(self, file_path, sheet_name=None):
+        return (self.account_name, self.container_name, file_path, str(sheet_name))
+
+    def is_fresh(self, entry, now):
+        freshness = BLOB_CACHE_NEGATIVE_TTL if entry['etag'] is None else self.cache_freshness
+        return now - entry['checked_time'] < freshness
+
+    def store_file(self, key, file_path, data, etag, sheet_name, now):
+        file = self.parse_file(file_path, data, sheet_name)
+        value = data if isinstance(file, io.BytesIO) else file
+        self.cache.set(key, {"etag": etag, "value": value, "checked_time": now})
+        logger.info(f"File load completed \nPath : {file_path}")
+        return self.cached_value({"value": value})
+
+    def read_file_cached(self, file_path, sheet_name=None):
+        key = self.cache_key(file_path, sheet_name)
+        found, entry = self.cache.get(key)
+        now = time.time()
+
+        if found and self.is_fresh(entry, now):
+            logger.info(f"File cache hit \nPath : {file_path}")
+            return self.cached_value(entry)
+
+        try:
+            file_client = self.container_client.get_blob_client(file_path)
+
+            if found and entry['etag'] is not None:
+                try:
+                    download = file_client.download_blob(etag=entry['etag'], match_condition=MatchConditions.IfModified)
+                except HttpResponseError as e:
+                    if e.status_code != 304:
+                        raise
+                    self.cache.set(key, dict(entry, checked_time=now))
+                    logger.info(f"File not modified \nPath : {file_path}")
+                    return self.cached_value(entry)
             else:
                 download = file_client.download_blob()
-                downloaded_bytes = download.readall()
-                logger.info(f"File load completed \nPath : {file_path}")
-                return downloaded_bytes.decode("utf-8")
+
+            return self.store_file(key, file_path, download.readall(), download.properties.etag, sheet_name, now)
+
+        except ResourceNotFoundError as e:
+            self.cache.set(key, {"etag": None, "value": None, "checked_time": now})
+            logger.error(f"File load error \nPath : {file_path} \nError message : {str(e)}")
+            return None
+
+        except Exception as e:
+            logger.error(f"File load error \nPath : {file_path} \nError message : {str(e)}")
+            return None
+
+    # async 조회 ( chat_async ) : read_file_cached 와 같은 캐시 사용, aio client 는 event loop 별로 공유
+    def get_async_container_client(self):
+        blob_service_client = client_registry.get("blob-aio", (self.account_name, id(asyncio.get_running_loop())),
+                                                  lambda: AsyncBlobServiceClient.from_connection_string(self.account_str))
+        return blob_service_client.get_container_client(self.container_name)
+
+    @traced("AzureStorage.aread_file")
+    async def aread_file(self, file_path, sheet_name=None):
+        logger.info("###### Function Name : aread_file")
+        key = self.cache_key(file_path, sheet_name)
+        found, entry = self.cache.get(key)
+        now = time.time()
+
+        if found and self.is_fresh(entry, now):
+            logger.info(f"File cache hit \nPath : {file_path}")
+            return self.cached_value(entry)
+
+        try:
+            file_client = self.get_async_container_client().get_blob_client(file_path)
+
+            if found and entry['etag'] is not None:
+                try:
+                    download = await file_client.download_blob(etag=entry['etag'], match_condition=MatchConditions.IfModified)
+                except HttpResponseError as e:
+                    if e.status_code != 304:
+                        raise
+                    self.cache.set(key, dict(entry, checked_time=now))
+                    logger.info(f"File not modified \nPath : {file_path}")
+                    return self.cached_value(entry)
+            else:
+                download = await file_client.download_blob()
+
+            return self.store_file(key, file_path, await download.readall(), download.properties.etag, sheet_name, now)
+
+        except ResourceNotFoundError as e:
+            self.cache.set(key, {"etag": None, "value": None, "checked_time": now})
+            logger.error(f"File load error \nPath : {file_path} \nError message : {str(e)}")
+            return None
 
         except Exception as e:
             logger.error(f"File load error \nPath : {file_path} \nError message : {str(e)}")
@@ -121,6 +273,7 @@ class AzureStorage:
 
         return logger.info(f"File upload completed, Path: {directory_name+'/'+file_name}")
         
+    @traced("AzureStorage.upload_file")
     def upload_file(self, data, file_path, content_type=None, overwrite=False):
         logger.info("###### Function Name : upload_file")
         try:
@@ -151,25 +304,35 @@ class AzureStorage:
     def upload_log(self, data, file_path, content_type=None):
         logger.info("###### Function Name : upload_log")
         try:
-            content_settings = None
-            if content_type is not None:
-                content_settings = ContentSettings(content_type=content_type)
+            blob_client = self.append_log(data, file_path, content_type)
+            return logger.info(f"File upload completed, Path: {blob_client.url}")
+        except Exception as e:
+            logger.error(f"Failed to upload file: {str(e)}")
+            return None
+
+    # append blob 에 추가 ( 실패 시 예외 -> write-behind 재시도 )
+    @traced("AzureStorage.append_log")
+    def append_log(self, data, file_path, content_type=None):
+        content_settings = None
+        if content_type is not None:
+            content_settings = ContentSettings(content_type=content_type)
 
-            # BlobClient를 사용하여 append blob 관련 작업을 수행합니다.
-            blob_client = self.container_client.get_blob_client(blob=file_path)
+        # BlobClient를 사용하여 append blob 관련 작업을 수행합니다.
+        blob_client = self.container_client.get_blob_client(blob=file_path)
 
-            # Append blob이 존재하지 않으면 새로 생성합니다.
-            if not blob_client.exists():
+        # Append blob이 존재하지 않으면 새로 생성합니다. ( 동시 생성 시 ResourceExistsError 무시 )
+        if not blob_client.exists():
+            try:
                 blob_client.create_append_blob(content_settings=content_settings)
                 logger.info("Created new append blob.")
+            except ResourceExistsError:
+                pass
 
-            # 데이터를 append blob에 추가합니다.
-            blob_client.append_block(data)
-            return logger.info(f"File upload completed, Path: {blob_client.url}")
-        except Exception as e:
-            logger.error(f"Failed to upload file: {str(e)}")
-            return None
+        # 데이터를 append blob에 추가합니다.
+        blob_client.append_block(data)
+        return blob_client
 
+    @traced("AzureStorage.get_sas_url_container")
     def get_sas_url_container(self, expiry_time=True) :
         
         logger.info("###### Function Name : get_sas_url")
@@ -187,16 +350,17 @@ class AzureStorage:
             start_time_utc = start_time_kst.astimezone(datetime.timezone.utc)
             expiry_time_utc = datetime.datetime(9999, 12, 31)
 
+        permission = ContainerSasPermissions(read=True, write=True, delete=True, list=True)
+        key = (self.account_name, self.container_name, None, str(permission), expiry_time)
         try: 
-            sas_token = generate_container_sas(
+            sas_url = SAS_CACHE.get_or_load(key, lambda: f"https://{self.account_name}.blob.core.windows.net/{self.container_name}?" + generate_container_sas(
                 account_name=self.account_name,
                 container_name=self.container_name,
                 account_key=self.account_key,
-                permission=ContainerSasPermissions(read=True, write=True, delete=True, list=True),
+                permission=permission,
                 start=start_time_utc,
                 expiry=expiry_time_utc  # 20분 동안 유효
-            )
-            sas_url = f"https://{self.account_name}.blob.core.windows.net/{self.container_name}?{sas_token}"
+            ), ttl=sas_cache_ttl(start_time_utc, expiry_time_utc, expiry_time))
             logger.info(f"SAS URL issued completed \nUrl: {sas_url}")
             return sas_url
 
@@ -205,10 +369,13 @@ class AzureStorage:
             logger.error(f"SAS URL issued error \nUrl: {sas_url} \nError message: {str(e)}")
             return None  
     
-    def get_sas_url(self, blob_path, expiry_time=True) :
+    @traced("AzureStorage.get_sas_url")
+    def get_sas_url(self, blob_path, expiry_time=True, permission=None) :
         
         logger.info("###### Function Name : get_sas_url")
         blob_client = self.container_client.get_blob_client(blob_path)
+        if permission is None :
+            permission = BlobSasPermissions(read=True, write=True, delete=True, add=True, create=True, update=True, process=True)
         if expiry_time :
             kst = datetime.timezone(datetime.timedelta(hours=9))
             start_time_kst = datetime.datetime.now(kst) - datetime.timedelta(minutes=5)
@@ -223,17 +390,18 @@ class AzureStorage:
             start_time_utc = start_time_kst.astimezone(datetime.timezone.utc)
             expiry_time_utc = datetime.datetime(9999, 12, 31)
 
+        # 같은 blob / 권한은 만료 전까지 발급된 SAS 재사용
+        key = (self.account_name, self.container_name, blob_path, str(permission), expiry_time)
         try: 
-            sas_token = generate_blob_sas(
+            sas_url = SAS_CACHE.get_or_load(key, lambda: blob_client.url + '?' + generate_blob_sas(
                 account_name=self.account_name,
                 account_key=self.account_key,
                 container_name=self.container_name,
                 blob_name=blob_path,
-                permission=BlobSasPermissions(read=True, write=True, delete=True, add=True, create=True, update=True, process=True),
+                permission=permission,
                 start=start_time_utc,
                 expiry=expiry_time_utc                  
-            )
-            sas_url = blob_client.url + '?' + sas_token
+            ), ttl=sas_cache_ttl(start_time_utc, expiry_time_utc, expiry_time))
             logger.info(f"SAS URL issued completed \nUrl: {blob_client.url}")
             return sas_url
 
@@ -278,7 +446,7 @@ class CosmosDB:
         self.key = keyvault_values["cosmosdb-key"]
 
         # client 초기화
-        self.client = CosmosClient(self.url, credential=self.key)
+        self.client = client_registry.get("cosmos", self.url, lambda: CosmosClient(self.url, credential=self.key))
     
     def create_database(self, database_name):
         logger.info("###### Function Name : create_database")
@@ -320,6 +488,7 @@ class CosmosDB:
             logger.info(f"Container ( {database_name} ) does not exist.") 
 
     # data 저장
+    @traced("CosmosDB.upload_data")
     def upload_data(self, database_name, container_name, data):
         logger.info("###### Function Name : upload_data")
         try : 
@@ -330,6 +499,20 @@ class CosmosDB:
         except Error as e :
             return logger.error(str(e))
 
+    # data 일괄 저장 ( write-behind ) : id 가 고정이므로 재시도 시 중복 없이 upsert, 실패한 item 만 반환
+    @traced("CosmosDB.upsert_items")
+    def upsert_items(self, database_name, container_name, items):
+        database = self.client.get_database_client(database_name)
+        container = database.get_container_client(container_name)
+        failed = []
+        for item in items:
+            try :
+                container.upsert_item(body=item)
+            except Exception as e :
+                logger.error(f"Item upsert error : {item.get('id')} - {e}")
+                failed.append(item)
+        return failed
+
     # data 삭제 ( item_value : id의 value, partition_key_value : /chatid value)
     def delete_data(self, database_name, container_name, item_value, partition_key_value):
         logger.info("###### Function Name : delete_data")
@@ -339,6 +522,7 @@ class CosmosDB:
         container.delete_item(item=item_value,partition_key=partition_key_value)
         return logger.info("Data deletion complete")
     
+    @traced("CosmosDB.read_data")
     def read_data(self, database_name, container_name, user_id, chat_session_id) :
         logger.info("###### Function Name : read_data")
 
@@ -355,6 +539,249 @@ class CosmosDB:
             logger.error(f"Error: {e}")
         
         return result
+
+    # 대화 turn 조회 : chatid partition 내 조회 + 필요한 필드만, after_order 이후 turn 만 ( 증분 조회 )
+    def chat_turn_query(self, user_id, chat_session_id, after_order=None):
+        query = "SELECT c.chat_order, c.chat_role, c.message FROM c WHERE c.chatid = @chatid and c.chat_session_id = @chat_session_id"
+        parameters = [{"name": "@chatid", "value": user_id},
+                      {"name": "@chat_session_id", "value": int(chat_session_id)}]
+        if after_order is not None:
+            query += " and c.chat_order > @after_order"
+            parameters.append({"name": "@after_order", "value": after_order})
+        return query, parameters
+
+    @traced("CosmosDB.read_chat_turns")
+    def read_chat_turns(self, database_name, container_name, user_id, chat_session_id, after_order=None) :
+        logger.info("###### Function Name : read_chat_turns")
+
+        database = self.client.get_database_client(database_name)
+        container = database.get_container_client(container_name)
+        query, parameters = self.chat_turn_query(user_id, chat_session_id, after_order)
+        try:
+            return list(container.query_items(query, parameters=parameters, partition_key=user_id))
+        except CosmosResourceNotFoundError as e:
+            logger.error(f"Error: {e}")
+            return []
+
+    # async 조회/저장 ( chat_async ) : aio client 는 event loop 별로 공유
+    def get_async_client(self):
+        return client_registry.get("cosmos-aio", (self.url, id(asyncio.get_running_loop())),
+                                   lambda: AsyncCosmosClient(self.url, credential=self.key))
+
+    @traced("CosmosDB.aread_data")
+    async def aread_data(self, database_name, container_name, user_id, chat_session_id) :
+        logger.info("###### Function Name : aread_data")
+
+        result = []
+        container = self.get_async_client().get_database_client(database_name).get_container_client(container_name)
+        try:
+            query = f"SELECT * FROM c WHERE c.chatid = '{user_id}' and c.chat_session_id = {chat_session_id}"
+
+            async for item in container.query_items(query):
+                result.append(item)
+        except CosmosResourceNotFoundError as e:
+            logger.error(f"Error: {e}")
+        
+        return result
+
+    @traced("CosmosDB.aread_chat_turns")
+    async def aread_chat_turns(self, database_name, container_name, user_id, chat_session_id, after_order=None) :
+        logger.info("###### Function Name : aread_chat_turns")
+
+        result = []
+        container = self.get_async_client().get_database_client(database_name).get_container_client(container_name)
+        query, parameters = self.chat_turn_query(user_id, chat_session_id, after_order)
+        try:
+            async for item in container.query_items(query, parameters=parameters, partition_key=user_id):
+                result.append(item)
+        except CosmosResourceNotFoundError as e:
+            logger.error(f"Error: {e}")
+        
+        return result
+
+    @traced("CosmosDB.aupload_data")
+    async def aupload_data(self, database_name, container_name, data):
+        logger.info("###### Function Name : aupload_data")
+        try : 
+            container = self.get_async_client().get_database_client(database_name).get_container_client(container_name)
+            await container.create_item(body=data)
+            return logger.info("Data upload completed")   
+        except CosmosHttpResponseError as e :
+            return logger.error(str(e))
+        
+# MySQL connection pool 설정
+MYSQL_POOL_SIZE = 10
+# 커넥션 대기 최대 시간 (초)
+MYSQL_POOL_TIMEOUT = 10
+# 이 시간 이상 유휴 상태였던 커넥션은 재사용 전에 ping 으로 상태 확인 (초)
+MYSQL_POOL_PING_INTERVAL = 60
+
+class PooledConnection:
+    # close() 호출 시 실제 연결을 끊지 않고 pool 로 반환
+    def __init__(self, pool, connection):
+        self.pool = pool
+        self.raw_connection = connection
+        self.released = False
+
+    def close(self):
+        if not self.released:
+            self.released = True
+            self.pool.release(self.raw_connection)
+
+    def is_connected(self):
+        if self.released:
+            return False
+        return self.raw_connection.is_connected()
+
+    def __getattr__(self, name):
+        return getattr(self.raw_connection, name)
+
+class MySqlPool:
+    def __init__(self, config, max_size=MYSQL_POOL_SIZE, timeout=MYSQL_POOL_TIMEOUT):
+        self.config = config
+        self.max_size = max_size
+        self.timeout = timeout
+        self.condition = threading.Condition()
+        self.idle = []
+        self.size = 0
+        self.in_use = 0
+
+        # metrics
+        self.acquire_count = 0
+        self.wait_count = 0
+        self.timeout_count = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.created_count = 0
+        self.discarded_count = 0
+
+    @traced("MySqlPool.acquire")
+    def acquire(self):
+        start_time = time.time()
+        deadline = start_time + self.timeout
+        waited = False
+
+        with self.condition:
+            while True:
+                if self.idle:
+                    connection, last_used = self.idle.pop()
+                    break
+                if self.size < self.max_size:
+                    connection, last_used = None, None
+                    self.size += 1
+                    break
+
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    self.timeout_count += 1
+                    raise PoolError(f"MySQL pool exhausted : {self.in_use}/{self.max_size} in use, waited {self.timeout}s")
+                waited = True
+                self.condition.wait(remaining)
+
+            self.in_use += 1
+            wait_time = time.time() - start_time
+            self.acquire_count += 1
+            self.total_wait_time += wait_time
+            self.max_wait_time = max(self.max_wait_time, wait_time)
+            if waited:
+                self.wait_count += 1
+
+        try:
+            if connection is None:
+                connection = self.connect()
+            elif time.time() - last_used > MYSQL_POOL_PING_INTERVAL:
+                try:
+                    connection.ping(reconnect=False)
+                except Exception as e:
+                    logger.info(f"Stale MySQL connection discarded : {e}")
+                    self.close_quietly(connection)
+                    with self.condition:
+                        self.discarded_count += 1
+                    connection = self.connect()
+
+        except Exception:
+            with self.condition:
+                self.size -= 1
+                self.in_use -= 1
+                self.condition.notify()
+            raise
+
+        return PooledConnection(self, connection)
+
+    def connect(self):
+        connection = mysql.connector.connect(**self.config)
+        with self.condition:
+            self.created_count += 1
+        return connection
+
+    def release(self, connection):
+        # 트랜잭션 종료 ( 유휴 커넥션이 오래된 snapshot 을 유지하지 않도록 )
+        healthy = True
+        try:
+            if connection.unread_result:
+                connection.consume_results()
+            if connection.in_transaction:
+                connection.rollback()
+        except Exception as e:
+            logger.info(f"Broken MySQL connection discarded : {e}")
+            healthy = False
+
+        if not healthy:
+            self.close_quietly(connection)
+
+        with self.condition:
+            self.in_use -= 1
+            if healthy:
+                self.idle.append((connection, time.time()))
+            else:
+                self.size -= 1
+                self.discarded_count += 1
+            self.condition.notify()
+
+    def close_quietly(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def close_all(self):
+        with self.condition:
+            idle, self.idle = self.idle, []
+            self.size -= len(idle)
+        for connection, last_used in idle:
+            self.close_quietly(connection)
+
+    def stats(self):
+        with self.condition:
+            return {"max_size": self.max_size,
+                    "size": self.size,
+                    "in_use": self.in_use,
+                    "idle": len(self.idle),
+                    "utilisation": self.in_use / self.max_size,
+                    "acquire_count": self.acquire_count,
+                    "wait_count": self.wait_count,
+                    "timeout_count": self.timeout_count,
+                    "avg_wait_time": self.total_wait_time / self.acquire_count if self.acquire_count else 0.0,
+                    "max_wait_time": self.max_wait_time,
+                    "created_count": self.created_count,
+                    "discarded_count": self.discarded_count}
+
+mysql_pools = {}
+mysql_pools_lock = threading.Lock()
+
+def get_mysql_pool(config):
+    key = (config['host'], config['user'], config['database'])
+    with mysql_pools_lock:
+        pool = mysql_pools.get(key)
+        if pool is None:
+            pool = MySqlPool(config)
+            mysql_pools[key] = pool
+        return pool
+
+def mysql_pool_stats():
+    with mysql_pools_lock:
+        pools = dict(mysql_pools)
+    return {f"{key[0]}/{key[2]}": pool.stats() for key, pool in pools.items()}
         
 class MySql:
     def __init__(self, database_name='lgchatbot'):
@@ -363,23 +790,36 @@ class MySql:
         self.user = keyvault_values["mysql-user"]
         self.password = keyvault_values["mysql-password"]
         self.database = database_name
+        self._connection = None
         
-        try :
-            config = {
-            'user': self.user,
-            'password': self.password,
-            'host': self.host,
-            'database': self.database,
-            'ssl_verify_identity': True,  # 인증서 신뢰 여부 설정
-            'ssl_ca': './config/DigiCertGlobalRootCA.crt.pem'  # CA 인증서 파일 경로 설정
-            }
-
-            # Azure MySQL에 연결
-            self.connection = mysql.connector.connect(**config)
-            
-        except Error as e:
-            logger.error(f"Database connection error : {e}")
-
+        config = {
+        'user': self.user,
+        'password': self.password,
+        'host': self.host,
+        'database': self.database,
+        'ssl_verify_identity': True,  # 인증서 신뢰 여부 설정
+        'ssl_ca': './config/DigiCertGlobalRootCA.crt.pem'  # CA 인증서 파일 경로 설정
+        }
+
+        # Azure MySQL 커넥션은 pool 에서 빌려서 사용 ( connection.close() 시 pool 로 반환 )
+        self.pool = get_mysql_pool(config)
+
+    @property
+    def connection(self):
+        if self._connection is None or self._connection.released:
+            try:
+                self._connection = self.pool.acquire()
+            except Error as e:
+                logger.error(f"Database connection error : {e}")
+                raise
+        return self._connection
+
+    def __del__(self):
+        connection = getattr(self, '_connection', None)
+        if connection is not None:
+            connection.close()
+
+    @traced("MySql.get_table")
     def get_table(self, query, parameters=None):
         logger.info("###### Function Name : get_table")
         try:
@@ -408,6 +848,7 @@ class MySql:
             if self.connection:
                 self.connection.close()
 
+    @traced("MySql.insert_data")
     def insert_data(self, query, parameters=None):
         
         logger.info("###### Function Name : insert_data")
@@ -424,6 +865,58 @@ class MySql:
                 cursor.close()
                 self.connection.close()
 
+    # 일괄 INSERT ( write-behind ) : 하나의 트랜잭션으로 실행, 실패 시 rollback 후 행 단위로 INSERT
+    # 반환 : INSERT 되지 않은 parameters 목록 ( 잘못된 행만 재시도 )
+    @traced("MySql.insert_many")
+    def insert_many(self, query, parameters_list):
+        logger.info("###### Function Name : insert_many")
+        connection = self.connection
+        cursor = connection.cursor()
+        try :
+            try :
+                cursor.executemany(query, parameters_list)
+                connection.commit()
+                logger.info(f"Data inserted successfully : {len(parameters_list)} rows")
+                return []
+            except Exception as e :
+                connection.rollback()
+                logger.error(f"Batch insert error, inserting row by row : {len(parameters_list)} rows - {type(e).__name__} : {e}")
+
+            failed = []
+            for parameters in parameters_list :
+                try :
+                    cursor.execute(query, parameters)
+                    connection.commit()
+                except Exception as e :
+                    logger.error(f"Row insert error : {type(e).__name__} : {e}")
+                    failed.append(parameters)
+                    try :
+                        connection.rollback()
+                    except Exception :
+                        pass
+            logger.info(f"Data inserted row by row : {len(parameters_list) - len(failed)} rows, failed {len(failed)} rows")
+            return failed
+        finally:
+            cursor.close()
+            connection.close()
+
+    # 일괄 UPDATE ( evaluation ) : insert_many 와 같이 하나의 트랜잭션으로 실행
+    @traced("MySql.update_many")
+    def update_many(self, query, parameters_list):
+        logger.info("###### Function Name : update_many")
+        connection = self.connection
+        cursor = connection.cursor()
+        try :
+            cursor.executemany(query, parameters_list)
+            connection.commit()
+            logger.info(f"Data updated successfully : {len(parameters_list)} rows")
+        except Exception :
+            connection.rollback()
+            raise
+        finally:
+            cursor.close()
+            connection.close()
+
 
 
     
\ No newline at end of file
@@ -10,8 +10,9 @@ from datetime import datetime, timezone
 def main(req: func.HttpRequest) -> func.HttpResponse:
 
     from database import AzureStorage
-    from log_others import setup_logger, thread_local
+    from log_others import setup_logger, start_log_buffer, end_log_buffer
     logger = setup_logger()
+    log_buffer = start_log_buffer()
 
     as_instance_log = AzureStorage(container_name='logs', storage_type='datast')
     if not credential.keyvault_values:
@@ -77,7 +78,7 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
         now = datetime.now(korea_timezone)
         formatted_date = now.strftime('%Y%m%d')
         formatted_datetime = now.strftime('%Y%m%d_%H%M')
-        logs_str = "\n".join(thread_local.log_list)
+        logs_str = log_buffer.getvalue()
         log_file_path = f"detectapi/log/{formatted_date}/{formatted_datetime}.log"
         as_instance_log.upload_log(logs_str, file_path=log_file_path)
     
@@ -93,10 +94,11 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
         now = datetime.now(korea_timezone)
         formatted_date = now.strftime('%Y%m%d')
         formatted_datetime = now.strftime('%Y%m%d_%H%M')
-        logs_str = "\n".join(thread_local.log_list)
+        logs_str = log_buffer.getvalue()
         log_file_path = f"detectapi/error_log/{formatted_date}/{formatted_datetime}.log"
         as_instance_log.upload_log(logs_str, file_path=log_file_path)
 
+    end_log_buffer(log_buffer)
     return func.HttpResponse(body=output,
                     mimetype="application/json",
                     status_code=200)    
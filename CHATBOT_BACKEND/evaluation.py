@@ -0,0 +1,312 @@
+import os
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import pytz
+import logging
+logger = logging.getLogger(__name__)
+
+# tmp_chat_summary_dash GPT_EVAL / EVAL_YN 일괄 평가 ( CHATBOT_BACKEND 에서 python -m evaluation )
+EVALUATION_PROMPT_FILES = {
+    "system": "./config/prompt/evaluation_system.txt",
+    "human": "./config/prompt/evaluation_human.txt",
+}
+EVALUATION_MODEL = "gpt-35-turbo"
+EVALUATION_MAX_TOKENS = 800
+# 평가 프롬프트에 포함할 CONTEXTS 최대 token 수
+EVALUATION_CONTEXT_TOKENS = 6000
+# 결과 저장 ( 행 내용 hash 별 1줄 ) : 재실행 시 checkpoint, 같은 질문/답변/context 는 재평가하지 않음
+EVALUATION_STATE_DIR = os.environ.get("EVALUATION_STATE_DIR", "./evaluation_state")
+# 1K token 당 비용 ( USD, gpt-35-turbo )
+EVALUATION_PRICE = {"prompt": 0.0005, "completion": 0.0015}
+# 요청 실패 시 재시도 : 2, 4, 8 ... 최대 60초 ( jitter 적용 )
+EVALUATION_MAX_ATTEMPTS = 6
+EVALUATION_BACKOFF_BASE = 2
+EVALUATION_BACKOFF_MAX = 60
+RATE_WINDOW = 60
+
+EVALUATION_SELECT_QUERY = """SELECT CHAT_ID, CHAT_SESSION_ID, RAG_ORDER, QUERY_ORI, GPT_ANSWER, CONTEXTS
+                             FROM tmp_chat_summary_dash
+                             WHERE EVAL_YN = 'N' AND CREATE_DATE >= %s AND CREATE_DATE < %s"""
+EVALUATION_UPDATE_QUERY = """UPDATE tmp_chat_summary_dash
+                             SET GPT_EVAL = %s, EVAL_YN = 'Y', UPDATE_DATE = %s, UPDATE_USER = %s
+                             WHERE CHAT_ID = %s AND CHAT_SESSION_ID = %s AND RAG_ORDER = %s"""
+
+# 분당 token / request 한도 ( 최근 60초 사용량 ), 여유가 생길 때까지 대기
+class RateLimiter:
+    def __init__(self, tpm, rpm):
+        self.tpm = tpm
+        self.rpm = rpm
+        self.usage = deque()
+        self.tokens = 0
+        self.condition = threading.Condition()
+        self.waited = 0.0
+
+    def prune(self, now):
+        while self.usage and self.usage[0][0] <= now - RATE_WINDOW:
+            _, tokens = self.usage.popleft()
+            self.tokens -= tokens
+
+    # 예상 token ( prompt + max_tokens ) 을 먼저 차감, 응답 후 record 로 실제 사용량 반영
+    def acquire(self, tokens):
+        tokens = min(tokens, self.tpm)
+        with self.condition:
+            while True:
+                now = time.time()
+                self.prune(now)
+                if self.tokens + tokens <= self.tpm and len(self.usage) < self.rpm:
+                    entry = [now, tokens]
+                    self.usage.append(entry)
+                    self.tokens += tokens
+                    return entry
+                timeout = max(self.usage[0][0] + RATE_WINDOW - now, 0.01)
+                self.condition.wait(timeout=timeout)
+                self.waited += time.time() - now
+
+    def record(self, entry, tokens):
+        with self.condition:
+            if entry[0] > time.time() - RATE_WINDOW:
+                self.tokens += tokens - entry[1]
+                entry[1] = tokens
+            self.condition.notify_all()
+
+# 행 내용 hash ( 질문 / 답변 / context ) -> 평가 결과
+class EvaluationStore:
+    def __init__(self, state_dir=EVALUATION_STATE_DIR):
+        os.makedirs(state_dir, exist_ok=True)
+        self.file_path = os.path.join(state_dir, "evaluations.jsonl")
+        self.results = {}
+        self.lock = threading.Lock()
+        if os.path.exists(self.file_path):
+            with open(self.file_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        item = json.loads(line)
+                        self.results[item["hash"]] = item["evaluation"]
+                    except ValueError:
+                        # 중단 시 마지막 줄이 잘린 경우
+                        continue
+        self.file = open(self.file_path, "a", encoding="utf-8")
+
+    def get(self, key):
+        return self.results.get(key)
+
+    # 1건씩 바로 기록 ( 중단 후 재실행 시 이미 평가한 행은 요청하지 않음 )
+    def put(self, key, evaluation):
+        with self.lock:
+            self.results[key] = evaluation
+            self.file.write(json.dumps({"hash": key, "evaluation": evaluation}, ensure_ascii=False) + "\n")
+            self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+def row_hash(row):
+    content = json.dumps([row['QUERY_ORI'], row['GPT_ANSWER'], row['CONTEXTS']], ensure_ascii=False)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+def retry_delay(attempt, error):
+    # 429 응답의 retry-after 우선
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(retry_after)
+    except (TypeError, ValueError):
+        delay = min(EVALUATION_BACKOFF_BASE * (2 ** attempt), EVALUATION_BACKOFF_MAX)
+        return delay * random.uniform(0.5, 1.0)
+
+class EvaluationRunner:
+    def __init__(self, openai_instance, store, limiter, concurrency=8, batch_size=200, model=EVALUATION_MODEL):
+        from tools import get_prompt, get_encoder
+
+        self.openai_instance = openai_instance
+        self.store = store
+        self.limiter = limiter
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.model = model
+        self.tokenizer = get_encoder(model)
+        self.system_prompt = get_prompt(EVALUATION_PROMPT_FILES["system"])
+        self.human_prompt = get_prompt(EVALUATION_PROMPT_FILES["human"])
+        self.stats = {"rows": 0, "cached": 0, "evaluated": 0, "failed": 0, "written": 0, "retries": 0,
+                      "prompt_tokens": 0, "completion_tokens": 0}
+        self.stats_lock = threading.Lock()
+
+    def count(self, key, value=1):
+        with self.stats_lock:
+            self.stats[key] += value
+
+    def make_messages(self, row):
+        context_tokens = self.tokenizer.encode(row['CONTEXTS'] or "")
+        contexts = self.tokenizer.decode(context_tokens[:EVALUATION_CONTEXT_TOKENS])
+        human = self.human_prompt.format(question=row['QUERY_ORI'] or "", answer=row['GPT_ANSWER'] or "", contexts=contexts)
+        messages = [{"role": "system", "content": self.system_prompt.format()},
+                    {"role": "user", "content": human}]
+        tokens = sum(len(self.tokenizer.encode(message["content"])) for message in messages)
+        return messages, tokens
+
+    # 평가 1건 : rate limiter 대기 -> 요청, 실패 시 backoff 재시도
+    def evaluate(self, row):
+        messages, prompt_tokens = self.make_messages(row)
+        for attempt in range(EVALUATION_MAX_ATTEMPTS):
+            entry = self.limiter.acquire(prompt_tokens + EVALUATION_MAX_TOKENS)
+            try:
+                content, usage = self.openai_instance.request_evaluation(messages, model=self.model, max_tokens=EVALUATION_MAX_TOKENS,
+                                                                         response_format={"type": "json_object"})
+            except Exception as e:
+                self.limiter.record(entry, prompt_tokens)
+                if attempt == EVALUATION_MAX_ATTEMPTS - 1:
+                    raise
+                delay = retry_delay(attempt, e)
+                logger.error(f"Evaluation request error : {type(e).__name__} : {e}, retrying in {delay:.1f} seconds...")
+                self.count("retries")
+                time.sleep(delay)
+                continue
+
+            self.limiter.record(entry, usage.total_tokens)
+            self.count("prompt_tokens", usage.prompt_tokens)
+            self.count("completion_tokens", usage.completion_tokens)
+            return content
+
+    def update_parameters(self, row, evaluation):
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        return (evaluation, now, "EVAL", row['CHAT_ID'], row['CHAT_SESSION_ID'], row['RAG_ORDER'])
+
+    def flush(self, pending):
+        from database import MySql
+
+        if not pending:
+            return
+        sql_instance = MySql()
+        sql_instance.update_many(EVALUATION_UPDATE_QUERY, pending)
+        self.count("written", len(pending))
+        logger.info(f"Evaluation write complete : {self.stats['written']} / {self.stats['rows']}")
+        pending.clear()
+
+    def run(self, rows):
+        self.stats["rows"] = len(rows)
+        start_time = time.time()
+        pending = []
+        inflight = {}
+        queue = deque()
+
+        # 이미 평가된 내용 ( 재실행 / 중복 행 ) 은 요청 없이 저장 대상으로
+        for row in rows:
+            evaluation = self.store.get(row_hash(row))
+            if evaluation is not None:
+                self.count("cached")
+                pending.append(self.update_parameters(row, evaluation))
+            else:
+                queue.append(row)
+
+        # 같은 내용이 여러 행이면 1번만 평가
+        waiting = {}
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="evaluation") as executor:
+            while queue or inflight:
+                while queue and len(inflight) < self.concurrency * 2:
+                    row = queue.popleft()
+                    key = row_hash(row)
+                    evaluation = self.store.get(key)
+                    if evaluation is not None:
+                        self.count("cached")
+                        pending.append(self.update_parameters(row, evaluation))
+                        continue
+                    if key in waiting:
+                        waiting[key].append(row)
+                        continue
+                    waiting[key] = [row]
+                    inflight[executor.submit(self.evaluate, row)] = key
+
+                done, _ = wait(list(inflight), return_when=FIRST_COMPLETED)
+                for future in done:
+                    key = inflight.pop(future)
+                    same_rows = waiting.pop(key)
+                    try:
+                        evaluation = future.result()
+                    except Exception as e:
+                        # EVAL_YN = 'N' 유지 -> 다음 실행에서 재시도
+                        logger.error(f"Evaluation failed : {type(e).__name__} : {e}")
+                        self.count("failed", len(same_rows))
+                        continue
+                    self.store.put(key, evaluation)
+                    self.count("evaluated")
+                    self.count("cached", len(same_rows) - 1)
+                    pending.extend(self.update_parameters(row, evaluation) for row in same_rows)
+
+                if len(pending) >= self.batch_size:
+                    self.flush(pending)
+
+        self.flush(pending)
+        return self.report(time.time() - start_time)
+
+    def report(self, elapsed):
+        stats = dict(self.stats)
+        cost = (stats["prompt_tokens"] * EVALUATION_PRICE["prompt"] + stats["completion_tokens"] * EVALUATION_PRICE["completion"]) / 1000
+        stats.update({"elapsed": round(elapsed, 3),
+                      "throughput": round(stats["evaluated"] / elapsed, 3) if elapsed else 0.0,
+                      "tokens_per_minute": round((stats["prompt_tokens"] + stats["completion_tokens"]) / elapsed * 60, 1) if elapsed else 0.0,
+                      "rate_limit_wait": round(self.limiter.waited, 3),
+                      "cost": round(cost, 4),
+                      "cost_per_row": round(cost / stats["evaluated"], 6) if stats["evaluated"] else 0.0})
+        return stats
+
+def load_rows(start_date, end_date, limit=None):
+    from database import MySql
+
+    sql_instance = MySql()
+    rows = sql_instance.get_table(query=EVALUATION_SELECT_QUERY, parameters=(start_date, end_date))
+    if rows is None:
+        raise RuntimeError("tmp_chat_summary_dash load failed")
+    return rows[:limit] if limit else rows
+
+def parse_args(argv=None):
+    korea_timezone = pytz.timezone('Asia/Seoul')
+    today = datetime.now(korea_timezone).date()
+    parser = argparse.ArgumentParser(description="Batch GPT evaluation of tmp_chat_summary_dash rows ( EVAL_YN = 'N' )")
+    parser.add_argument("--start-date", default=str(today - timedelta(days=1)), help="CREATE_DATE from ( inclusive, default : yesterday KST )")
+    parser.add_argument("--end-date", default=str(today), help="CREATE_DATE to ( exclusive, default : today KST )")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--tpm", type=int, default=100000, help="tokens per minute for the evaluation deployment")
+    parser.add_argument("--rpm", type=int, default=600, help="requests per minute for the evaluation deployment")
+    parser.add_argument("--batch-size", type=int, default=200, help="rows per MySQL bulk update")
+    parser.add_argument("--model", default=EVALUATION_MODEL)
+    parser.add_argument("--state-dir", default=EVALUATION_STATE_DIR)
+    parser.add_argument("--limit", type=int)
+    parser.add_argument("--output", help="write the JSON report to this path")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    import credential
+    if not credential.keyvault_values:
+        credential.fetch_keyvault_values()
+    from model import OpenAI
+
+    rows = load_rows(args.start_date, args.end_date, args.limit)
+    logger.info(f"Evaluation target : {len(rows)} rows ( {args.start_date} ~ {args.end_date} )")
+
+    store = EvaluationStore(args.state_dir)
+    try:
+        runner = EvaluationRunner(OpenAI(), store, RateLimiter(args.tpm, args.rpm), concurrency=args.concurrency,
+                                  batch_size=args.batch_size, model=args.model)
+        report = runner.run(rows)
+    finally:
+        store.close()
+
+    print(json.dumps(report, indent=4, ensure_ascii=False))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4, ensure_ascii=False)
+    return 1 if report["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,29 +1,82 @@
 import logging
 import pytz
+import threading
+from collections import deque
+from contextvars import ContextVar
 from datetime import datetime
-from threading import local
+from request_context import get_request_context
 
-thread_local = local()
+# 요청 당 로그 상한 ( 문자 수 ) : 초과 시 앞부분 절반 + 마지막 절반만 유지
+LOG_BUFFER_MAX_CHARS = 4 * 1024 * 1024
+
+class LogBuffer:
+    def __init__(self, max_chars=LOG_BUFFER_MAX_CHARS):
+        self.max_chars = max_chars
+        self.head = []
+        self.head_chars = 0
+        self.tail = deque()
+        self.tail_chars = 0
+        self.dropped = 0
+        self.lock = threading.Lock()
+
+    def append(self, line):
+        with self.lock:
+            if not self.tail and self.head_chars + len(line) <= self.max_chars // 2:
+                self.head.append(line)
+                self.head_chars += len(line)
+                return
+
+            self.tail.append(line)
+            self.tail_chars += len(line)
+            while self.tail_chars > self.max_chars // 2 and len(self.tail) > 1:
+                self.tail_chars -= len(self.tail.popleft())
+                self.dropped += 1
+
+    def lines(self):
+        with self.lock:
+            lines = list(self.head)
+            if self.dropped:
+                lines.append(f"... {self.dropped} log lines dropped ...")
+            lines.extend(self.tail)
+            return lines
+
+    def getvalue(self):
+        return "\n".join(self.lines())
+
+    def clear(self):
+        with self.lock:
+            self.head = []
+            self.tail = deque()
+            self.head_chars = self.tail_chars = self.dropped = 0
+
+# 현재 요청의 로그 버퍼 ( thread / asyncio task 별로 분리, worker thread 는 copy_context 로 전달 )
+log_buffer_var = ContextVar("log_buffer", default=None)
+
+def start_log_buffer(max_chars=LOG_BUFFER_MAX_CHARS):
+    buffer = LogBuffer(max_chars)
+    log_buffer_var.set(buffer)
+    return buffer
+
+# 요청 종료 시 호출 : 버퍼 해제 ( 이후 로그는 수집하지 않음 )
+def end_log_buffer(buffer):
+    if log_buffer_var.get() is buffer:
+        log_buffer_var.set(None)
+    buffer.clear()
 
 class ListLogHandler(logging.Handler):
-    def __init__(self, chat_id, chat_session_id, rag_order):
+    def __init__(self):
         super().__init__()
-        self.chat_id = chat_id
-        self.chat_session_id = chat_session_id
-        self.rag_order = rag_order
-
-    def update_ids(self, new_chat_id, new_session_id, rag_order):
-        self.chat_id = new_chat_id
-        self.chat_session_id = new_session_id  
-        self.rag_order = rag_order  
 
+    # 요청 id 는 RequestContext 에서 읽음 ( 동시 요청 간 id 섞임 방지 )
     def emit(self, record):
-        if not hasattr(thread_local, 'log_list'):
-            thread_local.log_list = []
+        buffer = log_buffer_var.get()
+        if buffer is None:
+            return
         log_entry = self.format(record)
 
-        log_entry_with_ids = f"{self.chat_id}_{self.chat_session_id}_{self.rag_order} - {log_entry}"
-        thread_local.log_list.append(log_entry_with_ids)
+        context = get_request_context()
+        log_prefix = context.log_prefix if context is not None else "__"
+        buffer.append(f"{log_prefix} - {log_entry}")
 
 class KSTFormatter(logging.Formatter):
     def formatTime(self, record, datefmt=None):
@@ -47,17 +100,17 @@ class UTCFormatter(logging.Formatter):
             s = "%s,%03d" % (s, record.msecs)
         return s
     
-def setup_logger(chat_id, chat_session_id, rag_order):
+setup_lock = threading.Lock()
+
+def setup_logger():
     logger = logging.getLogger(__name__)
     
-    if logger.handlers:
-        for handler in logger.handlers:
-            if isinstance(handler, ListLogHandler):
-                handler.update_ids(chat_id, chat_session_id, rag_order)
-    else:
-        handler = ListLogHandler(chat_id, chat_session_id, rag_order)
-        handler.setFormatter(UTCFormatter('%(asctime)s - %(levelname)s - %(filename)s:%(lineno)d - \n%(message)s'))
-        logger.setLevel(logging.INFO)
-        logger.addHandler(handler)
+    if not logger.handlers:
+        with setup_lock:
+            if not logger.handlers:
+                handler = ListLogHandler()
+                handler.setFormatter(UTCFormatter('%(asctime)s - %(levelname)s - %(filename)s:%(lineno)d - \n%(message)s'))
+                logger.setLevel(logging.INFO)
+                logger.addHandler(handler)
 
     return logger
@@ -1,19 +1,18 @@
 import logging
 from datetime import datetime
 import pytz
-import threading
-
-thread_local = threading.local()
+from log import log_buffer_var, start_log_buffer, end_log_buffer
 
 class ListLogHandler(logging.Handler):
     def __init__(self):
         super().__init__()
 
     def emit(self, record):
-        if not hasattr(thread_local, 'log_list'):
-            thread_local.log_list = []
+        buffer = log_buffer_var.get()
+        if buffer is None:
+            return
         log_entry = self.format(record)
-        thread_local.log_list.append(log_entry)
+        buffer.append(log_entry)
 
 class KSTFormatter(logging.Formatter):
     def formatTime(self, record, datefmt=None):
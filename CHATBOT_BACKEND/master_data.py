@@ -0,0 +1,140 @@
+import time
+import threading
+import logging
+from database import MySql
+logger = logging.getLogger(__name__)
+
+# 마스터 테이블 갱신 주기 (초)
+MASTER_DATA_TTL = 600
+
+class MasterData:
+    def __init__(self, locale_mst, language_mst, intent_mst):
+        self.loaded_time = time.time()
+
+        # LOCALE_MST ( tb_code_mst B00003 + tb_corp_lan_map ) : 기존 pd.merge 결과의 첫 번째 행 기준
+        self.locale_by_locale_cd = {}
+        self.locale_by_language_cd = {}
+        for item in locale_mst:
+            self.locale_by_locale_cd.setdefault(item['LOCALE_CD'], item)
+            self.locale_by_language_cd.setdefault(item['LANGUAGE_CD'], item)
+
+        # LANGUAGE_MST ( tb_code_mst B00006 )
+        self.language_by_code_cd = {}
+        for item in language_mst:
+            self.language_by_code_cd.setdefault(item['CODE_CD'], item)
+
+        # tb_chat_intent_mst
+        self.intent_by_key = {}
+        for item in intent_mst:
+            self.intent_by_key.setdefault((item['INTENT_CODE'], item['LOCALE_CD']), item)
+
+    def get_locale(self, locale_cd):
+        return self.locale_by_locale_cd[locale_cd]
+
+    def get_locale_language_name(self, language_cd):
+        return self.locale_by_language_cd[language_cd]['CODE_NAME']
+
+    def get_language_name(self, code_cd):
+        return self.language_by_code_cd[code_cd]['CODE_NAME']
+
+    def get_intent(self, intent_code, locale_cd):
+        return self.intent_by_key[(intent_code, locale_cd)]
+
+    def language_codes(self):
+        return sorted(self.locale_by_language_cd.keys())
+
+    # 번역 대상 언어 ( 사용자 선택 언어 + 감지 언어 )
+    def translation_language_codes(self):
+        return sorted(set(self.locale_by_language_cd.keys()) | set(self.language_by_code_cd.keys()))
+
+def strip_values(rows):
+    return [{key: value.strip() if isinstance(value, str) else value for key, value in row.items()} for row in rows]
+
+def load_master_data():
+    logger.info("###### Function Name : load_master_data")
+
+    sql_instance = MySql()
+    locale_mst_table_1 = sql_instance.get_table("""
+                                            SELECT CODE_CD, CODE_NAME
+                                            FROM tb_code_mst
+                                            WHERE GROUP_CD = 'B00003'
+                                            """)
+    sql_instance = MySql()
+    locale_mst_table_2 = sql_instance.get_table("""
+                                            SELECT CORP_CD, LOCALE_CD, LANGUAGE_CD
+                                            FROM tb_corp_lan_map
+                                            """)
+    sql_instance = MySql()
+    language_mst = sql_instance.get_table("""
+                                            select
+                                            CODE_CD, CODE_NAME
+                                            from
+                                            tb_code_mst
+                                            where
+                                            group_cd = "B00006"
+                                            """)
+    sql_instance = MySql()
+    intent_mst = sql_instance.get_table("""
+                                            SELECT * FROM tb_chat_intent_mst""")
+
+    if locale_mst_table_1 is None or locale_mst_table_2 is None or language_mst is None or intent_mst is None:
+        raise RuntimeError("Master table load failed")
+
+    # pd.merge(locale_mst_table_1, locale_mst_table_2, on='LANGUAGE_CD') 와 동일한 순서로 구성
+    corp_lan_map = {}
+    for item in locale_mst_table_2:
+        corp_lan_map.setdefault(item['LANGUAGE_CD'], []).append(item)
+
+    locale_mst = []
+    for item in strip_values(locale_mst_table_1):
+        for corp_lan in corp_lan_map.get(item['CODE_CD'], []):
+            locale_mst.append({"LANGUAGE_CD": item['CODE_CD'],
+                               "CODE_NAME": item['CODE_NAME'],
+                               "CORP_CD": corp_lan['CORP_CD'],
+                               "LOCALE_CD": corp_lan['LOCALE_CD']})
+
+    master_data = MasterData(locale_mst, strip_values(language_mst), intent_mst)
+    logger.info(f"Master data load complete : locale {len(master_data.locale_by_locale_cd)}, language {len(master_data.language_by_code_cd)}, intent {len(master_data.intent_by_key)}")
+    return master_data
+
+class MasterDataRegistry:
+    def __init__(self, ttl=MASTER_DATA_TTL):
+        self.ttl = ttl
+        self.master_data = None
+        self.lock = threading.Lock()
+        self.refreshing = False
+
+    def get(self):
+        master_data = self.master_data
+        if master_data is None:
+            with self.lock:
+                if self.master_data is None:
+                    self.master_data = load_master_data()
+                return self.master_data
+
+        if time.time() - master_data.loaded_time > self.ttl:
+            self.refresh_background()
+        return master_data
+
+    def refresh_background(self):
+        with self.lock:
+            if self.refreshing:
+                return
+            self.refreshing = True
+        threading.Thread(target=self.refresh, daemon=True).start()
+
+    def refresh(self):
+        try:
+            self.master_data = load_master_data()
+        except Exception as e:
+            # 갱신 실패 시 기존 데이터 유지, 다음 주기에 재시도
+            logger.error(f"Master data refresh error : {e}")
+            if self.master_data is not None:
+                self.master_data.loaded_time = time.time()
+        finally:
+            self.refreshing = False
+
+master_data_registry = MasterDataRegistry()
+
+def get_master_data():
+    return master_data_registry.get()
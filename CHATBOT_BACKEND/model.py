@@ -3,7 +3,8 @@ import uuid
 import requests
 import json
 from database import MySql, AzureStorage
-from openai import AzureOpenAI
+from openai import AzureOpenAI, AsyncAzureOpenAI
+import httpx
 from langchain_openai import AzureChatOpenAI
 from langchain.prompts.chat import (
     ChatPromptTemplate,
@@ -11,14 +12,132 @@ from langchain.prompts.chat import (
     HumanMessagePromptTemplate,
     )
 from langchain.chains import LLMChain
-from tools import get_prompt, preprocessing_answer, preprocessing_refinement, load_balancing, get_ErrorCode, get_GroupName
+from tools import to_thread, get_prompt, get_encoder, count_tokens, preprocessing_answer, preprocessing_refinement, get_ErrorCode, get_GroupName
 from retry import retry
+from tracing import traced
 import logging
-import tiktoken
+import threading
+import hashlib
+import time
 from credential import keyvault_values
 from log import setup_logger
+from request_context import get_request_context, request_timer
+from cache import TTLCache
+import asyncio
+from scheduler import deployment_scheduler
+from clients import client_registry, fingerprint
 logger = logging.getLogger(__name__)
 
+# 프로세스 단위 query embedding 캐시 ( key : (normalized text, model) )
+EMBEDDING_CACHE = TTLCache(maxsize=2048, ttl=3600)
+
+def normalize_text(text):
+    return " ".join(str(text).split())
+
+# 프롬프트 템플릿 ( config/prompt ) : 최초 1회 로드 후 재사용
+PROMPT_FILES = {
+    "system": "./config/prompt/system.txt",
+    "human": "./config/prompt/human.txt",
+    "refinement_system": "./config/prompt/refinement_system.txt",
+    "refinement_human": "./config/prompt/refinement_human.txt",
+}
+PROMPT_TOKEN_MODEL = "gpt-3.5-turbo"
+# refinement / QA 응답 형식 ( Azure OpenAI JSON mode ), None 이면 지정하지 않음
+ANSWER_RESPONSE_FORMAT = {"type": "json_object"}
+# JSON mode 는 메시지에 "json" 이 없으면 400 : 프롬프트 파일 내용과 관계없이 system 메시지 끝에 추가
+JSON_MODE_INSTRUCTION = "\n\nRespond with a JSON object."
+# JSON mode 미지원 deployment ( 0301 / 0613 모델, 이전 api-version ) : 400 응답 시 기록, 이후 response_format 없이 요청
+JSON_MODE_UNSUPPORTED = set()
+MAX_CONTEXT_TOKENS = 16385
+RESERVED_TOKENS = 300
+
+class PromptRegistry:
+    def __init__(self, prompt_files=PROMPT_FILES, token_model=PROMPT_TOKEN_MODEL):
+        self.prompt_files = prompt_files
+        self.token_model = token_model
+        self.prompts = None
+        self.lock = threading.Lock()
+
+    def load(self):
+        tokenizer = get_encoder(self.token_model)
+        templates = {kind: get_prompt(path) for kind, path in self.prompt_files.items()}
+
+        prompts = {}
+        for kind, system_kind, human_kind in [("qa", "system", "human"), ("refinement", "refinement_system", "refinement_human")]:
+            system_msg_prompt = templates[system_kind]
+            if ANSWER_RESPONSE_FORMAT is not None:
+                system_msg_prompt += JSON_MODE_INSTRUCTION
+            human_msg_prompt = templates[human_kind]
+            prompts[kind] = {
+                "chat_prompt": ChatPromptTemplate.from_messages([SystemMessagePromptTemplate.from_template(system_msg_prompt),
+                                                                 HumanMessagePromptTemplate.from_template(human_msg_prompt)]),
+                "template": system_msg_prompt + human_msg_prompt,
+                "static_tokens": len(tokenizer.encode(system_msg_prompt)) + len(tokenizer.encode(human_msg_prompt)),
+            }
+        logger.info(f"Prompt load complete : { {kind: item['static_tokens'] for kind, item in prompts.items()} }")
+        return prompts
+
+    def get(self, refinement):
+        if self.prompts is None:
+            with self.lock:
+                if self.prompts is None:
+                    self.prompts = self.load()
+        return self.prompts["refinement" if refinement else "qa"]
+
+prompt_registry = PromptRegistry()
+
+def json_mode_key(deployment):
+    return deployment.key if deployment is not None else None
+
+def use_json_mode(deployment):
+    return ANSWER_RESPONSE_FORMAT is not None and json_mode_key(deployment) not in JSON_MODE_UNSUPPORTED
+
+# response_format 거부 ( 400 ) 이면 deployment 를 JSON mode 미지원으로 기록 ( retry 는 response_format 없이 )
+def check_json_mode_error(error, deployment):
+    if getattr(error, "status_code", None) == 400 and "response_format" in str(error):
+        logger.info(f"JSON mode not supported : {json_mode_key(deployment)}")
+        JSON_MODE_UNSUPPORTED.add(json_mode_key(deployment))
+
+# endpoint 별 client 재사용 ( HTTP keep-alive 유지 )
+def get_openai_client(api_base, api_key, api_version):
+    return client_registry.get("openai", (api_base, api_version, fingerprint(api_key)),
+                               lambda: AzureOpenAI(api_key = api_key,  
+                                                   api_version = api_version,
+                                                   azure_endpoint = api_base))
+
+def get_llm_client(api_base, api_key, api_version, deployment_name):
+    return client_registry.get("azure-chat", (api_base, api_version, deployment_name, fingerprint(api_key)),
+                               lambda: AzureChatOpenAI( deployment_name=deployment_name,
+                                                        azure_endpoint=api_base,
+                                                        openai_api_key=api_key,
+                                                        openai_api_version=api_version,
+                                                        temperature=0))
+
+def get_http_session(service, key):
+    return client_registry.get(service, key, requests.Session)
+
+# async client 는 event loop 에 묶이므로 loop 별로 공유
+def get_async_openai_client(api_base, api_key, api_version):
+    return client_registry.get("openai-aio", (api_base, api_version, fingerprint(api_key), id(asyncio.get_running_loop())),
+                               lambda: AsyncAzureOpenAI(api_key = api_key,  
+                                                        api_version = api_version,
+                                                        azure_endpoint = api_base))
+
+def get_async_http_client(service, key):
+    return client_registry.get(service, (key, id(asyncio.get_running_loop())), httpx.AsyncClient)
+
+# 요청 단위 embedding memo ( RequestContext.caches, 요청 밖에서는 memo 없음 )
+def get_embedding_memo():
+    context = get_request_context()
+    if context is None:
+        return {}
+    return context.cache("embedding")
+
+def count_memo_hit():
+    context = get_request_context()
+    if context is not None:
+        context.caches["embedding_memo_hits"] = context.caches.get("embedding_memo_hits", 0) + 1
+
 class OpenAI:
     def __init__(self, gpt_model = None):
         # config 파일 설정
@@ -27,31 +146,31 @@ class OpenAI:
         self.api_version = keyvault_values["openai-api-version"]
 
         # client 초기화
-        self.openai_client = AzureOpenAI(api_key = self.api_key,  
-                                        api_version = self.api_version,
-                                        azure_endpoint = self.api_base)
+        self.openai_client = get_openai_client(self.api_base, self.api_key, self.api_version)
         
         if gpt_model is None:
             gpt_model = "gpt-35-turbo"
         
-        self.llm_client = AzureChatOpenAI( deployment_name=gpt_model,
-                                            azure_endpoint=self.api_base,
-                                            openai_api_key=self.api_key,
-                                            openai_api_version=self.api_version,
-                                            temperature=0)
+        self.llm_client = get_llm_client(self.api_base, self.api_key, self.api_version, gpt_model)
         
     @retry(tries=6, delay=10, backoff=1)
     def generate_evaluation(self, row, messages):
         logger.info("###### Function Name : generate_evaluation")
 
+        results, _ = self.request_evaluation(messages)
+        return results
+
+    # 평가 1건 요청 ( retry 없음, evaluation.py 는 rate limit 에 맞춰 재시도 ) -> (content, usage)
+    def request_evaluation(self, messages, model="gpt-35-turbo", max_tokens=800, response_format=None):
+        kwargs = {"response_format": response_format} if response_format is not None else {}
         response = self.openai_client.chat.completions.create(
-            model="gpt-35-turbo",
+            model=model,
             messages=messages,
             temperature=0,
             seed=0,
-            max_tokens=800)
-        results = response.choices[0].message.content
-        return results
+            max_tokens=max_tokens,
+            **kwargs)
+        return response.choices[0].message.content, response.usage
 
     
     @retry(tries=6, delay=10, backoff=1)
@@ -61,92 +180,144 @@ class OpenAI:
             model = "text-embedding-ada-002"
         return self.openai_client.embeddings.create(input=[text], model=model).data[0].embedding
 
+    @traced("OpenAI.generate_embeddings_chat")
     def generate_embeddings_chat(self, text, model=None):
         logger.info("###### Function Name : generate_embeddings_chat")
 
-        tokenizer = tiktoken.get_encoding("cl100k_base")
-        tokenizer = tiktoken.encoding_for_model("text-embedding-ada-002")
+        key = (normalize_text(text), model if model is not None else "text-embedding-ada-002")
+        embedding_memo = get_embedding_memo()
+        if key in embedding_memo:
+            count_memo_hit()
+            logger.info("Embedding memo hit")
+            return embedding_memo[key]
+
+        with request_timer("embedding"):
+            embedding = EMBEDDING_CACHE.get_or_load(key, lambda: self.request_embeddings_chat(text, model))
+        embedding_memo[key] = embedding
+        return embedding
+
+    @traced("OpenAI.agenerate_embeddings_chat")
+    async def agenerate_embeddings_chat(self, text, model=None):
+        logger.info("###### Function Name : agenerate_embeddings_chat")
+
+        key = (normalize_text(text), model if model is not None else "text-embedding-ada-002")
+        embedding_memo = get_embedding_memo()
+        if key in embedding_memo:
+            count_memo_hit()
+            logger.info("Embedding memo hit")
+            return embedding_memo[key]
+
+        with request_timer("embedding"):
+            embedding = await EMBEDDING_CACHE.aget_or_load(key, lambda: self.arequest_embeddings_chat(text, model))
+        embedding_memo[key] = embedding
+        return embedding
+
+    @traced("OpenAI.arequest_embeddings_chat")
+    async def arequest_embeddings_chat(self, text, model=None):
+        logger.info("###### Function Name : arequest_embeddings_chat")
+
+        tokenizer = get_encoder("text-embedding-ada-002")
+        tokenSize = len(tokenizer.encode(text))
+
+        logger.info("=" * 30 + " Load Balancing " + "=" * 30)
+        deployment = await to_thread(deployment_scheduler.acquire, tokenSize, type ="embedding")
+
+        if deployment is None:
+            openai_client = get_async_openai_client(self.api_base, self.api_key, self.api_version)
+            if model is None:
+                model = "text-embedding-ada-002"
+        
+        else:
+            apiBase, apiKey, apiVersion, apiModel = deployment.credentials()
+            logger.info(f"{apiBase}, {apiVersion}, {apiModel}")
+            openai_client = get_async_openai_client(f"https://{apiBase.split('/')[2]}", apiKey, apiVersion)
+            if model is None:
+                model = apiModel
+        try:
+            response = await openai_client.embeddings.create(input=[text], model=model)
+        except Exception as e:
+            deployment_scheduler.report_error(deployment, e)
+            raise
+        return response.data[0].embedding
+
+    def embedding_cache_stats(self):
+        stats = EMBEDDING_CACHE.stats()
+        context = get_request_context()
+        stats["memo_hits"] = context.caches.get("embedding_memo_hits", 0) if context is not None else 0
+        stats["memo_size"] = len(get_embedding_memo())
+        return stats
+
+    @traced("OpenAI.request_embeddings_chat")
+    def request_embeddings_chat(self, text, model=None):
+        logger.info("###### Function Name : request_embeddings_chat")
+
+        tokenizer = get_encoder("text-embedding-ada-002")
         tokenSize = len(tokenizer.encode(text))
 
         logger.info("=" * 30 + " Load Balancing " + "=" * 30)
-        apiBase, apiKey, apiVersion, apiModel = load_balancing(tokenSize, type ="embedding")
-        logger.info(f"{apiBase}, {apiVersion}, {apiModel}")
+        deployment = deployment_scheduler.acquire(tokenSize, type ="embedding")
 
-        if apiBase is None or apiKey is None or apiVersion is None or apiModel is None:
+        if deployment is None:
             openai_client = self.openai_client
             if model is None:
                 model = "text-embedding-ada-002"
             return openai_client.embeddings.create(input=[text], model=model).data[0].embedding
         
         else:
-            openai_client = AzureOpenAI(api_key = apiKey,  
-                                    api_version = apiVersion,
-                                    azure_endpoint = f"https://{apiBase.split('/')[2]}",)
+            apiBase, apiKey, apiVersion, apiModel = deployment.credentials()
+            logger.info(f"{apiBase}, {apiVersion}, {apiModel}")
+            openai_client = get_openai_client(f"https://{apiBase.split('/')[2]}", apiKey, apiVersion)
             if model is None:
                 model = apiModel
-            return openai_client.embeddings.create(input=[text], model=model).data[0].embedding
+            try:
+                return openai_client.embeddings.create(input=[text], model=model).data[0].embedding
+            except Exception as e:
+                deployment_scheduler.report_error(deployment, e)
+                raise
     
-    @retry(tries=3, delay=1, backoff=1)
-    def generate_answer(self, logger, query, use_memory, chat_history, refinement, documents=None):
-        logger = setup_logger(query['chatid'],query['chat_session_id'], query['rag_order'])
-        logger.info("###### Function Name : generate_answer")
-        
-        if refinement :
-            system_msg_prompt = get_prompt("./config/prompt/refinement_system.txt")
-            human_msg_prompt = get_prompt("./config/prompt/refinement_human.txt")
-        
-        else :
-            system_msg_prompt = get_prompt("./config/prompt/system.txt")
-            human_msg_prompt = get_prompt("./config/prompt/human.txt")
+    # 프롬프트/토큰 계산, deployment 선택, chain 입력 구성 ( generate_answer, agenerate_answer 공통 )
+    def prepare_answer(self, query, use_memory, chat_history, refinement, documents=None):
+        logger = setup_logger()
         
-        system_message_prompt = SystemMessagePromptTemplate.from_template(system_msg_prompt)
-        human_message_prompt = HumanMessagePromptTemplate.from_template(human_msg_prompt)
+        prompt_entry = prompt_registry.get(refinement)
 
-        tokenizer = tiktoken.get_encoding("cl100k_base")
-        tokenizer = tiktoken.encoding_for_model('gpt-3.5-turbo')
-        tokenSize = len(tokenizer.encode(system_msg_prompt + human_msg_prompt + query["trans_question"]))
+        # 정적 프롬프트 token 수는 캐시값 사용, 동적 부분(question, history, documents)만 1회 tokenize
+        tokenizer = get_encoder(prompt_registry.token_model)
+        question_tokens = len(tokenizer.encode(query["trans_question"]))
+        history_tokens = count_tokens(chat_history, prompt_registry.token_model) if use_memory and chat_history else 0
+        tokenSize = prompt_entry["static_tokens"] + question_tokens + history_tokens
 
-        limit = 16385 - len(tokenizer.encode(system_msg_prompt)) - len(tokenizer.encode(human_msg_prompt)) - len(tokenizer.encode(query["trans_question"])) - 300
+        limit = max(MAX_CONTEXT_TOKENS - tokenSize - RESERVED_TOKENS, 0)
         
         logger.info(f"############# MAX_DOCUMENTS_TOKEN : {limit}") 
 
         if documents is not None :
             document_tokens = tokenizer.encode(documents)
-            tokenSize = len(tokenizer.encode(system_msg_prompt + human_msg_prompt + query["trans_question"] + documents))
-            if tokenSize > 16385 :
+            if tokenSize + len(document_tokens) > MAX_CONTEXT_TOKENS :
                 document_tokens = document_tokens[:limit]
                 documents = tokenizer.decode(document_tokens)
-                tokenSize = len(tokenizer.encode(system_msg_prompt + human_msg_prompt + query["trans_question"] + documents))
-        else :
-            tokenSize = len(tokenizer.encode(system_msg_prompt + human_msg_prompt + query["trans_question"]))
+            tokenSize += len(document_tokens)
         
         logger.info(f"############# TOKEN_SIZE : {tokenSize}")
         logger.info("=" * 30 + " Load Balancing " + "=" * 30)
-        apiBase, apiKey, apiVersion, apiModel = load_balancing(tokenSize, type ="gpt")
-        logger.info(f"{apiBase}, {apiVersion}, {apiModel}")
+        deployment = deployment_scheduler.acquire(tokenSize, type ="gpt")
         
-        if apiBase is None or apiKey is None or apiVersion is None or apiModel is None:
+        if deployment is None:
             llm_client = self.llm_client
         
         else:
-            llm_client = AzureChatOpenAI( deployment_name=apiModel,
-                                azure_endpoint=f"https://{apiBase.split('/')[2]}",
-                                openai_api_key=apiKey,
-                                openai_api_version=apiVersion,
-                                temperature=0)
+            apiBase, apiKey, apiVersion, apiModel = deployment.credentials()
+            logger.info(f"{apiBase}, {apiVersion}, {apiModel}")
+            llm_client = get_llm_client(f"https://{apiBase.split('/')[2]}", apiKey, apiVersion, apiModel)
             
-        # model_kwargs={
-        #     "seed": 12345,
-        #     "response_format": {"type": "json_object"}
-        #     }
-        
         chain_kwargs = {
             "llm": llm_client,
             "verbose": False,
         }
+        if use_json_mode(deployment):
+            chain_kwargs["llm_kwargs"] = {"response_format": ANSWER_RESPONSE_FORMAT}
         
-        chat_prompt = ChatPromptTemplate.from_messages([system_message_prompt, human_message_prompt])
-        chain_kwargs["prompt"] = chat_prompt
+        chain_kwargs["prompt"] = prompt_entry["chat_prompt"]
 
         if query['trans_language_code_score'] != 1:
             detectLang = query['user_selected_language']
@@ -157,6 +328,7 @@ class OpenAI:
         product_code = query["product_code"]
 
         llm_chain = LLMChain(**chain_kwargs)
+        product_group_name = None
         if use_memory :
             if refinement :
 
@@ -169,26 +341,75 @@ class OpenAI:
                 product_group_name = get_GroupName(GROUP_CD=product_group_code, PROD_CD=product_code)
 
                 logger.info("###### Refinement Answer ######")
-                answer = llm_chain.predict(question=query["trans_question"], chat=chat_history, detectLang=query['language'], error_code_list=error_code_list, product_group_name=product_group_name)
-                if not answer.strip():
-                    raise ValueError("No answer returned")
-                
-                logger.info(answer)
+                inputs = dict(question=query["trans_question"], chat=chat_history, detectLang=query['language'], error_code_list=error_code_list, product_group_name=product_group_name)
 
             else:
                 logger.info("###### QA Answer ######")
-                answer = llm_chain.predict(question=query["trans_question"], chat=chat_history, document=documents.replace("[","(").replace("]",")"), detectLang=detectLang)
-                if not answer.strip():
-                    raise ValueError("No answer returned")
-                
-                logger.info(answer)
+                inputs = dict(question=query["trans_question"], chat=chat_history, document=documents.replace("[","(").replace("]",")"), detectLang=detectLang)
         else :
-            answer = llm_chain.predict(question=query["trans_question"], document=documents.replace("[","(").replace("]",")"), detectLang=detectLang)
-            if not answer.strip():
-                raise ValueError("No answer returned")
-                
-            logger.info(answer)
-        prompt = llm_chain.prompt.messages[0].prompt.template + llm_chain.prompt.messages[1].prompt.template
+            inputs = dict(question=query["trans_question"], document=documents.replace("[","(").replace("]",")"), detectLang=detectLang)
+
+        context = {"prompt_entry": prompt_entry,
+                   "deployment": deployment,
+                   "tokenizer": tokenizer,
+                   "product_group_name": product_group_name}
+        return llm_chain, inputs, context
+
+    @retry(tries=3, delay=1, backoff=1)
+    @traced("OpenAI.generate_answer")
+    def generate_answer(self, logger, query, use_memory, chat_history, refinement, documents=None):
+        logger = setup_logger()
+        logger.info("###### Function Name : generate_answer")
+
+        llm_chain, inputs, context = self.prepare_answer(query, use_memory, chat_history, refinement, documents)
+        try:
+            with request_timer("llm_refinement" if refinement else "llm_answer"):
+                answer = llm_chain.predict(**inputs)
+        except Exception as e:
+            check_json_mode_error(e, context["deployment"])
+            deployment_scheduler.report_error(context["deployment"], e)
+            raise
+        return self.finish_answer(query, refinement, answer, context)
+
+    @traced("OpenAI.agenerate_answer")
+    async def agenerate_answer(self, logger, query, use_memory, chat_history, refinement, documents=None):
+        logger = setup_logger()
+        logger.info("###### Function Name : agenerate_answer")
+
+        # generate_answer 의 retry(tries=3, delay=1) 와 동일
+        for attempt in range(3):
+            try:
+                llm_chain, inputs, context = await to_thread(self.prepare_answer, query, use_memory, chat_history, refinement, documents)
+                try:
+                    with request_timer("llm_refinement" if refinement else "llm_answer"):
+                        answer = await llm_chain.apredict(**inputs)
+                except Exception as e:
+                    check_json_mode_error(e, context["deployment"])
+                    deployment_scheduler.report_error(context["deployment"], e)
+                    raise
+                return self.finish_answer(query, refinement, answer, context)
+            except Exception as e:
+                if attempt == 2:
+                    raise
+                logger.error(f"{type(e).__name__} : {e}, retrying in 1 seconds...")
+                await asyncio.sleep(1)
+
+    # 응답 후처리 ( generate_answer, agenerate_answer 공통 )
+    def finish_answer(self, query, refinement, answer, context):
+        logger = setup_logger()
+        if not answer.strip():
+            raise ValueError("No answer returned")
+        
+        logger.info(answer)
+
+        prompt_entry = context["prompt_entry"]
+        tokenizer = context["tokenizer"]
+        deployment = context["deployment"]
+        product_group_name = context["product_group_name"]
+        product_group_code = query["product_group_code"]
+        product_code = query["product_code"]
+        prompt = prompt_entry["template"]
+        deployment_scheduler.record(deployment, len(tokenizer.encode(answer)))
 
         if refinement :
             answer_dict = preprocessing_refinement(answer)
@@ -264,14 +485,40 @@ class OpenAI:
             return answer_dict, prompt
         
 
+# 번역 메모리 ( key : (text hash, from, to) )
+TRANSLATION_MEMORY = TTLCache(maxsize=8192, ttl=86400)
+# 사전 번역된 고정 답변 ( key 동일 ) : 번역 메모리 ( LRU / TTL ) 와 분리해 만료 / 제거 없음
+FIXED_TRANSLATIONS = {}
+# 사전 번역 시 1회 요청에 포함할 대상 언어 수
+PREWARM_LANGUAGE_BATCH = 10
+# 사전 번역 실패 batch 재시도 간격 (초)
+PREWARM_RETRY_INTERVAL = 60
+
+def translation_key(text, language_from, language_to):
+    return (hashlib.sha256(str(text).encode('utf-8')).hexdigest(), language_from, language_to)
+
+def lookup_translation(key):
+    item = FIXED_TRANSLATIONS.get(key)
+    if item is not None:
+        return True, item
+    return TRANSLATION_MEMORY.get(key)
+
 class Translator:
+    prewarm_lock = threading.Lock()
+    # 사전 번역이 끝난 언어 / 진행 중 여부 / 실패 후 다음 재시도 시간
+    prewarmed_languages = set()
+    prewarm_running = False
+    prewarm_retry_time = 0
+
     def __init__(self):
         
         # config 파일 설정
         self.TRANSLATOR_TEXT_RESOURCE_KEY = keyvault_values["translator-account-key"]
         self.TRANSLATOR_TEXT_REGION = keyvault_values["translator-region"]
         self.TRANSLATOR_TEXT_ENDPOINT = keyvault_values["translator-endpoint"]
+        self.session = get_http_session("translator", self.TRANSLATOR_TEXT_ENDPOINT)
 
+    @traced("Translator.detect_language")
     def detect_language(self, body):
         logger.info("###### Function Name : detect_language")
 
@@ -286,7 +533,7 @@ class Translator:
         }
 
         try:
-            request = requests.post(constructed_url, headers=headers, json=body)
+            request = self.session.post(constructed_url, headers=headers, json=body)
             request.raise_for_status() 
         except requests.exceptions.RequestException as e:
             return logger.error(f"An error occurred while sending the request: {e}")
@@ -302,39 +549,117 @@ class Translator:
         
         return response
     
+    # 번역 메모리 조회 후, 전부 있으면 네트워크 호출 없이 동일한 형식으로 반환
+    @traced("Translator.translate_question")
     def translate_question(self, language_to, body, language_from=None) :
         logger.info("###### Function Name : translate_question")
-        path = 'translate'
-        constructed_url = self.TRANSLATOR_TEXT_ENDPOINT + path
- 
+        keys = [translation_key(item['text'], language_from, language_to) for item in body]
+        cached = [lookup_translation(key) for key in keys]
+        if all(found for found, _ in cached):
+            logger.info("Translation memory hit")
+            return [value for _, value in cached]
+
+        response = self.request_translation(language_to, body, language_from)
+        if isinstance(response, list) and len(response) == len(keys):
+            for key, item in zip(keys, response):
+                TRANSLATION_MEMORY.set(key, item)
+        return response
+
+    # 언어 감지 + 번역을 1회 호출로 처리 ( from 미지정 시 응답에 detectedLanguage 포함 )
+    @traced("Translator.detect_and_translate")
+    def detect_and_translate(self, language_to, body) :
+        logger.info("###### Function Name : detect_and_translate")
+        response = self.translate_question(language_to=language_to, body=body)
+        if not isinstance(response, list) or 'detectedLanguage' not in response[0]:
+            raise ValueError(f"Language detection failed : {response}")
+        return response
+
+    def translate_params(self, language_to, language_from=None) :
         if language_from is None :
-            params = {
-                'api-version': '3.0',
-                'to': language_to
-            }
-        else :
-            params = {
+            return {
                 'api-version': '3.0',
-                'from': language_from,
                 'to': language_to
             }
- 
-        headers = {
+        return {
+            'api-version': '3.0',
+            'from': language_from,
+            'to': language_to
+        }
+
+    def request_headers(self) :
+        return {
             'Ocp-Apim-Subscription-Key': self.TRANSLATOR_TEXT_RESOURCE_KEY,
             # location required if you're using a multi-service or regional (not global) resource.
             'Ocp-Apim-Subscription-Region': self.TRANSLATOR_TEXT_REGION,
             'Content-type': 'application/json',
             'X-ClientTraceId': str(uuid.uuid4())
         }
+
+    @traced("Translator.request_translation")
+    def request_translation(self, language_to, body, language_from=None) :
+        logger.info("###### Function Name : request_translation")
+        constructed_url = self.TRANSLATOR_TEXT_ENDPOINT + 'translate'
  
-        request = requests.post(constructed_url, params=params, headers=headers, json=body)
+        request = self.session.post(constructed_url, params=self.translate_params(language_to, language_from), headers=self.request_headers(), json=body)
         response = request.json()
  
         logger.info("Language translation successful")
         logger.info(json.dumps(response, sort_keys=True, indent=4, ensure_ascii=False, separators=(',', ': ')))
  
         return response
+
+    # async 번역 ( chat_async ) : 번역 메모리는 동기 버전과 공유
+    @traced("Translator.atranslate_question")
+    async def atranslate_question(self, language_to, body, language_from=None) :
+        logger.info("###### Function Name : atranslate_question")
+        keys = [translation_key(item['text'], language_from, language_to) for item in body]
+        cached = [lookup_translation(key) for key in keys]
+        if all(found for found, _ in cached):
+            logger.info("Translation memory hit")
+            return [value for _, value in cached]
+
+        constructed_url = self.TRANSLATOR_TEXT_ENDPOINT + 'translate'
+        client = get_async_http_client("translator-aio", self.TRANSLATOR_TEXT_ENDPOINT)
+        request = await client.post(constructed_url, params=self.translate_params(language_to, language_from), headers=self.request_headers(), json=body)
+        response = request.json()
+
+        logger.info("Language translation successful")
+        logger.info(json.dumps(response, sort_keys=True, indent=4, ensure_ascii=False, separators=(',', ': ')))
+
+        if isinstance(response, list) and len(response) == len(keys):
+            for key, item in zip(keys, response):
+                TRANSLATION_MEMORY.set(key, item)
+        return response
+
+    @traced("Translator.adetect_and_translate")
+    async def adetect_and_translate(self, language_to, body) :
+        logger.info("###### Function Name : adetect_and_translate")
+        response = await self.atranslate_question(language_to=language_to, body=body)
+        if not isinstance(response, list) or 'detectedLanguage' not in response[0]:
+            raise ValueError(f"Language detection failed : {response}")
+        return response
+
+    @traced("Translator.adetect_language")
+    async def adetect_language(self, body):
+        logger.info("###### Function Name : adetect_language")
+
+        constructed_url = self.TRANSLATOR_TEXT_ENDPOINT + 'detect'
+        client = get_async_http_client("translator-aio", self.TRANSLATOR_TEXT_ENDPOINT)
+        try:
+            request = await client.post(constructed_url, headers=self.request_headers(), json=body)
+            request.raise_for_status()
+        except httpx.HTTPError as e:
+            return logger.error(f"An error occurred while sending the request: {e}")
+
+        try:
+            response = request.json()
+        except json.JSONDecodeError as e:
+            return logger.error(f"JSON decoding error: {e}")
+
+        logger.info("Language detection successful")
+        return response
     
+    @traced("Translator.translate_multi_question")
     def translate_multi_question(self, language_to, texts, language_from=None) :
         logger.info("###### Function Name : translate_question")
         path = 'translate'
@@ -361,7 +686,7 @@ class Translator:
         }
 
         body = [{'text': text} for text in texts]
-        request = requests.post(constructed_url, params=params, headers=headers, json=body)
+        request = self.session.post(constructed_url, params=params, headers=headers, json=body)
         response = request.json()
  
         logger.info("Language translation successful")
@@ -370,3 +695,53 @@ class Translator:
         return response
 
     
+
+    # 고정 답변을 설정된 전체 언어로 사전 번역 ( 백그라운드, 아직 성공하지 못한 언어만 / 실패 시 PREWARM_RETRY_INTERVAL 후 재시도 )
+    def prewarm(self, texts, language_codes):
+        with Translator.prewarm_lock:
+            language_codes = [code for code in language_codes if code != 'en' and code not in Translator.prewarmed_languages]
+            if not language_codes or Translator.prewarm_running or time.time() < Translator.prewarm_retry_time:
+                return
+            Translator.prewarm_running = True
+        threading.Thread(target=self.prewarm_translations, args=(texts, language_codes), daemon=True).start()
+
+    def prewarm_translations(self, texts, language_codes):
+        logger.info("###### Function Name : prewarm_translations")
+        body = [{'text': text} for text in texts]
+        failed = []
+        try:
+            for i in range(0, len(language_codes), PREWARM_LANGUAGE_BATCH):
+                batch = language_codes[i:i + PREWARM_LANGUAGE_BATCH]
+                try:
+                    response = self.request_translation(language_to=batch, body=body, language_from='en')
+                    if not isinstance(response, list) or len(response) != len(texts):
+                        raise ValueError(f"Unexpected response : {response}")
+                    translations = {}
+                    for text, item in zip(texts, response):
+                        for translation in item['translations']:
+                            translations[translation_key(text, 'en', translation['to'])] = {'translations': [translation]}
+                    # batch 의 모든 언어 / 문장이 번역된 경우만 완료 처리
+                    if len(translations) != len(texts) * len(batch):
+                        raise ValueError(f"Missing translations : {len(translations)} / {len(texts) * len(batch)}")
+                    FIXED_TRANSLATIONS.update(translations)
+                    with Translator.prewarm_lock:
+                        Translator.prewarmed_languages.update(batch)
+                except Exception as e:
+                    failed.extend(batch)
+                    logger.error(f"Translation prewarm error : {batch} - {e}")
+        finally:
+            with Translator.prewarm_lock:
+                Translator.prewarm_running = False
+                if failed:
+                    Translator.prewarm_retry_time = time.time() + PREWARM_RETRY_INTERVAL
+        logger.info(f"Translation prewarm complete : {len(language_codes) - len(failed)} / {len(language_codes)} languages")
+
+    # 사전 번역된 고정 답변 ( 번역 메모리만 조회, 과부하 응답 등 Translator 호출 없이 ) : 없으면 영어 원문
+    def fixed_answer(self, text, language_to):
+        if language_to == 'en':
+            return text
+        found, item = lookup_translation(translation_key(text, 'en', language_to))
+        if not found:
+            logger.info(f"Fixed answer not translated yet : {language_to}")
+            return text
+        return item['translations'][0]['text']
@@ -0,0 +1,172 @@
+import json
+import time
+import threading
+import logging
+from database import MySql, AzureStorage
+from cache import TTLCache
+logger = logging.getLogger(__name__)
+
+# 모델 코드 resolver ( spec / manual data_id filter ) : SALES_CD LIKE '%code%' 대신 메모리 trigram index 조회
+# corp/locale ( tb_sales_prod_map ), corp/language ( tb_if_manual_list ) 단위로 처음 사용 시 적재
+MODEL_CODE_TTL = 86400
+# 전처리 완료 표시 ( CHATBOT_PREPROCESS preprocess 마지막 단계에서 기록 ) : 변경 시 적재된 테이블 다시 읽음
+PREPROCESS_MARKER_CONTAINER = "logs"
+PREPROCESS_MARKER_PATH = "prcapi/batch/complete.json"
+PREPROCESS_MARKER_CHECK_INTERVAL = 300
+NGRAM = 3
+
+# MySQL 비교와 같이 대소문자 / 앞뒤 공백 무시
+def normalize(value):
+    return str(value or "").strip().upper()
+
+def ngrams(value):
+    return {value[i:i + NGRAM] for i in range(len(value) - NGRAM + 1)}
+
+class SalesCodeIndex:
+    def __init__(self, rows):
+        self.rows = rows
+        self.sales_codes = [normalize(row['SALES_CD']) for row in rows]
+        self.postings = {}
+        for i, sales_code in enumerate(self.sales_codes):
+            for gram in ngrams(sales_code):
+                self.postings.setdefault(gram, []).append(i)
+
+    # SALES_CD LIKE '%code%' 와 같은 결과 : 가장 드문 trigram 의 후보만 부분 문자열 확인 ( 3자 미만은 전체 확인 )
+    def search(self, code):
+        code = normalize(code)
+        if len(code) < NGRAM:
+            candidates = range(len(self.sales_codes))
+        else:
+            grams = ngrams(code)
+            if any(gram not in self.postings for gram in grams):
+                return []
+            candidates = min((self.postings[gram] for gram in grams), key=len)
+        return [self.rows[i] for i in candidates if code in self.sales_codes[i]]
+
+class ManualItemIndex:
+    def __init__(self, rows):
+        self.item_ids = {}
+        for row in rows:
+            item_ids = self.item_ids.setdefault(normalize(row['PROD_MODEL_CD']), [])
+            if row['ITEM_ID'] not in item_ids:
+                item_ids.append(row['ITEM_ID'])
+
+    def get(self, prod_model_cd):
+        return self.item_ids.get(normalize(prod_model_cd), [])
+
+def load_sales_code_index(corp_cd, locale_cd):
+    logger.info(f"###### Function Name : load_sales_code_index ( {corp_cd} / {locale_cd} )")
+    sql_instance = MySql()
+    rows = sql_instance.get_table(query="""
+                                        SELECT SALES_CD, MATCHED_MODEL_CD, PROD_MODEL_CD
+                                        FROM tb_sales_prod_map
+                                        WHERE CORP_CD = %s AND LOCALE_CD = %s
+                                        """, parameters=(corp_cd, locale_cd))
+    if rows is None:
+        raise RuntimeError(f"tb_sales_prod_map load failed : {corp_cd} / {locale_cd}")
+    return SalesCodeIndex(rows)
+
+def load_manual_item_index(corp_cd, language):
+    logger.info(f"###### Function Name : load_manual_item_index ( {corp_cd} / {language} )")
+    sql_instance = MySql()
+    rows = sql_instance.get_table(query="""
+                                        SELECT PROD_MODEL_CD, ITEM_ID
+                                        FROM tb_if_manual_list
+                                        WHERE CORP_CD = %s AND LANGUAGE_LIST = %s
+                                        """, parameters=(corp_cd, language))
+    if rows is None:
+        raise RuntimeError(f"tb_if_manual_list load failed : {corp_cd} / {language}")
+    return ManualItemIndex(rows)
+
+LOADERS = {"sales": load_sales_code_index, "manual": load_manual_item_index}
+
+class ModelCodeResolver:
+    def __init__(self, ttl=MODEL_CODE_TTL, check_interval=PREPROCESS_MARKER_CHECK_INTERVAL):
+        # key : ("sales", CORP_CD, LOCALE_CD) / ("manual", CORP_CD, LANGUAGE_LIST)
+        self.indexes = TTLCache(maxsize=512, ttl=ttl)
+        self.check_interval = check_interval
+        self.checked_time = 0
+        self.marker = None
+        self.lock = threading.Lock()
+        self.refreshing = False
+
+    def get_index(self, kind, *key):
+        self.check_marker_background()
+        return self.indexes.get_or_load((kind,) + key, lambda: LOADERS[kind](*key))
+
+    # sales code 목록 -> tb_sales_prod_map 행 ( 중복 제거, 적재 순서 유지 )
+    def sales_rows(self, corp_cd, locale_cd, codes):
+        index = self.get_index("sales", corp_cd, locale_cd)
+        rows = {}
+        for code in codes:
+            for row in index.search(code):
+                rows.setdefault(id(row), row)
+        return list(rows.values())
+
+    def matched_model_codes(self, corp_cd, locale_cd, codes):
+        result = []
+        for row in self.sales_rows(corp_cd, locale_cd, codes):
+            if row['MATCHED_MODEL_CD'] != 'NOT_MATCHED' and row['MATCHED_MODEL_CD'] not in result:
+                result.append(row['MATCHED_MODEL_CD'])
+        return result
+
+    def prod_model_codes(self, corp_cd, locale_cd, codes):
+        result = []
+        for row in self.sales_rows(corp_cd, locale_cd, codes):
+            if row['PROD_MODEL_CD'] not in result:
+                result.append(row['PROD_MODEL_CD'])
+        return result
+
+    def manual_item_ids(self, corp_cd, language, prod_model_codes):
+        index = self.get_index("manual", corp_cd, language)
+        result = []
+        for prod_model_cd in prod_model_codes:
+            for item_id in index.get(prod_model_cd):
+                if item_id not in result:
+                    result.append(item_id)
+        return result
+
+    # 전처리 완료 표시 확인은 요청 경로 밖에서 ( 주기마다 1회 )
+    def check_marker_background(self):
+        if time.time() - self.checked_time < self.check_interval:
+            return
+        with self.lock:
+            if self.refreshing or time.time() - self.checked_time < self.check_interval:
+                return
+            self.refreshing = True
+            self.checked_time = time.time()
+        threading.Thread(target=self.check_marker, daemon=True).start()
+
+    def check_marker(self):
+        try:
+            as_instance = AzureStorage(container_name=PREPROCESS_MARKER_CONTAINER, storage_type='datast', use_cache=True,
+                                       cache_freshness=self.check_interval)
+            data = as_instance.read_file(PREPROCESS_MARKER_PATH)
+            if data is None:
+                return
+            marker = json.load(data)
+            if self.marker is None:
+                self.marker = marker
+            elif marker != self.marker:
+                logger.info(f"Preprocess marker changed : {self.marker} -> {marker}")
+                self.marker = marker
+                self.reload()
+        except Exception as e:
+            logger.error(f"Preprocess marker check error : {e}")
+        finally:
+            self.refreshing = False
+
+    # 적재된 테이블만 다시 읽어서 교체 ( 실패 시 기존 index 유지 )
+    def reload(self):
+        with self.indexes.lock:
+            keys = list(self.indexes.data.keys())
+        for key in keys:
+            try:
+                self.indexes.set(key, LOADERS[key[0]](*key[1:]))
+            except Exception as e:
+                logger.error(f"Model code index reload error : {key} {e}")
+
+    def stats(self):
+        return self.indexes.stats()
+
+model_code_resolver = ModelCodeResolver()
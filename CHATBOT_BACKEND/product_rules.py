@@ -0,0 +1,134 @@
+import csv
+import time
+import threading
+import logging
+from database import AzureStorage
+logger = logging.getLogger(__name__)
+
+# 제품군/제품 코드 별 에러코드 / 제품군 이름 ( get_ErrorCode / get_GroupName )
+# 기본값은 config/rules, raw-data 에 같은 형식의 파일이 있으면 그 파일 사용 ( 배포 없이 변경 )
+RULE_FILES = {
+    "error_code": "./config/rules/error_code.csv",
+    "product_name": "./config/rules/product_name.csv",
+}
+RULE_BLOBS = {
+    "error_code": "Contents_Manual_List_Mst_Data/ERROR_CODE_RULE.csv",
+    "product_name": "Contents_Manual_List_Mst_Data/PRODUCT_NAME_RULE.csv",
+}
+# 규칙 갱신 주기 (초)
+RULES_TTL = 600
+# 모든 제품군 / 제품 코드
+WILDCARD = "*"
+
+def rule_matches(rule, group_cd, prod_cd):
+    return rule['GROUP_CD'] in (WILDCARD, group_cd) and rule['PROD_CD'] in (WILDCARD, prod_cd)
+
+# 에러코드 포함 여부 ( 기존 : 추출 코드가 목록의 에러코드 중 하나의 부분 문자열 ) -> 부분 문자열 집합 조회
+def code_substrings(codes):
+    substrings = set()
+    for code in codes:
+        code = code.upper()
+        for i in range(len(code)):
+            for j in range(i + 1, len(code) + 1):
+                substrings.add(code[i:j])
+    if codes:
+        substrings.add("")
+    return frozenset(substrings)
+
+class ProductRules:
+    # 규칙은 파일 순서대로 확인, 처음 일치한 규칙 사용 ( 기존 if / elif 순서 )
+    def __init__(self, error_code_rules, product_name_rules):
+        self.loaded_time = time.time()
+        self.error_code_rules = [dict(rule, ERROR_CODES=[code for code in rule['ERROR_CODES'].split('|') if code]) for rule in error_code_rules]
+        self.product_name_rules = product_name_rules
+        # (GROUP_CD, PROD_CD) 별 결과 ( 처음 조회 시 계산 )
+        self.error_codes = {}
+        self.group_names = {}
+
+    def get_error_codes(self, group_cd, prod_cd):
+        key = (group_cd, prod_cd)
+        entry = self.error_codes.get(key)
+        if entry is None:
+            codes = next((rule['ERROR_CODES'] for rule in self.error_code_rules if rule_matches(rule, group_cd, prod_cd)), [])
+            entry = {"list": str(codes), "substrings": code_substrings(codes)}
+            self.error_codes[key] = entry
+        return entry
+
+    def error_code_list(self, group_cd, prod_cd):
+        return self.get_error_codes(group_cd, prod_cd)["list"]
+
+    # 추출된 모든 에러코드 ( ',' 구분 ) 가 목록에 포함되면 그대로, 아니면 "Unknown_ErrorCode"
+    def check_error_code(self, group_cd, prod_cd, error_code):
+        if error_code == "None":
+            return "None"
+        substrings = self.get_error_codes(group_cd, prod_cd)["substrings"]
+        if all(code.upper().strip() in substrings for code in error_code.split(",")):
+            return error_code
+        return "Unknown_ErrorCode"
+
+    def group_name(self, group_cd, prod_cd):
+        key = (group_cd, prod_cd)
+        name = self.group_names.get(key)
+        if name is None:
+            name = next((rule['GROUP_NAME'] for rule in self.product_name_rules if rule_matches(rule, group_cd, prod_cd)), "")
+            self.group_names[key] = name
+        return name
+
+def read_rule_file(path):
+    with open(path, encoding="utf-8", newline="") as f:
+        return list(csv.DictReader(f))
+
+def read_rules(kind, as_instance):
+    df = as_instance.read_file(RULE_BLOBS[kind])
+    if df is not None:
+        return df.fillna("").astype(str).to_dict('records')
+    return read_rule_file(RULE_FILES[kind])
+
+def load_product_rules():
+    logger.info("###### Function Name : load_product_rules")
+    as_instance = AzureStorage(container_name='raw-data', storage_type='datast', use_cache=True)
+    product_rules = ProductRules(read_rules("error_code", as_instance), read_rules("product_name", as_instance))
+    logger.info(f"Product rules load complete : error code {len(product_rules.error_code_rules)}, product name {len(product_rules.product_name_rules)}")
+    return product_rules
+
+class ProductRulesRegistry:
+    def __init__(self, ttl=RULES_TTL):
+        self.ttl = ttl
+        self.product_rules = None
+        self.lock = threading.Lock()
+        self.refreshing = False
+
+    def get(self):
+        product_rules = self.product_rules
+        if product_rules is None:
+            with self.lock:
+                if self.product_rules is None:
+                    self.product_rules = load_product_rules()
+                return self.product_rules
+
+        if time.time() - product_rules.loaded_time > self.ttl:
+            self.refresh_background()
+        return product_rules
+
+    def refresh_background(self):
+        with self.lock:
+            if self.refreshing:
+                return
+            self.refreshing = True
+        threading.Thread(target=self.refresh, daemon=True).start()
+
+    def refresh(self):
+        try:
+            self.product_rules = load_product_rules()
+        except Exception as e:
+            # 갱신 실패 시 기존 규칙 유지, 다음 주기에 재시도
+            logger.error(f"Product rules refresh error : {e}")
+            if self.product_rules is not None:
+                self.product_rules.loaded_time = time.time()
+        finally:
+            self.refreshing = False
+
+product_rules_registry = ProductRulesRegistry()
+
+def get_product_rules():
+    return product_rules_registry.get()
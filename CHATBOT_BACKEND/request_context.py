@@ -0,0 +1,81 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# 요청 처리 상한 (초) : 검색/본문 조회 대기 시간은 남은 시간 이내로 제한
+REQUEST_DEADLINE = 120
+
+class RequestContext:
+    def __init__(self, chatid="", chat_session_id="", rag_order="", deadline=REQUEST_DEADLINE):
+        self.chatid = chatid
+        self.chat_session_id = chat_session_id
+        self.rag_order = rag_order
+        self.start_time = time.time()
+        self.deadline = self.start_time + deadline
+        self.timings = {}
+        self.caches = {}
+
+    # 요청 id 는 body 파싱 후 설정
+    def set_ids(self, chatid, chat_session_id, rag_order):
+        self.chatid = chatid
+        self.chat_session_id = chat_session_id
+        self.rag_order = rag_order
+
+    @property
+    def log_prefix(self):
+        return f"{self.chatid}_{self.chat_session_id}_{self.rag_order}"
+
+    def remaining(self):
+        return max(self.deadline - time.time(), 0)
+
+    # timeout 을 남은 요청 시간 이내로 제한
+    def cap(self, timeout):
+        return min(timeout, self.remaining())
+
+    # 요청 단위 캐시 ( name 별 dict )
+    def cache(self, name):
+        return self.caches.setdefault(name, {})
+
+    def add_timing(self, name, seconds):
+        self.timings[name] = self.timings.get(name, 0) + seconds
+
+    @contextmanager
+    def timer(self, name):
+        start_time = time.time()
+        try:
+            yield
+        finally:
+            self.add_timing(name, time.time() - start_time)
+
+# 현재 요청 ( thread / asyncio task 별로 분리, worker thread 는 copy_context 로 전달 )
+request_context_var = ContextVar("request_context", default=None)
+
+def start_request_context(deadline=REQUEST_DEADLINE):
+    context = RequestContext(deadline=deadline)
+    request_context_var.set(context)
+    return context
+
+def end_request_context(context):
+    if request_context_var.get() is context:
+        request_context_var.set(None)
+    context.caches = {}
+
+def get_request_context():
+    return request_context_var.get()
+
+# 현재 요청의 구간 시간 기록 ( 요청 밖에서는 기록하지 않음 )
+@contextmanager
+def request_timer(name):
+    context = get_request_context()
+    if context is None:
+        yield
+        return
+    with context.timer(name):
+        yield
+
+# 대기 시간을 현재 요청의 남은 시간 이내로 제한
+def request_timeout(timeout):
+    context = get_request_context()
+    if context is None:
+        return timeout
+    return context.cap(timeout)
@@ -0,0 +1,188 @@
+import time
+import threading
+from collections import deque
+from tools import load_balancing
+import logging
+logger = logging.getLogger(__name__)
+
+# 로드밸런서에서 받은 deployment 의 사용 기간 (초) : 만료 후 로드밸런서에서 다시 받아 부하 분산에 반영
+DEPLOYMENT_LEASE_TTL = 60
+# deployment 별 분당 한도 ( 로드밸런서 응답에 한도 정보가 없어 기본값 사용 )
+DEPLOYMENT_LIMITS = {
+    "gpt": {"tpm": 120000, "rpm": 720},
+    "embedding": {"tpm": 240000, "rpm": 1440},
+}
+USAGE_WINDOW = 60
+# 429 / 5xx / 연결 오류 응답 deployment 는 retry-after ( 없으면 기본값, 초 ) 동안 로컬 선택 제외 -> 로드밸런서에서 다시 lease
+DEPLOYMENT_FAIL_COOLDOWN = 10
+DEPLOYMENT_FAIL_STATUS = (408, 429, 500, 502, 503, 504)
+DEPLOYMENT_FAIL_ERRORS = ("APIConnectionError", "APITimeoutError")
+
+# 응답 header 의 retry-after-ms / retry-after (초), 없으면 None
+def retry_after_seconds(error):
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    for name, scale in (("retry-after-ms", 0.001), ("retry-after", 1)):
+        try:
+            return float(headers.get(name)) * scale
+        except (TypeError, ValueError):
+            continue
+    return None
+
+def is_deployment_failure(error):
+    return getattr(error, "status_code", None) in DEPLOYMENT_FAIL_STATUS or type(error).__name__ in DEPLOYMENT_FAIL_ERRORS
+
+class Deployment:
+    def __init__(self, type, api_base, api_key, api_version, api_model):
+        self.type = type
+        self.api_base = api_base
+        self.api_key = api_key
+        self.api_version = api_version
+        self.api_model = api_model
+        self.tpm_limit = DEPLOYMENT_LIMITS[type]["tpm"]
+        self.rpm_limit = DEPLOYMENT_LIMITS[type]["rpm"]
+        self.lease_expire_time = 0
+        self.usage = deque()
+        self.tokens = 0
+
+    @property
+    def key(self):
+        return (self.type, self.api_base, self.api_model, self.api_version)
+
+    def renew(self, api_key, ttl):
+        self.api_key = api_key
+        self.lease_expire_time = time.time() + ttl
+
+    def expired(self, now):
+        return self.lease_expire_time < now
+
+    # 최근 60초 사용량만 유지
+    def prune(self, now):
+        while self.usage and self.usage[0][0] <= now - USAGE_WINDOW:
+            _, tokens, _ = self.usage.popleft()
+            self.tokens -= tokens
+
+    def requests(self):
+        return sum(1 for _, _, is_request in self.usage if is_request)
+
+    def has_capacity(self, token_size):
+        return self.tokens + token_size <= self.tpm_limit and self.requests() < self.rpm_limit
+
+    def load(self):
+        return max(self.tokens / self.tpm_limit, self.requests() / self.rpm_limit)
+
+    def add_usage(self, now, tokens, is_request):
+        self.usage.append((now, tokens, is_request))
+        self.tokens += tokens
+
+    def credentials(self):
+        return self.api_base, self.api_key, self.api_version, self.api_model
+
+class DeploymentScheduler:
+    def __init__(self, lease_ttl=DEPLOYMENT_LEASE_TTL):
+        self.lease_ttl = lease_ttl
+        self.deployments = {}
+        self.lock = threading.Lock()
+        self.lease_count = 0
+        self.local_count = 0
+        self.fail_count = 0
+        # key -> cooldown 종료 시간
+        self.cooldowns = {}
+
+    # 여유 있는 deployment 를 로컬에서 선택, 없거나 lease 만료 시에만 로드밸런서 호출
+    def acquire(self, token_size, type):
+        with self.lock:
+            deployment = self.select(token_size, type, time.time())
+            if deployment is not None:
+                self.local_count += 1
+                return deployment
+
+        apiBase, apiKey, apiVersion, apiModel = load_balancing(token_size, type=type)
+        if apiBase is None or apiKey is None or apiVersion is None or apiModel is None:
+            return None
+
+        with self.lock:
+            now = time.time()
+            deployment = self.lease(type, apiBase, apiKey, apiVersion, apiModel, now)
+            deployment.add_usage(now, token_size, True)
+            self.lease_count += 1
+            return deployment
+
+    def select(self, token_size, type, now):
+        candidates = []
+        for key, deployment in list(self.deployments.items()):
+            if deployment.expired(now):
+                del self.deployments[key]
+                continue
+            if deployment.type != type or self.cooling(key, now):
+                continue
+            deployment.prune(now)
+            if deployment.has_capacity(token_size):
+                candidates.append(deployment)
+
+        if not candidates:
+            return None
+
+        deployment = min(candidates, key=lambda item: item.load())
+        deployment.add_usage(now, token_size, True)
+        return deployment
+
+    def lease(self, type, api_base, api_key, api_version, api_model, now):
+        deployment = Deployment(type, api_base, api_key, api_version, api_model)
+        deployment = self.deployments.setdefault(deployment.key, deployment)
+        deployment.prune(now)
+        deployment.renew(api_key, self.lease_ttl)
+        logger.info(f"Deployment leased : {type}, {api_base}, {api_model}")
+        return deployment
+
+    def cooling(self, key, now):
+        until = self.cooldowns.get(key)
+        if until is None:
+            return False
+        if until <= now:
+            del self.cooldowns[key]
+            return False
+        return True
+
+    # 실패한 deployment 는 cooldown 동안 로컬 선택 제외 + lease 해제 ( 다음 acquire 는 로드밸런서 호출 )
+    def fail(self, deployment, retry_after=None):
+        if deployment is None:
+            return
+        cooldown = retry_after if retry_after is not None else DEPLOYMENT_FAIL_COOLDOWN
+        with self.lock:
+            self.cooldowns[deployment.key] = time.time() + cooldown
+            self.deployments.pop(deployment.key, None)
+            self.fail_count += 1
+        logger.info(f"Deployment failed : {deployment.type}, {deployment.api_base}, {deployment.api_model}, cooldown {cooldown}s")
+
+    # LLM / embedding 오류 경로 : 429 / 5xx / 연결 오류만 deployment 실패로 처리
+    def report_error(self, deployment, error):
+        if is_deployment_failure(error):
+            self.fail(deployment, retry_after_seconds(error))
+
+    # 실제 사용 token ( completion 등 ) 반영
+    def record(self, deployment, tokens):
+        if deployment is None or tokens <= 0:
+            return
+        with self.lock:
+            deployment.add_usage(time.time(), tokens, False)
+
+    def stats(self):
+        with self.lock:
+            now = time.time()
+            deployments = []
+            for deployment in self.deployments.values():
+                deployment.prune(now)
+                deployments.append({"type": deployment.type,
+                                    "apiBase": deployment.api_base,
+                                    "apiModel": deployment.api_model,
+                                    "tpm": deployment.tokens,
+                                    "rpm": deployment.requests(),
+                                    "leaseRemaining": round(deployment.lease_expire_time - now, 1)})
+            return {"lease_count": self.lease_count,
+                    "local_count": self.local_count,
+                    "fail_count": self.fail_count,
+                    "cooling": len([key for key in list(self.cooldowns) if self.cooling(key, now)]),
+                    "deployments": deployments}
+
+deployment_scheduler = DeploymentScheduler()
@@ -0,0 +1,73 @@
+import ast
+import json
+import logging
+logger = logging.getLogger(__name__)
+
+# LLM JSON 응답 파싱 ( preprocessing_answer / preprocessing_refinement )
+CLOSERS = {'{': '}', '[': ']'}
+
+def strip_code_fence(text):
+    return text.replace("```json", "").replace("```", "").strip()
+
+# 잘린 JSON ( max_tokens / 연결 종료 ) : 마지막으로 완성된 값까지 남기고 열린 괄호를 닫아서 파싱
+def complete_json(text):
+    start = next((i for i, ch in enumerate(text) if ch in CLOSERS), None)
+    if start is None:
+        raise ValueError("No JSON object in answer")
+
+    # [container, expect_key]
+    stack = []
+    in_string = False
+    escape = False
+    string_is_key = False
+    safe_end, safe_stack = None, None
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == '\\':
+                escape = True
+            elif ch == '"':
+                in_string = False
+                if not string_is_key:
+                    safe_end, safe_stack = i + 1, [item[0] for item in stack]
+            continue
+
+        if ch == '"':
+            in_string = True
+            string_is_key = stack[-1][0] == '{' and stack[-1][1]
+        elif ch in CLOSERS:
+            stack.append([ch, ch == '{'])
+            safe_end, safe_stack = i + 1, [item[0] for item in stack]
+        elif ch in ('}', ']'):
+            stack.pop()
+            safe_end, safe_stack = i + 1, [item[0] for item in stack]
+            if not stack:
+                break
+        elif ch == ':':
+            stack[-1][1] = False
+        elif ch == ',':
+            safe_end, safe_stack = i, [item[0] for item in stack]
+            if stack[-1][0] == '{':
+                stack[-1][1] = True
+
+    completed = text[start:safe_end] + "".join(CLOSERS[item] for item in reversed(safe_stack))
+    return json.loads(completed)
+
+# JSON mode 응답은 json.loads, 이전 형식 ( Python literal ) 은 literal_eval, 잘린 응답은 complete_json
+def parse_json_answer(answer):
+    text = strip_code_fence(answer)
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    try:
+        value = ast.literal_eval(text)
+        if isinstance(value, dict):
+            return value
+    except (ValueError, SyntaxError, MemoryError, RecursionError):
+        pass
+    value = complete_json(text)
+    logger.info("Answer JSON was incomplete, parsed up to the last complete value")
+    return value
@@ -0,0 +1,53 @@
+import asyncio
+import pytest
+from admission import AdmissionController, AdmissionRejected
+
+def controller():
+    return AdmissionController(initial_limit=8, min_limit=4, max_limit=16)
+
+# 동기 경로는 대기 없이 바로 거절
+def test_acquire_sheds_immediately():
+    c = controller()
+    tickets = [c.acquire("KR") for _ in range(8)]
+    with pytest.raises(AdmissionRejected) as error:
+        c.acquire("KR")
+    assert error.value.reason == "limit"
+    c.release(tickets[0])
+    assert c.acquire("KR").wait_time == 0.0
+
+# 한 locale 이 한도를 모두 차지해도 다른 locale 이 요청하면 상한 ( 한도의 절반 ) 까지만 다시 배정
+def test_hot_locale_cannot_starve_others():
+    c = controller()
+    kr = [c.acquire("KR") for _ in range(8)]
+    with pytest.raises(AdmissionRejected):
+        c.acquire("US")
+
+    for ticket in kr[:4]:
+        c.release(ticket)
+    with pytest.raises(AdmissionRejected) as error:
+        c.acquire("KR")
+    assert error.value.reason == "locale_limit"
+    assert c.acquire("US").locale == "US"
+    assert c.stats()["locales"] == {"KR": 4, "US": 1}
+
+# 경합 ( 다른 locale 거절 / 대기 ) 이 없으면 상한 없이 한도까지 사용
+def test_no_cap_without_contention():
+    c = controller()
+    c.acquire("US")
+    assert len([c.acquire("KR") for _ in range(7)]) == 7
+
+# async 경로는 locale 별 대기열에서 빈 자리를 기다림
+def test_aacquire_waits_for_release():
+    c = controller()
+    tickets = [c.acquire("KR") for _ in range(4)] + [c.acquire("US") for _ in range(4)]
+
+    async def run():
+        task = asyncio.ensure_future(c.aacquire("US", timeout=2))
+        await asyncio.sleep(0.05)
+        assert not task.done()
+        c.release(tickets[-1])
+        return await task
+
+    ticket = asyncio.run(run())
+    assert ticket.locale == "US"
+    assert ticket.wait_time > 0
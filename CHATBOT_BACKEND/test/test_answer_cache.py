@@ -0,0 +1,73 @@
+import os
+import numpy as np
+import pytest
+import answer_cache as answer_cache_module
+from answer_cache import AnswerCache, use_answer_cache
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+KEY = ("uk-en", "REF", "REF", "")
+
+def vector(seed):
+    return np.random.default_rng(seed).standard_normal(8)
+
+# 첫 질문 ( 이력 '' / 없음 ) 만 답변 재사용
+def test_use_answer_cache():
+    assert use_answer_cache(None)
+    assert use_answer_cache("")
+    assert not use_answer_cache("user: hi\n\nassistant: hello")
+
+def test_store_and_lookup():
+    cache = AnswerCache()
+    cache.store(KEY, vector(1), {"answer": "a"}, 1.0)
+    cached, score = cache.lookup(KEY, vector(1), "UK_EN")
+    assert cached == {"answer": "a"}
+    assert score == pytest.approx(1.0, abs=1e-5)
+    assert cache.lookup(KEY, vector(2), "UK_EN")[0] is None
+
+# 만료 답변은 같은 key 조회가 없어도 주기적으로 정리
+def test_sweep_removes_expired_keys(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(answer_cache_module.time, "time", lambda: now[0])
+    cache = AnswerCache(ttl=10, sweep_interval=60)
+    for i in range(5):
+        cache.store(("uk-en", "REF", "REF", f"MODEL{i}"), vector(i), {"answer": i}, 1.0)
+    assert cache.stats()["keys"] == 5
+
+    now[0] += 100
+    cache.store(KEY, vector(9), {"answer": 9}, 1.0)
+    stats = cache.stats()
+    assert stats["keys"] == 1
+    assert stats["entries"] == 1
+
+# 전체 최대 답변 수 초과 시 가장 오래된 답변부터 제거
+def test_max_entries(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(answer_cache_module.time, "time", lambda: now[0])
+    cache = AnswerCache(max_entries=3)
+    for i in range(5):
+        now[0] += 1
+        cache.store(("uk-en", "REF", "REF", f"MODEL{i}"), vector(i), {"answer": i}, 1.0)
+    stats = cache.stats()
+    assert stats["entries"] == 3
+    assert stats["evicted"] == 2
+    assert set(cache.buckets) == {("uk-en", "REF", "REF", f"MODEL{i}") for i in (2, 3, 4)}
+
+# 같은 첫 질문 반복 ( 현재 질문이 이미 저장되어 chat history 는 '' ) -> 두 번째부터 답변 재사용
+def test_repeated_first_turn_hits(monkeypatch):
+    pytest.importorskip("pandas")
+    monkeypatch.chdir(APP_ROOT)
+    from benchmark import fakes
+    from benchmark.run import Runner, load_corpus, DEFAULT_CORPUS
+    installed = fakes.install()
+    monkeypatch.setattr(answer_cache_module, "ANSWER_CACHE_ENABLED", True)
+    answer_cache = answer_cache_module.answer_cache
+
+    case = next(case for case in load_corpus(DEFAULT_CORPUS) if case["name"] == "ref-first-turn")
+    runner = Runner([case], installed["authorization"])
+    before = answer_cache.stats()["locales"].get(case["locale_cd"], {"lookups": 0, "hits": 0})
+    results = [runner.run_case(case) for _ in range(3)]
+
+    assert all(result["ok"] for _, result in results)
+    stats = answer_cache.stats()["locales"][case["locale_cd"]]
+    assert stats["lookups"] - before["lookups"] == 3
+    assert stats["hits"] - before["hits"] == 2
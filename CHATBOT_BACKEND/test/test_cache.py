@@ -0,0 +1,66 @@
+import asyncio
+import threading
+import pytest
+from cache import TTLCache
+
+# 같은 key 동시 async 요청은 loader 1회, 나머지는 coalesced
+def test_aget_or_load_single_flight():
+    cache = TTLCache()
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return [0.1, 0.2]
+
+    async def run():
+        return await asyncio.gather(*[cache.aget_or_load("key", loader) for _ in range(5)])
+
+    assert asyncio.run(run()) == [[0.1, 0.2]] * 5
+    assert len(calls) == 1
+    assert asyncio.run(cache.aget_or_load("key", loader)) == [0.1, 0.2]
+    stats = cache.stats()
+    assert (stats["misses"], stats["coalesced"], stats["hits"]) == (1, 4, 1)
+
+def test_aget_or_load_error_shared():
+    cache = TTLCache()
+
+    async def loader():
+        await asyncio.sleep(0.05)
+        raise ValueError("embedding failed")
+
+    async def run():
+        return await asyncio.gather(*[cache.aget_or_load("key", loader) for _ in range(3)], return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert cache.inflight == {}
+    assert cache.get("key") == (False, None)
+
+# 동기 get_or_load ( 다른 thread ) 가 진행 중이면 async 요청은 그 결과를 기다림
+def test_aget_or_load_joins_sync_flight():
+    cache = TTLCache()
+    started = threading.Event()
+    release = threading.Event()
+
+    def loader():
+        started.set()
+        release.wait(5)
+        return "value"
+
+    thread = threading.Thread(target=cache.get_or_load, args=("key", loader))
+    thread.start()
+    assert started.wait(5)
+
+    async def aloader():
+        pytest.fail("loader called twice")
+
+    async def run():
+        task = asyncio.ensure_future(cache.aget_or_load("key", aloader))
+        await asyncio.sleep(0.05)
+        release.set()
+        return await task
+
+    assert asyncio.run(run()) == "value"
+    thread.join(5)
+    assert cache.stats()["coalesced"] == 1
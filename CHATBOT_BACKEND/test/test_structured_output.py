@@ -0,0 +1,39 @@
+import json
+import pytest
+from structured_output import complete_json, parse_json_answer
+
+ANSWER = {"response_body": "Unplug the washer for 1 minute.\n\"Reset\" \\ then retry 😀",
+          "additional_questions": ["Why is it {still} beeping?", "Where is the filter?"],
+          "nested": {"response_body": "not this one", "list": [1, 2.5, None, True]}}
+
+# complete_json : 잘린 응답은 마지막으로 완성된 값까지 파싱
+def test_complete_json_whole_object():
+    assert complete_json(json.dumps(ANSWER)) == ANSWER
+
+def test_complete_json_truncated_inside_string():
+    text = '{"response_body": "done", "additional_questions": ["first", "sec'
+    assert complete_json(text) == {"response_body": "done", "additional_questions": ["first"]}
+
+def test_complete_json_truncated_after_key():
+    assert complete_json('{"response_body": "done", "additional_') == {"response_body": "done"}
+    assert complete_json('{"response_body": "done", "additional_questions":') == {"response_body": "done"}
+
+def test_complete_json_braces_inside_strings():
+    text = '{"a": "} ] {", "b": ["x\\"]", '
+    assert complete_json(text) == {"a": "} ] {", "b": ['x"]']}
+
+def test_complete_json_every_prefix():
+    text = json.dumps(ANSWER, ensure_ascii=False)
+    for end in range(1, len(text) + 1):
+        value = complete_json(text[:end])
+        assert isinstance(value, dict)
+        assert set(value) <= set(ANSWER)
+
+def test_complete_json_without_object():
+    with pytest.raises(ValueError):
+        complete_json("no json here")
+
+def test_parse_json_answer_formats():
+    assert parse_json_answer("```json\n" + json.dumps(ANSWER) + "\n```") == ANSWER
+    assert parse_json_answer("{'response_body': 'literal', 'flag': True}") == {"response_body": "literal", "flag": True}
+    assert parse_json_answer('{"response_body": "cut') == {}
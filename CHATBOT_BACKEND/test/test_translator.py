@@ -0,0 +1,51 @@
+import pytest
+
+pytest.importorskip("pandas")
+
+@pytest.fixture
+def model(monkeypatch):
+    from benchmark import fakes
+    fakes.install()
+    import model
+    monkeypatch.setattr(model.Translator, "prewarmed_languages", set())
+    monkeypatch.setattr(model.Translator, "prewarm_running", False)
+    monkeypatch.setattr(model.Translator, "prewarm_retry_time", 0)
+    monkeypatch.setattr(model, "FIXED_TRANSLATIONS", {})
+    monkeypatch.setattr(model, "PREWARM_LANGUAGE_BATCH", 2)
+    return model
+
+TEXTS = ["We are sorry.", "Please try again later."]
+LANGUAGES = ["de", "fr", "ko"]
+
+# 실패한 batch 는 완료 처리하지 않고 재시도 대상으로 남김
+def test_prewarm_retries_failed_batch(model, monkeypatch):
+    translator = model.Translator()
+    request_translation = translator.request_translation
+    calls = []
+
+    def flaky(language_to, body, language_from=None):
+        calls.append(list(language_to))
+        if "ko" in language_to and len(calls) == 2:
+            return {"error": {"code": 429001}}
+        return request_translation(language_to, body, language_from)
+
+    monkeypatch.setattr(translator, "request_translation", flaky)
+    translator.prewarm_translations(TEXTS, LANGUAGES)
+    assert model.Translator.prewarmed_languages == {"de", "fr"}
+    assert model.Translator.prewarm_retry_time > 0
+
+    model.Translator.prewarm_retry_time = 0
+    translator.prewarm_translations(TEXTS, ["ko"])
+    assert model.Translator.prewarmed_languages == {"de", "fr", "ko"}
+    assert calls[-1] == ["ko"]
+
+# 사전 번역은 번역 메모리 ( LRU / TTL ) 가 비워져도 유지, 번역 호출 없이 조회
+def test_fixed_translations_survive_memory_eviction(model, monkeypatch):
+    translator = model.Translator()
+    translator.prewarm_translations(TEXTS, LANGUAGES)
+    model.TRANSLATION_MEMORY.clear()
+
+    monkeypatch.setattr(translator, "request_translation", lambda *args, **kwargs: pytest.fail("network call"))
+    assert translator.fixed_answer(TEXTS[0], "ko") == TEXTS[0]
+    response = translator.translate_question(language_to="fr", body=[{"text": text} for text in TEXTS], language_from="en")
+    assert [item["translations"][0]["to"] for item in response] == ["fr", "fr"]
@@ -0,0 +1,44 @@
+import json
+import glob
+import os
+import threading
+from write_behind import WriteBehindQueue
+
+def spilled(spill_dir):
+    items = []
+    for file_path in glob.glob(os.path.join(spill_dir, "spill-*.jsonl")):
+        with open(file_path, encoding="utf-8") as f:
+            items.extend(json.loads(line)["payload"] for line in f if line.strip())
+    return items
+
+# shutdown timeout 시 전송 완료 / 전송 중 batch 는 spill 하지 않고, 아직 보내지 않은 item 만 1회 spill
+def test_shutdown_spills_only_undelivered(tmp_path):
+    queue = WriteBehindQueue(spill_dir=str(tmp_path), batch_size=2, flush_interval=0.01)
+    delivered = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def handler(payloads):
+        if payloads[0] == 2:
+            started.set()
+            release.wait(5)
+            # 전송 중 batch 의 일부 실패 -> shutdown 이후라 flusher 가 직접 spill
+            delivered.append(payloads[0])
+            return [payloads[1]]
+        delivered.extend(payloads)
+        return []
+
+    # handler 등록 전에 넣어 한 번의 flush 에서 [0, 1] [2, 3] [4, 5] 로 꺼냄
+    for i in range(6):
+        queue.enqueue("summary", i)
+    queue.register("summary", handler)
+    assert started.wait(5)
+
+    queue.shutdown(timeout=0.1)
+    assert sorted(spilled(str(tmp_path))) == [4, 5]
+
+    release.set()
+    queue.thread.join(5)
+    assert delivered == [0, 1, 2]
+    assert sorted(spilled(str(tmp_path))) == [3, 4, 5]
+    assert queue.stats()["inflight"] == 0
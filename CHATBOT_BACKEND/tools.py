@@ -3,12 +3,27 @@ import json
 import pytz
 from datetime import datetime
 import logging
-from database import AzureStorage, MySql, CosmosDB
+from database import AzureStorage, MySql, CosmosDB, VIEWER_SAS_PERMISSION
+from clients import client_registry
+from write_behind import write_behind_queue
+from answer_cache import answer_cache
+from product_rules import get_product_rules
+from structured_output import parse_json_answer
+from cache import TTLCache
 import re
+from urllib.parse import unquote
 import tiktoken
 import requests
 import os
+import time
+import asyncio
+import contextvars
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from log import setup_logger
+from request_context import get_request_context, request_timeout
+from tracing import traced, trace_tree
 from retry import retry
 
 from cryptography.hazmat.primitives import padding
@@ -25,9 +40,44 @@ class OpenAIResourceError(Exception):
 class AuthorizationError(Exception):
     pass
 
+# Typed search timeouts in seconds ( tools/concurrent_search )
+SEARCH_TIMEOUT = {"contents" : 10,
+                  "youtube" : 10,
+                  "manual" : 10,
+                  "spec" : 10}
+
+search_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="ai-search")
+
+# 세션별 대화 이력 캐시 ( key : (db, container, chatid, chat_session_id) ) : 다음 turn 은 마지막 chat_order 이후만 조회
+CHAT_HISTORY_CACHE = TTLCache(maxsize=4096, ttl=1800)
+CHAT_HISTORY_TURNS = 11
+
+# tmp_chat_summary_dash INSERT ( upload_chat_summary, write-behind )
+CHAT_SUMMARY_INSERT_QUERY = """INSERT INTO tmp_chat_summary_dash (CHAT_ID, CHAT_SESSION_ID, COUNTRY_CD, LANGUAGE_CD, RAG_ORDER, PROD_CD, USER ,
+                                                        ASSISTANT, QUERY_ORI, GPT_ANSWER, DETECTLANGUAGE, USERSELECTLANGUAGE,
+                                                        INDEXNAME, REFINEMENT_TOKEN, QA_TOKEN, RAG_TOTAL_TIME,REFINE_INPUT_QUESTION,
+                                                        REFINE_INTENT, REFINE_KEYWORDS, REFINE_SYMPTOM, REFINE_OUTPUT_QUESTION_1,
+                                                        REFINE_OUTPUT_QUESTION_2, REFINE_OUTPUT_QUESTION_3, CONTEXTS,
+                                                        REF_DOC_1_TYPE, REF_DOC_1_ID, REF_DOC_1_SCORE,
+                                                        REF_DOC_2_TYPE, REF_DOC_2_ID, REF_DOC_2_SCORE,
+                                                        REF_DOC_3_TYPE, REF_DOC_3_ID, REF_DOC_3_SCORE,
+                                                        CREATE_DATE, CREATE_USER, UPDATE_DATE, UPDATE_USER, GPT_EVAL, EVAL_YN)
+                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"""
+
+# 고정 답변 ( 영어 원문, Translator 번역 메모리에 사전 번역 )
+FIX_ANSWERS = {"FIX_1" : "I'm sorry that i can't understand your issue.\n\nCould you tell me in detail the issue or check Error Code on display window.\n\nThank you for your patience",
+               "FIX_2" : "It seems the product previously selected differs from your current query.\n\nPlease choose the relevant product again to ensure accurate assistance.",
+               "FIX_3" : "The Error Code identified in your query could not be verified.\n\nPlease check the Error Code on the display window.\n\nIf you require further assistance, click on the 'Live Chat' button to connect with one of our agents who will be happy to assist you."}
+LIVE_CHAT_ANSWER = "I am constantly learning to assist you better. In the meantime, please click on the “Live Chat” button to connect with one of our agents who will be happy to help you."
+OVERLOAD_ANSWER = """Due to high user requests, we are currently experiencing delays in our chatbot response times.
+ 
+Please attempt your request again shortly."""
+APOLOGY_ANSWER = "Apologies for the inconvenience. Could you please try again later?"
+FIXED_ANSWERS = list(FIX_ANSWERS.values()) + [LIVE_CHAT_ANSWER, OVERLOAD_ANSWER, APOLOGY_ANSWER]
+
 # Create a prompt for display ( chat/__init__ ) -- PRD
 def preprocess_thoughts_process(thoughts_process, documents, query, chat_history, answer):
-    logger = setup_logger(query['chatid'],query['chat_session_id'], query['rag_order'])
+    logger = setup_logger()
     logger.info("###### Function Name : preprocess_thoughts_process")
     if chat_history == None :
         chat_history = ''
@@ -71,7 +121,7 @@ def load_balancing(token_size, type):
         "Content-Type": "application/json"
     }
 
-    request = requests.post(url, json=data, headers=headers)
+    request = client_registry.get("load-balancing", url, requests.Session).post(url, json=data, headers=headers)
     response = request.json()
     
     if response['code'] == "E0000" :
@@ -96,11 +146,12 @@ def load_balancing(token_size, type):
     
 
 # Create fixed answer ( chat/__init__ ) -- PRD
+@traced("preprocess_answer")
 def preprocess_answer(trans_instance, query, answer, preprocessed, refined_info):
-    logger = setup_logger(query['chatid'],query['chat_session_id'], query['rag_order'])
+    logger = setup_logger()
     logger.info("###### Function Name : preprocess_answer")
     if (len(preprocessed[0]['title']) == 0) and (len(preprocessed[1]['title']) == 0) and (len(preprocessed[2]['title']) == 0): 
-        answer = "I am constantly learning to assist you better. In the meantime, please click on the “Live Chat” button to connect with one of our agents who will be happy to help you."
+        answer = LIVE_CHAT_ANSWER
         
         if query['trans_language_code_score'] != 1:
             detectLang = query['user_selected_language_code']
@@ -141,38 +192,73 @@ def preprocess_answer(trans_instance, query, answer, preprocessed, refined_info)
     return answer
 
 # Get chat history ( chat/__init__ ) -- PRD
+@traced("load_chat_data")
 def load_chat_data(db_instance, db_name, container_name, chatid, chat_session_id):
     logger.info("###### Function Name : load_chat_data")
-    chat_data = db_instance.read_data(db_name, container_name, chatid, chat_session_id)
-        
-    if len(chat_data) == 0 :
-            chat_history = None
-
-    else :
-        chat_data = sorted(chat_data, key=lambda x: x['chat_order'])
-
-        chat_history = []
-        for item in chat_data:
-            role = item['chat_role'].replace('assistant','chat bot').replace('user','customer')
-            # ''(INIT), None(LINK_CLICK), [](INIT), [None](FINISH)
-            if not item['message']:
-                item['message'] = ['']
-            elif isinstance(item['message'], list):
-                if not item['message'] or item['message'][0] is None:
-                    item['message'] = ['']
-            
-            #print(item)
-            message_list = item['message']
-            #message_list = ["" if message is None else message for message in message_list]
-            context = '\n'.join(message_list)
-            context = remove_tag_between(context, start='<a href=', end='</a>')
-            chat_history.append({"role" : role, "context" : context})
-        
-        chat_history = chat_history[-11:-1]
-        chat_history = '\n\n'.join([f"{item['role']}: {item['context']}" for item in chat_history])
-
+    key = (db_name, container_name, chatid, chat_session_id)
+    found, session = CHAT_HISTORY_CACHE.get(key)
+    chat_data = db_instance.read_chat_turns(db_name, container_name, chatid, chat_session_id, after_order=session["last_order"] if found else None)
+    return update_chat_session(key, session if found else None, chat_data)
+
+@traced("aload_chat_data")
+async def aload_chat_data(db_instance, db_name, container_name, chatid, chat_session_id):
+    logger.info("###### Function Name : aload_chat_data")
+    key = (db_name, container_name, chatid, chat_session_id)
+    found, session = CHAT_HISTORY_CACHE.get(key)
+    chat_data = await db_instance.aread_chat_turns(db_name, container_name, chatid, chat_session_id, after_order=session["last_order"] if found else None)
+    return update_chat_session(key, session if found else None, chat_data)
+
+# 세션 캐시에 새 turn 만 추가 ( 최근 CHAT_HISTORY_TURNS 개만 유지 ) 후 history 문자열 갱신
+def update_chat_session(key, session, chat_data):
+    turns = list(session["turns"]) if session is not None else []
+    last_order = session["last_order"] if session is not None else None
+
+    for item in sorted(chat_data, key=lambda x: x['chat_order']):
+        turns.append(make_chat_turn(item))
+        last_order = item['chat_order']
+
+    if session is not None and not chat_data :
+        return session["history"]
+
+    turns = turns[-CHAT_HISTORY_TURNS:]
+    chat_history = format_chat_history(turns)
+    CHAT_HISTORY_CACHE.set(key, {"last_order" : last_order, "turns" : turns, "history" : chat_history})
+    logger.info(f"Chat history : {len(chat_data)} new turns, last chat_order {last_order}")
     return chat_history
 
+def make_chat_history(chat_data):
+    if len(chat_data) == 0 :
+        return None
+    chat_data = sorted(chat_data, key=lambda x: x['chat_order'])
+    return format_chat_history([make_chat_turn(item) for item in chat_data])
+
+def make_chat_turn(item):
+    role = item['chat_role'].replace('assistant','chat bot').replace('user','customer')
+    # ''(INIT), None(LINK_CLICK), [](INIT), [None](FINISH)
+    message_list = item['message']
+    if not message_list:
+        message_list = ['']
+    elif isinstance(message_list, list):
+        if not message_list or message_list[0] is None:
+            message_list = ['']
+    
+    #message_list = ["" if message is None else message for message in message_list]
+    context = '\n'.join(message_list)
+    context = remove_tag_between(context, start='<a href=', end='</a>')
+    return {"role" : role, "context" : context}
+
+# 마지막 turn ( 현재 질문 ) 제외 최근 10개
+def format_chat_history(turns):
+    if len(turns) == 0 :
+        return None
+    chat_history = turns[-11:-1]
+    return '\n\n'.join([f"{item['role']}: {item['context']}" for item in chat_history])
+
+# Token count of a chat history string, reused across refinement/QA ( model/prepare_answer ) -- PRD
+@lru_cache(maxsize=1024)
+def count_tokens(text, model):
+    return len(get_encoder(model).encode(text))
+
 # Get prompt ( model/generate_answer ) -- PRD
 def get_prompt(prompt_path):
     logger.info("###### Function Name : get_prompt")
@@ -181,6 +267,14 @@ def get_prompt(prompt_path):
     
     return  prompt
 
+# Cached tiktoken encoder ( model, tools ) -- PRD
+@lru_cache(maxsize=None)
+def get_encoder(model):
+    try :
+        return tiktoken.encoding_for_model(model)
+    except KeyError :
+        return tiktoken.get_encoding("cl100k_base")
+
 # Upload chat history ( chat/__init__ ) -- PRD
 def upload_chat_data(db_instance, db_name, container_name, output) :
     logger.info("###### Function Name : upload_chat_data")
@@ -188,11 +282,41 @@ def upload_chat_data(db_instance, db_name, container_name, output) :
 
     return "Upload Chat data"
 
+# Manual viewer blob path from the index url ( preprocess_output_data ) -- PRD
+# 이전 인덱스의 서명된 url ( https://<account>/$web/<path>?<sas> ) 은 $web 경로만 남김
+def viewer_blob_path(url):
+    if url.startswith('https://') and '/$web/' in url :
+        return unquote(url.split('?')[0].split('/$web/', 1)[1])
+    return url
+
 # Preprocessing of final results to be delivered ( chat/__init__) -- PRD
+@traced("preprocess_output_data")
 def preprocess_output_data(trans_instance, preprocessed, query, thoughts_process, answer, paa, time_info, prompt, gpt_model, all_data) :
-    logger = setup_logger(query['chatid'],query['chat_session_id'], query['rag_order'])
+    logger = setup_logger()
     logger.info("###### Function Name : preprocess_output_data")
     results = {}
+    as_instance_web = None
+
+    # token 수는 key 와 무관하므로 한 번만 계산
+    tokenizer = get_encoder(gpt_model)
+    ref_prompt_tokens = len(tokenizer.encode(prompt))
+    ref_completion_tokens = len(tokenizer.encode(query["refined_answer"]))
+
+    if query['flag'] == "RAG" :
+
+        substring = "[answer]"
+        index = thoughts_process.find(substring)
+        if index != -1:
+            rag_prompt = thoughts_process[:index + len(substring)]
+        else:
+            rag_prompt = thoughts_process
+
+        prompt_tokens = len(tokenizer.encode(rag_prompt))
+        completion_tokens = len(tokenizer.encode(answer))
+
+    else :
+        prompt_tokens = 0
+        completion_tokens = 0
 
     for key in all_data :
         
@@ -206,9 +330,13 @@ def preprocess_output_data(trans_instance, preprocessed, query, thoughts_process
                 page_list = pages.split(',')
                 page_list = [int(x) for x in page_list]
                 title_page = min(page_list)
-                as_instance_web = AzureStorage(container_name='$web',storage_type='docst')
                 try :
-                    manual_url = as_instance_web.get_sas_url(preprocessed[i]['url']) + f'#page{title_page}'
+                    # 응답마다 1일 읽기 전용 SAS ( SAS_CACHE 재사용 ), 만료 없는 SAS 가 저장된 이전 인덱스는 $web 경로만 사용
+                    manual_url = viewer_blob_path(preprocessed[i]['url'])
+                    if as_instance_web is None :
+                        as_instance_web = AzureStorage(container_name='$web',storage_type='docst')
+                    manual_url = as_instance_web.get_sas_url(manual_url, permission=VIEWER_SAS_PERMISSION)
+                    manual_url = manual_url + f'#page{title_page}'
                 except :
                     manual_url = ""
 
@@ -218,27 +346,6 @@ def preprocess_output_data(trans_instance, preprocessed, query, thoughts_process
                 sas_urls[f"{preprocessed[i]['type']}_{i}"] = preprocessed[i]['url']
         
         sas_urls_values = list(sas_urls.values())
-        tokenizer = tiktoken.get_encoding("cl100k_base")
-        tokenizer = tiktoken.encoding_for_model(gpt_model)
-        
-        ref_prompt_tokens = len(tokenizer.encode(prompt))
-        ref_completion_tokens = len(tokenizer.encode(query["refined_answer"]))
-
-        if query['flag'] == "RAG" :
-
-            substring = "[answer]"
-            index = thoughts_process.find(substring)
-            if index != -1:
-                prompt = thoughts_process[:index + len(substring)]
-            else:
-                prompt = thoughts_process
-
-            prompt_tokens = len(tokenizer.encode(prompt))
-            completion_tokens = len(tokenizer.encode(answer))
-
-        else :
-            prompt_tokens = 0
-            completion_tokens = 0
 
         if len(paa) == 0:
             paa_list=["","",""]
@@ -339,6 +446,7 @@ def preprocess_output_data(trans_instance, preprocessed, query, thoughts_process
                         "answer": time_info["answer"],
                         "total": time_info["total"]
                     },
+                    "irDetail": time_info.get("IR_detail", {}),
                     "contexts": [f"{preprocessed[i]['main_text']}" for i in range(len(preprocessed))],
                     "paa" : [paa_list[i]  for i in range(len(paa_list))],
                     "originalQuery" : query['question'],
@@ -373,6 +481,9 @@ def preprocess_output_data(trans_instance, preprocessed, query, thoughts_process
     current_time = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
 
     final_result = results['result']
+    # debug 요청 : 구간 추적 결과를 응답에만 포함 ( 저장 데이터 / time 합계에는 미포함 )
+    if query.get('debug') and 'additionalInfo' in final_result :
+        final_result = dict(final_result, additionalInfo=dict(final_result['additionalInfo'], trace=trace_tree()))
     output = json.dumps(final_result,indent=4,ensure_ascii=False)
 
     results['id'] = str(uuid.uuid4())
@@ -380,18 +491,34 @@ def preprocess_output_data(trans_instance, preprocessed, query, thoughts_process
     results['chat_session_id'] = query['chat_session_id']
     results['rag_order'] = query['rag_order']
     
-    db_instance = CosmosDB()
-    upload_chat_data(db_instance, db_name='lgdb', container_name='aicontainer', output=results)
-    upload_chat_summary(query,results)
+    # 응답 이후 저장 : write-behind queue 에 적재, 적재 실패 ( queue 가득 참 / 비활성 ) 시 기존처럼 동기 저장
+    if not write_behind_queue.enqueue("chat_data", results) :
+        db_instance = CosmosDB()
+        upload_chat_data(db_instance, db_name='lgdb', container_name='aicontainer', output=results)
+    if not write_behind_queue.enqueue("chat_summary", make_chat_summary_parameters(query, results)) :
+        upload_chat_summary(query,results)
+    logger.info(f"Write-behind : {write_behind_queue.stats()}")
     
     return output
 
 
+@traced("preprocess_intent_search")
 def preprocess_intent_search(filter_df, search_instance, query) :
-    logger = setup_logger(query['chatid'],query['chat_session_id'], query['rag_order'])
-    results = {}
+    logger = setup_logger()
     logger.info("###### Function Name : preprocess_intent_search")
     preprocessed = search_instance.intent_search(filter_df, query['index_name'],query,3)
+    return preprocess_intent_results(preprocessed, query)
+
+@traced("apreprocess_intent_search")
+async def apreprocess_intent_search(filter_df, search_instance, query) :
+    logger = setup_logger()
+    logger.info("###### Function Name : apreprocess_intent_search")
+    preprocessed = await search_instance.atyped_search("intent", filter_df, query['index_name'], query, 3)
+    return preprocess_intent_results(preprocessed, query)
+
+def preprocess_intent_results(preprocessed, query) :
+    logger = setup_logger()
+    results = {}
     
     if any(item["type"] == "general-inquiry" for item in preprocessed):
         
@@ -449,15 +576,94 @@ def preprocess_intent_search(filter_df, search_instance, query) :
     return preprocessed, documents, results
 
 # Preprocess search results ( chat/__init__) -- PRD
+@traced("preprocess_documents")
 def preprocess_documents(filter_df, search_instance, query) :
-    logger = setup_logger(query['chatid'],query['chat_session_id'], query['rag_order'])
+    logger = setup_logger()
     logger.info("###### Function Name : preprocess_documents")
-    results = {}
     
-    preprocessed_contents = search_instance.contents_search(filter_df, query['index_name'],query,3)
-    preprocessed_youtube = search_instance.youtube_search(filter_df, query['index_name'],query,3)
-    preprocessed_manual = search_instance.manual_search(filter_df, query['index_name'],query,3)
-    preprocessed_spec = search_instance.spec_search(filter_df, query['index_name'],query,3)
+    search_results, search_time = concurrent_search(filter_df, search_instance, query, top_k=3)
+    return preprocess_search_results(search_results, search_time, query)
+
+@traced("apreprocess_documents")
+async def apreprocess_documents(filter_df, search_instance, query) :
+    logger = setup_logger()
+    logger.info("###### Function Name : apreprocess_documents")
+    
+    search_results, search_time = await aconcurrent_search(filter_df, search_instance, query, top_k=3)
+    return preprocess_search_results(search_results, search_time, query)
+
+def answer_cache_key(query) :
+    return (query['index_name'], query['product_group_code'], query['product_code'], query['product_model_code'])
+
+# 답변 언어 ( 감지 언어 신뢰도가 낮으면 사용자 선택 언어 )
+def answer_language(query) :
+    if query['trans_language_code_score'] != 1:
+        return query['user_selected_language_code']
+    return query['trans_language_code']
+
+# Answer cache lookup for questions without chat history ( chat/__init__ ) -- PRD
+@traced("lookup_answer_cache")
+def lookup_answer_cache(search_instance, query) :
+    logger = setup_logger()
+    logger.info("###### Function Name : lookup_answer_cache")
+
+    answer_cache.check_index_version(query['index_name'], search_instance.index_version)
+    # refined query embedding 은 검색에서 재사용 ( 요청 memo )
+    vector = search_instance.generate_embeddings_chat(query['refined_query'])
+    cached, score = answer_cache.lookup(answer_cache_key(query), vector, query['locale_cd'])
+    logger.info(f"Answer cache {'hit' if cached is not None else 'miss'} : score {score:.4f}")
+    return vector, cached
+
+@traced("alookup_answer_cache")
+async def alookup_answer_cache(search_instance, query) :
+    logger = setup_logger()
+    logger.info("###### Function Name : alookup_answer_cache")
+
+    await to_thread(answer_cache.check_index_version, query['index_name'], search_instance.index_version)
+    vector = await search_instance.agenerate_embeddings_chat(query['refined_query'])
+    cached, score = answer_cache.lookup(answer_cache_key(query), vector, query['locale_cd'])
+    logger.info(f"Answer cache {'hit' if cached is not None else 'miss'} : score {score:.4f}")
+    return vector, cached
+
+# Store a solved answer for reuse ( chat/__init__ ) -- PRD
+def store_answer_cache(query, vector, cost, preprocessed, documents, all_data, answer_dict, thoughts_process) :
+    if answer_dict["solution"] != "Yes" :
+        return
+    answer_cache.store(answer_cache_key(query), vector,
+                       {"language" : answer_language(query),
+                        "preprocessed" : preprocessed,
+                        "documents" : documents,
+                        "all_data" : all_data,
+                        "answer_dict" : answer_dict,
+                        "thoughts_process" : thoughts_process},
+                       cost)
+
+# Cached answer in the current answer language ( chat/__init__ ) -- PRD
+@traced("restore_cached_answer")
+def restore_cached_answer(trans_instance, query, cached) :
+    logger = setup_logger()
+    logger.info("###### Function Name : restore_cached_answer")
+
+    answer_dict = cached["answer_dict"]
+    language_to = answer_language(query)
+    if cached["language"] != language_to :
+        keys = [key for key in ["response", "additional_questions"] if answer_dict[key]]
+        body = [{'text' : answer_dict[key]} for key in keys]
+        response = trans_instance.translate_question(body=body, language_from=cached["language"], language_to=language_to)
+        for key, item in zip(keys, response) :
+            answer_dict[key] = item['translations'][0]['text']
+        logger.info(f"Cached answer translated : {cached['language']} -> {language_to}")
+
+    # 검색을 실행하지 않았으므로 search_time 은 비움
+    return cached["preprocessed"], cached["documents"], cached["all_data"], {}, answer_dict, cached["thoughts_process"]
+
+def preprocess_search_results(search_results, search_time, query) :
+    logger = setup_logger()
+    results = {}
+    preprocessed_contents = search_results["contents"]
+    preprocessed_youtube = search_results["youtube"]
+    preprocessed_manual = search_results["manual"]
+    preprocessed_spec = search_results["spec"]
     
     all_data = []
 
@@ -529,7 +735,124 @@ def preprocess_documents(filter_df, search_instance, query) :
             tmp_preprocessed += dummy*(3-len(tmp_preprocessed))
         results[key] = tmp_preprocessed
 
-    return preprocessed, documents, results
+    return preprocessed, documents, results, search_time
+
+# Run the typed searches in parallel with per-type timeouts ( tools/preprocess_documents ) -- PRD
+@traced("concurrent_search")
+def concurrent_search(filter_df, search_instance, query, top_k=3, timeout=None) :
+    logger = setup_logger()
+    logger.info("###### Function Name : concurrent_search")
+
+    if timeout is None :
+        timeout = SEARCH_TIMEOUT
+
+    search_functions = {"contents" : search_instance.contents_search,
+                        "youtube" : search_instance.youtube_search,
+                        "manual" : search_instance.manual_search,
+                        "spec" : search_instance.spec_search}
+
+    def run_search(search_function) :
+        start_time = time.time()
+        result = search_function(filter_df, query['index_name'], query, top_k)
+        return result, time.time() - start_time
+
+    submit_time = time.time()
+    # worker threads write their logs into the caller's log buffer ( one context copy per task )
+    futures = {search_type : search_executor.submit(contextvars.copy_context().run, run_search, search_function) for search_type, search_function in search_functions.items()}
+
+    search_results = {}
+    search_time = {}
+    errors = []
+    for search_type, future in futures.items() :
+        remaining = request_timeout(max(0, submit_time + timeout.get(search_type, 10) - time.time()))
+        try :
+            search_results[search_type], search_time[search_type] = future.result(timeout=remaining)
+
+        except FutureTimeoutError :
+            logger.error(f"########## {search_type} search timeout : {timeout.get(search_type, 10)}s")
+            search_results[search_type] = []
+            search_time[search_type] = time.time() - submit_time
+
+        except OpenAIResourceError :
+            raise
+
+        except Exception as e :
+            logger.error(f"########## {search_type} search error : {type(e).__name__} - {e}")
+            errors.append(e)
+            search_results[search_type] = []
+            search_time[search_type] = time.time() - submit_time
+
+    # partial results are fine, but a total failure keeps the previous error path
+    if len(errors) == len(futures) :
+        raise errors[0]
+
+    record_search_time(search_time)
+    logger.info(f"###### search_time : {search_time}")
+    return search_results, search_time
+
+# Async variant of concurrent_search ( chat_async ) -- PRD
+@traced("aconcurrent_search")
+async def aconcurrent_search(filter_df, search_instance, query, top_k=3, timeout=None) :
+    logger = setup_logger()
+    logger.info("###### Function Name : aconcurrent_search")
+
+    if timeout is None :
+        timeout = SEARCH_TIMEOUT
+
+    # 4개 유형 모두 refined_query 로 검색하므로 embedding 은 1회만 계산
+    vector = await search_instance.agenerate_embeddings_chat(query['refined_query'])
+
+    async def run_search(search_type) :
+        start_time = time.time()
+        result = await asyncio.wait_for(search_instance.atyped_search(search_type, filter_df, query['index_name'], query, top_k, vector=vector),
+                                        timeout=request_timeout(timeout.get(search_type, 10)))
+        return result, time.time() - start_time
+
+    submit_time = time.time()
+    search_types = ["contents", "youtube", "manual", "spec"]
+    outputs = await asyncio.gather(*[run_search(search_type) for search_type in search_types], return_exceptions=True)
+
+    search_results = {}
+    search_time = {}
+    errors = []
+    for search_type, output in zip(search_types, outputs) :
+        if isinstance(output, asyncio.TimeoutError) :
+            logger.error(f"########## {search_type} search timeout : {timeout.get(search_type, 10)}s")
+            search_results[search_type] = []
+            search_time[search_type] = time.time() - submit_time
+
+        elif isinstance(output, OpenAIResourceError) :
+            raise output
+
+        elif isinstance(output, Exception) :
+            logger.error(f"########## {search_type} search error : {type(output).__name__} - {output}")
+            errors.append(output)
+            search_results[search_type] = []
+            search_time[search_type] = time.time() - submit_time
+
+        else :
+            search_results[search_type], search_time[search_type] = output
+
+    # partial results are fine, but a total failure keeps the previous error path
+    if len(errors) == len(search_types) :
+        raise errors[0]
+
+    record_search_time(search_time)
+    logger.info(f"###### search_time : {search_time}")
+    return search_results, search_time
+
+# Typed search times into the request timings ( concurrent_search, aconcurrent_search ) -- PRD
+def record_search_time(search_time) :
+    context = get_request_context()
+    if context is None :
+        return
+    for search_type, seconds in search_time.items() :
+        context.add_timing(f"search_{search_type}", seconds)
+
+# Run a blocking call from the async pipeline in a worker thread, keeping the caller's context ( chat_async ) -- PRD
+async def to_thread(func, *args, **kwargs) :
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(None, lambda: context.run(func, *args, **kwargs))
 
 # Preprocessing of received parameters ( chat/__init__) -- PRD
 def preprocess_query(data) :
@@ -573,7 +896,8 @@ def preprocess_query(data) :
              'question' : message_content,
              'chat_session_id' : global_response_chat_session_id,
              'rag_order' : ragorder,
-             'current_user' : current_user}
+             'current_user' : current_user,
+             'debug' : str(data['param'].get('debug', False)).lower() in ('true', 'y', '1')}
     
     return query
 
@@ -636,75 +960,47 @@ def chunked_texts(content, tokenizer, max_tokens=7000, overlap_percentage=0.1):
 def preprocessing_answer(logger, answer) :
     logger.info("###### Function Name : preprocessing_answer")
 
-    ## GPT의 JSON Format 출력 결과 후처리
-    answer_str_1 = answer.replace("```json", "").replace("```", "").strip()
-    logger.info(f"############## answer_str_1 :\n{answer_str_1}")
-    
-    ## 출력 결과 1차 확인 및 answer_dict로 재구성
+    ## GPT의 JSON 출력 결과 ( JSON mode ) -> answer_dict, 잘린 응답은 마지막으로 완성된 값까지 사용
+    logger.info(f"############## answer :\n{answer}")
     try:
-        answer_dict_temp = eval(answer_str_1)
+        answer_dict_temp = parse_json_answer(answer)
         assert isinstance(answer_dict_temp, dict)
 
-        answer_dict = {"response_language" : answer_dict_temp["response_language"],
-                    "response_body" : answer_dict_temp["response_body"],
-                    "solution" : answer_dict_temp["solution"],
-                    "additional_questions" : " ".join(answer_dict_temp["additional_questions"]),
-                    "response" : "\n".join(answer_dict_temp["response_body"])}
-        
-    ## 출력 결과 2차 확인 및 answer_dict로 재구성
-    except Exception as e :
+        response_body = answer_dict_temp["response_body"]
+        if isinstance(response_body, str):
+            response_body = [response_body]
+        assert len(response_body) > 0
 
-        try :
-            logger.info(f"############## answer_str_1 Error : {type(e).__name__} - {e}")
-
-            answer_str_2 = answer.replace("```json", "").replace("```", "").replace(r'{','').replace(r'}','').strip()
-            logger.info(f"############## answer_str_2 :\n{answer_str_2}")
+        additional_questions = answer_dict_temp.get("additional_questions", [])
+        if isinstance(additional_questions, str):
+            additional_questions = [additional_questions]
 
-            response_language = extract_data(answer_str_2, start="response_language", end= "response_body")[0].replace('\"','').replace(':','').replace('\n','').replace(',','').strip()
+        answer_dict = {"response_language" : answer_dict_temp.get("response_language", ""),
+                    "response_body" : response_body,
+                    "solution" : answer_dict_temp.get("solution", "No"),
+                    "additional_questions" : " ".join(additional_questions),
+                    "response" : "\n".join(response_body)}
 
-            temp_response_body = extract_data(answer_str_2, start="response_body", end= "solution")[0].replace('[','').replace(']','').replace('\"','').\
-            replace(':','').replace('    ','').split(',\n')
-            response_body = [item.replace('\n','').replace('\t','').strip() for item in temp_response_body if item.strip()]
-
-            try :
-                temp_solution = extract_data(answer_str_2, start="solution", end="additional_questions")[0].replace('\"','').replace(':','').replace('\n','').replace(',','').strip()
-                solution = 'Yes' if 'Yes' in temp_solution else 'No'
-            except :
-                solution = 'No'
-
-            temp_additional_questions = extract_data(answer_str_2, start="additional_questions")[0].replace('[','').replace(']','').replace('\"','').\
-            replace(':','').replace('    ','').split(',\n')
-            additional_questions = [item.replace('\n','').replace('\t','').strip() for item in temp_additional_questions if item.strip()]
-
-            answer_dict = {"response_language" : response_language,
-                        "response_body" : response_body,
-                        "solution" : solution,
-                        "additional_questions" : " ".join(additional_questions),
-                        "response" : "\n".join(response_body)}
+    except Exception as e:
+        logger.info(f"############## answer Error : {type(e).__name__} - {e}")
         
-        except Exception as e:
-            logger.info(f"############## answer_str_2 Error : {type(e).__name__} - {e}")
-            
-            answer = "I am constantly learning to assist you better. In the meantime, please click on the “Live Chat” button to connect with one of our agents who will be happy to help you."
-            answer_dict = {"response_body" : answer,
-                "solution" : "No",
-                "additional_questions" : "",
-                "response" : answer}
+        answer = "I am constantly learning to assist you better. In the meantime, please click on the “Live Chat” button to connect with one of our agents who will be happy to help you."
+        answer_dict = {"response_body" : answer,
+            "solution" : "No",
+            "additional_questions" : "",
+            "response" : answer}
 
     return answer_dict
 
 
+@traced("refinement_flag")
 def refinement_flag(trans_instance, query):
-    logger = setup_logger(query['chatid'],query['chat_session_id'], query['rag_order'])
+    logger = setup_logger()
     logger.info("###### Function Name : refinement_flag")
 
     flag = query["flag"]
-    if flag == "FIX_1":
-        answer = "I'm sorry that i can't understand your issue.\n\nCould you tell me in detail the issue or check Error Code on display window.\n\nThank you for your patience"
-    elif flag == "FIX_2":
-        answer = "It seems the product previously selected differs from your current query.\n\nPlease choose the relevant product again to ensure accurate assistance."
-    elif flag == "FIX_3":
-        answer = "The Error Code identified in your query could not be verified.\n\nPlease check the Error Code on the display window.\n\nIf you require further assistance, click on the 'Live Chat' button to connect with one of our agents who will be happy to assist you."
+    if flag in FIX_ANSWERS:
+        answer = FIX_ANSWERS[flag]
     else:
         pass
     
@@ -762,8 +1058,9 @@ def refinement_flag(trans_instance, query):
 
     return documents, thoughts_process, paa, all_data, query, preprocessed, answer
 
+@traced("answer_solution_flag")
 def answer_solution_flag(trans_instance, query, answer_dict):
-    logger = setup_logger(query['chatid'],query['chat_session_id'], query['rag_order'])
+    logger = setup_logger()
     logger.info("###### Function Name : answer_solution_flag")
     ## solution이 "1"이 아닌 경우에, paa로 사용되는 "additional_questions" 모두 공란으로 지정
     if answer_dict["solution"] != "Yes":
@@ -877,12 +1174,22 @@ def make_error_result(error) :
     output = json.dumps(output_json,ensure_ascii=False)
     return output
 
+@traced("upload_chat_summary")
 def upload_chat_summary(query, results) :
-    logger = setup_logger(query['chatid'],query['chat_session_id'], query['rag_order'])
+    logger = setup_logger()
     logger.info("###### Function Name : upload_chat_summary")
+    parameters = make_chat_summary_parameters(query, results)
+
+    logger.info(f"############## Parameters : {parameters}")
+    sql_instance = MySql()
+    sql_instance.insert_data(CHAT_SUMMARY_INSERT_QUERY, parameters)
+
+    return logger.info("chat summary upload complete")
+
+# tmp_chat_summary_dash INSERT parameters ( upload_chat_summary, write-behind ) -- PRD
+def make_chat_summary_parameters(query, results) :
     now = datetime.now()
     formatted_now = now.strftime("%Y-%m-%d %H:%M:%S")
-    sql_instance = MySql()
 
     if 'total_result' in results:
         context = "".join(results['total_result']['additionalInfo']['contexts'])
@@ -959,201 +1266,104 @@ def upload_chat_summary(query, results) :
                 ref_doc[2][0], ref_doc[2][1], float(score[2]) if score[2] != "" else None,
                 formatted_now, "HJS", None, None, None, "N")
 
-    logger.info(f"############## Parameters : {parameters}")
-    sql_insert_query = """INSERT INTO tmp_chat_summary_dash (CHAT_ID, CHAT_SESSION_ID, COUNTRY_CD, LANGUAGE_CD, RAG_ORDER, PROD_CD, USER ,
-                                                        ASSISTANT, QUERY_ORI, GPT_ANSWER, DETECTLANGUAGE, USERSELECTLANGUAGE,
-                                                        INDEXNAME, REFINEMENT_TOKEN, QA_TOKEN, RAG_TOTAL_TIME,REFINE_INPUT_QUESTION,
-                                                        REFINE_INTENT, REFINE_KEYWORDS, REFINE_SYMPTOM, REFINE_OUTPUT_QUESTION_1,
-                                                        REFINE_OUTPUT_QUESTION_2, REFINE_OUTPUT_QUESTION_3, CONTEXTS,
-                                                        REF_DOC_1_TYPE, REF_DOC_1_ID, REF_DOC_1_SCORE,
-                                                        REF_DOC_2_TYPE, REF_DOC_2_ID, REF_DOC_2_SCORE,
-                                                        REF_DOC_3_TYPE, REF_DOC_3_ID, REF_DOC_3_SCORE,
-                                                        CREATE_DATE, CREATE_USER, UPDATE_DATE, UPDATE_USER, GPT_EVAL, EVAL_YN)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"""
-    sql_instance.insert_data(sql_insert_query, parameters)
+    return parameters
 
-    return logger.info("chat summary upload complete")
+# Write-behind sinks ( write_behind ) : 실패한 payload 반환 또는 예외 -> 재시도 -- PRD
+def flush_chat_data(items) :
+    db_instance = CosmosDB()
+    return db_instance.upsert_items('lgdb', 'aicontainer', items)
 
+def flush_chat_summary(items) :
+    sql_instance = MySql()
+    rows = [tuple(item) for item in items]
+    failed_ids = set(id(row) for row in sql_instance.insert_many(CHAT_SUMMARY_INSERT_QUERY, rows))
+    return [item for item, row in zip(items, rows) if id(row) in failed_ids]
+
+# 같은 로그 파일은 append block 한도 ( 4 MiB ) 내에서 합쳐서 업로드
+APPEND_BLOCK_LIMIT = 4 * 1024 * 1024
+
+def flush_chat_log(items) :
+    groups = []
+    blocks = {}
+    for item in items :
+        key = (item['container_name'], item['storage_type'], item['file_path'])
+        size = len(item['data'].encode('utf-8')) + 1
+        group = blocks.get(key)
+        if group is None or group['size'] + size > APPEND_BLOCK_LIMIT :
+            group = {"key" : key, "items" : [], "size" : 0}
+            blocks[key] = group
+            groups.append(group)
+        group['items'].append(item)
+        group['size'] += size
+
+    failed = []
+    for group in groups :
+        container_name, storage_type, file_path = group['key']
+        try :
+            as_instance = AzureStorage(container_name=container_name, storage_type=storage_type)
+            as_instance.append_log("\n".join(item['data'] for item in group['items']), file_path)
+        except Exception as e :
+            logger.error(f"Log upload error : {file_path} - {e}")
+            failed.extend(group['items'])
+    return failed
+
+# 재시도 한도를 넘긴 item 은 logs 컨테이너에 JSON lines 로 보관 ( 인스턴스 종료 후에도 확인 / 재처리 가능 )
+DEAD_LETTER_CONTAINER = "logs"
+DEAD_LETTER_PATH = "chatapi/write_behind/dead/{date}/{kind}-{name}.jsonl"
+
+def store_dead_letter(kind, lines) :
+    korea_timezone = pytz.timezone('Asia/Seoul')
+    formatted_date = datetime.now(korea_timezone).strftime('%Y%m%d')
+    file_path = DEAD_LETTER_PATH.format(date=formatted_date, kind=kind, name=f"{os.getpid()}-{time.time_ns()}")
+    as_instance = AzureStorage(container_name=DEAD_LETTER_CONTAINER, storage_type='datast')
+    block, size = [], 0
+    for line in lines :
+        line_size = len(line.encode('utf-8')) + 1
+        if block and size + line_size > APPEND_BLOCK_LIMIT :
+            as_instance.append_log("\n".join(block) + "\n", file_path)
+            block, size = [], 0
+        block.append(line)
+        size += line_size
+    if block :
+        as_instance.append_log("\n".join(block) + "\n", file_path)
+    logger.info(f"Write-behind dead-letter stored : {kind}, {len(lines)} items -> {file_path}")
+
+write_behind_queue.register("chat_data", flush_chat_data)
+write_behind_queue.register("chat_summary", flush_chat_summary)
+write_behind_queue.register("chat_log", flush_chat_log)
+write_behind_queue.register_dead_letter(store_dead_letter)
+
+# Upload request log after the response ( chat/__init__ ) -- PRD
+@traced("upload_chat_log")
+def upload_chat_log(as_instance, logs_str, file_path) :
+    payload = {"container_name" : as_instance.container_name,
+               "storage_type" : as_instance.storage_type,
+               "file_path" : file_path,
+               "data" : logs_str}
+    if not write_behind_queue.enqueue("chat_log", payload) :
+        as_instance.upload_log(logs_str, file_path=file_path)
+
+# Error code list / check for the refinement step ( model.py ) -- PRD
+# 제품군/제품 코드 별 에러코드는 config/rules/error_code.csv ( product_rules )
+@traced("get_ErrorCode")
 def get_ErrorCode(Code_or_List:str, GROUP_CD:str, PROD_CD:str, ErrorCode:str="None"):
-    ## 제품군/제품 코드 별 에러코드 리스트 불러오기
     logger.info("###### Function Name : get_ErrorCode")
-
-    ## http://service.academy.lge.com/#/Troubleshooting 참고
-    if GROUP_CD == "REF":
-
-        list_ErrorCode = [
-            "C1", "CF", "CH", "CL", "CO", "dH", "dS", "FF", "FS", "FU", "gF", "Hi", "IF", "Lo", "OFF", "rF", "rS",
-            "Ad", "dL", "dr", "E AS", "gS", "HS", "I Ld", "I LS", "Id", "IS", "It", "IU", "L AS", "nC", "nE", "nF", "Od", "r AS", "r2", "rt", "S1", "S2", "SS", "tt", "U Ld", "U LS", "UC",
-            ]
-
-    elif GROUP_CD == "WM":
-        if PROD_CD == "W/M" or PROD_CD == "WM" or PROD_CD == "DRW":
-            list_ErrorCode = [
-                "AE", "Cd", "CE", "CL", "dcL", "dE", "dE1", "dE2", "dE3", "dHE", "dO", "E7", "Ed1", "Ed2", "Ed3", "Ed4", "Ed5", "FE", "FF", "IE", "LE", "LE1~9", "nC", "nE", "nF", "OE", "OPn", "PE", "PF", "PS", "SE", "SEE", "tE", "u5", "UE", "VS",
-                ] ## "tCL" : 20240424, 피드백에 따라 "tCL" 에러코드 제외
-        elif PROD_CD == "DRR":
-            list_ErrorCode = [
-                "AE", "Ant", "bE", "Cd", "CE1", "CL", "dE", "dE4", "EHE", "ELE", "F1", "IE", "LE1", "LE2", "nC", "nE", "nF", "OE", "tE", "tE1", "tE2", "tE3", "tE4", 
-                ]
-        else:
-            list_ErrorCode = []
-
-    elif GROUP_CD == "STL":
-            list_ErrorCode = [
-                "AE", "bE2", "bE3", "bE4", "bE5", "bE6", "bE7", "CE2", "CE3", "CE4", "CE5", "CE6", "CE7", "CL", "dE", "dHE", "E1", "E4", "EE", "LE", "LE2", "nC", "nE", "nF", "tE1", "tE2", "tE3", "tE4", "tE5", 
-                ]
-
-    elif PROD_CD == "ELC":
-            list_ErrorCode = [
-                "F1", "F10", "F11", "F16", "F17", "F18", "F19", "F2", "F20", "F21", "F22", "F24", "F25", "F3", "F33", "F34", "F36", "F38", "F4", "F42", "F45", "F46", "F5", "F51", "F52", "F56", "F59", "F6", "F62", "F69", "F7", "F8", "F9", 
-                ]
-
-    elif PROD_CD == "MWO":
-            list_ErrorCode = [
-                "COOL", "DOOR", "E-01", "E-02", "E-03", "E-04", "E-05", "E-10", "F-01", "F-02", "F-1", "F-10", "F-11", "F-13", "F-14", "F-16", "F-17", "F-2", "F-3", "F-4", 
-                ]
-
-    elif PROD_CD == "ACL":
-            list_ErrorCode = [
-                "E10", "E11", "E15", "E9", "Hi", "Lo", 
-                ]
-
-    elif GROUP_CD == "ACN":
-        if PROD_CD == "WRA": ## 벽걸이 에어컨 "RAC"을 지칭하는 모든 에러코드
-            list_ErrorCode = [
-                "CH01", "CH02", "CH06", "CH12", "CH03", "CH04", "CH09", "CH10", "CH21", "CH29", "CH22", "CH23", "CH24", "CH26", "CH27", "CH32", "CH34", "CH35", "CH36", "CH38", "CH37", "CH41", "CH44", "CH45", "CH48", "CH46", "CH42", "CH43", "CH51", "CH60", "CH61", "CH62", "CH65", "CH67", "CH72"
-                ]
-        else : ## 이동형 에어컨을 지칭하는 모든 에러코드 -> Else문으로 적용
-            list_ErrorCode = [
-                "CH01", "CH02", "CH10", "CH22", "CH26", "CH32", "CH38", "CH41", "CH45", "CH61", "CH62", "CH67", "CH75", "CL", "Co", "CP", "FL", "Po", 
-            ]
-
-    elif GROUP_CD == "VC": ## 이미지 형태로 되어 있어 미기입
-            list_ErrorCode = [
-                 
-                ]
-
-    # elif GROUP_CD == "": ## LG ThinQ 미기입
-    #         list_ErrorCode = [
-                 
-    #             ]
-
-    ## 20240411 이후
-        
-    else:
-        list_ErrorCode = []
+    product_rules = get_product_rules()
 
     ## 추출 대상 확인 : 에러코드 리스트
     if Code_or_List == "List":
-        return str(list_ErrorCode)
+        return product_rules.error_code_list(GROUP_CD, PROD_CD)
 
-    ## 추출 대상 확인 : 에러코드
+    ## 추출 대상 확인 : 에러코드 ( 목록에 없으면 "Unknown_ErrorCode" )
     if Code_or_List == "Code":
+        return product_rules.check_error_code(GROUP_CD, PROD_CD, ErrorCode)
 
-        ## 에러코드가 추출되었는지 확인
-        if ErrorCode == "None":
-            return "None"
-        else:
-            pass
-
-        ## 추출된 모든 에러코드가 불러온 에러코드 리스트에 포함되는지 여부 확인
-        if len(ErrorCode.split(",")) > 1:
-            ErrorCodes = ErrorCode.split(",")
-        else:
-            ErrorCodes = [ErrorCode]
-
-        list_ErrorCode = [x.upper() for x in list_ErrorCode]
-        ErrorCodes = [x.upper().strip() for x in ErrorCodes]
-        num_of_ErrorCodes = len(ErrorCodes)
-
-        list_exist = list()
-        for idx_ErrorCodes in range(num_of_ErrorCodes):
-            for item in list_ErrorCode:
-
-                if ErrorCodes[idx_ErrorCodes] in item:
-                    list_exist.append(True)
-                    break
-                else:
-                    continue
-
-        try:
-            for idx_ErrorCodes in range(num_of_ErrorCodes):
-                assert list_exist[idx_ErrorCodes] == True
-            return ErrorCode
-        except:
-            ## 추출된 에러코드가 불러온 에러코드 리스트에 포함되어 있지 않다면 "Unknown_ErrorCode" 반환
-            return "Unknown_ErrorCode"
-    
+# Product group name for the refinement prompt ( model.py ) -- PRD
+# 제품군/제품 코드 별 이름은 config/rules/product_name.csv ( product_rules )
+@traced("get_GroupName")
 def get_GroupName(GROUP_CD:str, PROD_CD:str="None"):
     logger.info("###### Function Name : get_GroupName")
-
-    ## 제품군/제품 코드 별 제품 명 불러오기
-    if GROUP_CD == "ACN":
-        GROUP_N = "AirConditioner"
-        PROD_N = next((item for temp_PROD_CD, item in zip(["WRA", "SRA", "OTH"],["Window", "Single-Split Wall Mounted", ""]) if temp_PROD_CD == PROD_CD), "")
-
-    elif GROUP_CD == "AUD":
-        GROUP_N = "Audio"
-        PROD_N = next((item for temp_PROD_CD, item in zip([""],[""]) if temp_PROD_CD == PROD_CD), "")
-
-    elif GROUP_CD == "COK":
-        GROUP_N = "CookingAppliance"
-        PROD_N = next((item for temp_PROD_CD, item in zip(["MWO", "GOR", "ELC", "OTH"],["Countertop MWO", "Gas Cooktop", "Range/Oven/Electric Cooktop", ""]) if temp_PROD_CD == PROD_CD), "")
-
-        ## MWO를 GPT가 인식하지 못하는 이유로 추가 // 기존 값은 Product MST Table 값을 따라 그대로 유지
-        if PROD_N == "Countertop MWO":
-            PROD_N = "Countertop Microwave Oven"
-
-    elif GROUP_CD == "MNT":
-        GROUP_N = "Monitor"
-        PROD_N = next((item for temp_PROD_CD, item in zip([""],[""]) if temp_PROD_CD == PROD_CD), "")
-
-    elif GROUP_CD == "PC":
-        GROUP_N = "Computer"
-        PROD_N = next((item for temp_PROD_CD, item in zip([""],[""]) if temp_PROD_CD == PROD_CD), "")
-
-    elif GROUP_CD == "REF":
-        GROUP_N = "Refrigerator"
-        PROD_N = next((item for temp_PROD_CD, item in zip(["SBS", "REF", "OTH"],["Side by Side", "Top/Bottom Mount", ""]) if temp_PROD_CD == PROD_CD), "")
-
-    elif GROUP_CD == "STL":
-        GROUP_N = "Styler"
-        PROD_N = next((item for temp_PROD_CD, item in zip([""],[""]) if temp_PROD_CD == PROD_CD), "")
-
-    elif GROUP_CD == "TV":
-        GROUP_N = "TV"
-        PROD_N = next((item for temp_PROD_CD, item in zip([""],[""]) if temp_PROD_CD == PROD_CD), "")
-
-    elif GROUP_CD == "VC":
-        GROUP_N = "VacuumCleaner"
-        PROD_N = next((item for temp_PROD_CD, item in zip(["RBC", "CVC", "OTH"],["Robot Type", "Bagless Type", ""]) if temp_PROD_CD == PROD_CD), "")
-
-    elif GROUP_CD == "VPJ":
-        GROUP_N = "Projector"
-        PROD_N = next((item for temp_PROD_CD, item in zip([""],[""]) if temp_PROD_CD == PROD_CD), "")
-
-    elif GROUP_CD == "WM":
-        GROUP_N = "WashingMachine"
-        PROD_N = next((item for temp_PROD_CD, item in zip(["WM", "DRW", "DRR"],["Top Loader", "Front Loader", "Laundry Dryer"]) if temp_PROD_CD == PROD_CD), "")
-
-        ## Dryer와 WashingMachine을 GPT가 혼동하는 이유로 추가
-        if PROD_N == "Laundry Dryer":
-            GROUP_N = "Laundry Dryer"
-
-    elif GROUP_CD == "DWM":
-        GROUP_N = "DWM"
-        PROD_N = next((item for temp_PROD_CD, item in zip([""],[""]) if temp_PROD_CD == PROD_CD), "")
-
-    ## GROUP_CD : OTH(Other) 인 경우 또는 지정되지 않은 제품 그룹 코드인 경우
-    else:
-        GROUP_N = "Appliances"
-        PROD_N = next((item for temp_PROD_CD, item in zip(["VCR", "CDM", "IPD", "ACL", "OTH"],["Video/DVD", "CD-Rom", "Innovative Personal Device", "Air Cleaner", "Appliances"]) if temp_PROD_CD == PROD_CD), "")
-        GROUP_NAME = f"{GROUP_N} - {PROD_N}"
-        return GROUP_NAME
-
-    ## GROUP_NAME을 다른 곳에서 활용하기위해 "제품군 명"만 추출
-    GROUP_NAME = f"{GROUP_N}"
-    return GROUP_NAME
+    return get_product_rules().group_name(GROUP_CD, PROD_CD)
 
 def remove_duplicates(lst):
     seen = set()
@@ -1191,55 +1401,14 @@ def process_locale(locale):
 def preprocessing_refinement(answer) :
     logger.info("###### Function Name : preprocessing_refinement")
 
-    ## GPT의 JSON Format 출력 결과 후처리
-    answer_str_1 = answer.replace("```json", "").replace("```", "").strip()
-    logger.info(f"############## refinement_answer_str_1 :\n{answer_str_1}")
-    
-    ## 출력 결과 1차 확인 및 answer_dict로 재구성
+    ## GPT의 JSON 출력 결과 ( JSON mode ) -> answer_dict
+    logger.info(f"############## refinement_answer :\n{answer}")
     try:
-        answer_dict = eval(answer_str_1)
-        
-    ## JSONDecode ERROR : 출력 결과 2차 확인 및 answer_dict로 재구성
-    except json.decoder.JSONDecodeError as e:
-
-        logger.info(f"############## refinement_answer_str_1 Error : {type(e).__name__} - {e}")
-
-        answer_str_2 = answer.replace("```json", "").replace("```", "").replace(r'{','').replace(r'}','').strip()
-        logger.info(f"############## refinement_answer_str_2 :\n{answer_str_2}")
-
-        ## 점수
-        device_score = float(extract_data(answer_str_2, start="device_score", end= "intention_score")[0].replace('None','0.0').replace('\"','').replace(':','').replace('\n','').replace(',','').strip())
-        intention_score = float(extract_data(answer_str_2, start="intention_score", end= "refinement")[0].replace('None','0.0').replace('\"','').replace(':','').replace('\n','').replace(',','').strip())
-
-        ## Refine Query
-        refined_question = extract_data(answer_str_2, start="refined_question", end= "additional_sentences")[0].replace('\"','').replace(':','').replace('\n','').replace(',','').strip()
-        temp_additional_sentences = extract_data(answer_str_2, start="additional_sentences", end= "keywords")[0].replace('[','').replace(']','').replace('\"','').replace(':','').replace('    ','').split(',\n')
-        additional_sentences = [item.replace('\n','').replace('\t','').strip() for item in temp_additional_sentences if item.strip()]
-        keywords = extract_data(answer_str_2, start="keywords", end= "symptom")[0].replace('\"','').replace(':','').replace('\n','').replace(',','').strip()
-        symptom = extract_data(answer_str_2, start="symptom", end= "Model_Number")[0].replace('\"','').replace(':','').replace('\n','').replace(',','').strip()
-
-        ## Refined Filter
-        Model_Number = extract_data(answer_str_2, start="Model_Number", end= "Error_Code")[0].replace('\"','').replace(':','').replace('\n','').replace(',','').strip()
-        Error_Code = extract_data(answer_str_2, start="Error_Code")[0].replace('\"','').replace(':','').replace('\n','').replace(',','').strip()
-
-        ## answer_dict 구성
-        answer_dict = {
-            "response_language":"",
-            "evaluation":{
-                "device_score": device_score,
-                "intention_score": intention_score
-            },
-            "refinement":{
-                "refined_question": refined_question,
-                "additional_sentences": additional_sentences,
-                "keywords": keywords,
-                "symptom": symptom,
-                "Model_Number": Model_Number,
-                "Error_Code": Error_Code
-            }
-        }
+        answer_dict = parse_json_answer(answer)
+        assert isinstance(answer_dict, dict) and isinstance(answer_dict.get("refinement"), dict)
 
     except Exception as e :
+        logger.info(f"############## refinement_answer Error : {type(e).__name__} - {e}")
         ## answer_dict 구성
         answer_dict = {
             "response_language":"",
@@ -1252,10 +1421,6 @@ def preprocessing_refinement(answer) :
     
     return answer_dict
 
-def filter_logs_by_chat_id(logs, chat_id, chat_session_id, rag_order):
-    filter_chat = str(chat_id)+'_'+str(chat_session_id)+'_'+str(rag_order)
-    return [log for log in logs if filter_chat in log]
-
 def encrypt(key, plaintext):
     # 패딩
     padder = padding.PKCS7(algorithms.AES.block_size).padder()
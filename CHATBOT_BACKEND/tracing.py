@@ -0,0 +1,190 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import functools
+import threading
+from datetime import datetime
+from contextlib import contextmanager
+from contextvars import ContextVar
+import logging
+logger = logging.getLogger(__name__)
+
+# 요청 단위 구간 추적 ( 외부 호출 span tree ) : 응답 additionalInfo.trace ( debug 요청 ) + JSON lines export
+TRACE_ENABLED = True
+# span 별 1줄 ( trace_id / span_id / parent_id ) 로 저장, 비어 있으면 export 하지 않음
+TRACE_EXPORT_DIR = os.environ.get("TRACE_EXPORT_DIR", "")
+# 요청 당 최대 span 수 ( 초과 시 기록하지 않고 dropped 로 집계 )
+TRACE_MAX_SPANS = 2000
+
+class Span:
+    def __init__(self, trace, name, parent=None, attrs=None):
+        self.trace = trace
+        self.span_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.parent = parent
+        self.attrs = dict(attrs or {})
+        self.start_time = time.time()
+        self.end_time = None
+        self.error = None
+        self.children = []
+
+    def set(self, key, value):
+        self.attrs[key] = value
+
+    @property
+    def duration(self):
+        end_time = self.end_time if self.end_time is not None else time.time()
+        return end_time - self.start_time
+
+    def to_dict(self):
+        result = {"name": self.name,
+                  "start": round(self.start_time - self.trace.start_time, 4),
+                  "duration": round(self.duration, 4)}
+        if self.attrs:
+            result["attrs"] = self.attrs
+        if self.error:
+            result["error"] = self.error
+        with self.trace.lock:
+            children = list(self.children)
+        if children:
+            result["children"] = [child.to_dict() for child in children]
+        return result
+
+class Trace:
+    def __init__(self, name="request"):
+        self.trace_id = uuid.uuid4().hex
+        self.start_time = time.time()
+        self.lock = threading.Lock()
+        self.spans = []
+        self.dropped = 0
+        self.root = Span(self, name)
+
+    def add_span(self, name, parent, attrs=None):
+        with self.lock:
+            if len(self.spans) >= TRACE_MAX_SPANS:
+                self.dropped += 1
+                return None
+            span = Span(self, name, parent, attrs)
+            self.spans.append(span)
+            parent.children.append(span)
+            return span
+
+    def to_dict(self):
+        result = {"traceId": self.trace_id}
+        result.update(self.root.to_dict())
+        if self.dropped:
+            result["dropped"] = self.dropped
+        return result
+
+    # span 별 1줄 ( 부모 id 로 tree 복원 )
+    def to_lines(self, **attrs):
+        with self.lock:
+            spans = [self.root] + list(self.spans)
+        lines = []
+        for span in spans:
+            lines.append(json.dumps({"trace_id": self.trace_id,
+                                     "span_id": span.span_id,
+                                     "parent_id": span.parent.span_id if span.parent is not None else None,
+                                     "name": span.name,
+                                     "start_time": span.start_time,
+                                     "duration": round(span.duration, 6),
+                                     "error": span.error,
+                                     "attrs": dict(attrs, **span.attrs) if span.parent is None else span.attrs},
+                                    ensure_ascii=False, default=str))
+        return lines
+
+# 현재 요청의 trace / span ( thread / asyncio task 별로 분리, worker thread 는 copy_context 로 전달 )
+trace_var = ContextVar("trace", default=None)
+current_span_var = ContextVar("current_span", default=None)
+export_lock = threading.Lock()
+
+def start_trace(name="request"):
+    if not TRACE_ENABLED:
+        return None
+    trace = Trace(name)
+    trace_var.set(trace)
+    current_span_var.set(trace.root)
+    return trace
+
+def end_trace(trace, **attrs):
+    if trace is None:
+        return
+    trace.root.end_time = time.time()
+    if trace_var.get() is trace:
+        trace_var.set(None)
+        current_span_var.set(None)
+    export_trace(trace, **attrs)
+
+def get_trace():
+    return trace_var.get()
+
+def current_span():
+    return current_span_var.get()
+
+@contextmanager
+def span(name, **attrs):
+    trace = trace_var.get()
+    parent = current_span_var.get()
+    if trace is None or parent is None:
+        yield None
+        return
+
+    child = trace.add_span(name, parent, attrs)
+    if child is None:
+        yield None
+        return
+
+    token = current_span_var.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.error = f"{type(e).__name__} : {e}"
+        raise
+    finally:
+        child.end_time = time.time()
+        current_span_var.reset(token)
+
+# 함수 단위 span ( sync / async 모두 지원, 요청 밖에서는 그대로 호출 )
+def traced(name=None):
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if trace_var.get() is None:
+                    return await func(*args, **kwargs)
+                with span(span_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if trace_var.get() is None:
+                return func(*args, **kwargs)
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# 현재까지의 span tree ( 응답 additionalInfo.trace )
+def trace_tree():
+    trace = trace_var.get()
+    if trace is None:
+        return {}
+    return trace.to_dict()
+
+def export_trace(trace, **attrs):
+    if not TRACE_EXPORT_DIR:
+        return
+    try:
+        os.makedirs(TRACE_EXPORT_DIR, exist_ok=True)
+        file_path = os.path.join(TRACE_EXPORT_DIR, f"trace-{datetime.now().strftime('%Y%m%d')}.jsonl")
+        lines = trace.to_lines(**attrs)
+        with export_lock:
+            with open(file_path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+    except Exception as e:
+        logger.error(f"Trace export error : {e}")
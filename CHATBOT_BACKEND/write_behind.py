@@ -0,0 +1,288 @@
+import os
+import glob
+import json
+import time
+import random
+import atexit
+import tempfile
+import threading
+from collections import deque
+import logging
+logger = logging.getLogger(__name__)
+
+# 응답 이후 저장 ( Cosmos 대화 이력 / MySQL 요약 / 로그 ) 을 백그라운드에서 일괄 처리
+WRITE_BEHIND_ENABLED = True
+# 대기 건수 상한 : 초과 시 enqueue 실패 -> 호출부에서 동기 저장
+WRITE_BEHIND_MAX_SIZE = 10000
+WRITE_BEHIND_BATCH_SIZE = 50
+WRITE_BEHIND_FLUSH_INTERVAL = 1.0
+# 재시도 : 1, 2, 4 ... 최대 60초 ( jitter 적용 ), 최대 횟수 초과 시 dead-letter handler ( blob ) 로 저장
+# dead-letter handler 실패 시 로컬 dead-* 파일 -> 다음 기동 시 flusher 가 handler 로 다시 저장
+WRITE_BEHIND_MAX_ATTEMPTS = 8
+WRITE_BEHIND_BACKOFF_BASE = 1
+WRITE_BEHIND_BACKOFF_MAX = 60
+# 종료 시 flusher 대기 시간 (초), 이후 남은 건은 로컬 디스크로 spill -> 다음 기동 시 재적재
+WRITE_BEHIND_SHUTDOWN_TIMEOUT = 5
+WRITE_BEHIND_SPILL_DIR = os.environ.get("WRITE_BEHIND_SPILL_DIR", os.path.join(tempfile.gettempdir(), "chatbot-write-behind"))
+LAG_WINDOW = 1000
+
+class WriteBehindQueue:
+    def __init__(self, spill_dir=WRITE_BEHIND_SPILL_DIR, max_size=WRITE_BEHIND_MAX_SIZE, batch_size=WRITE_BEHIND_BATCH_SIZE,
+                 flush_interval=WRITE_BEHIND_FLUSH_INTERVAL, max_attempts=WRITE_BEHIND_MAX_ATTEMPTS):
+        self.spill_dir = spill_dir
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.handlers = {}
+        self.dead_letter_handler = None
+        self.pending = deque()
+        # 이번 flush 에서 꺼낸 item ( 전송 전 ) / 전송 중 batch : id(item) -> item
+        self.inflight = {}
+        self.delivering = {}
+        self.condition = threading.Condition()
+        self.thread = None
+        self.stopped = False
+
+        # metrics
+        self.enqueued = 0
+        self.delivered = 0
+        self.retried = 0
+        self.dead = 0
+        self.dead_stored = 0
+        self.rejected = 0
+        self.spilled = 0
+        self.reloaded = 0
+        self.lags = deque(maxlen=LAG_WINDOW)
+        self.max_lag = 0.0
+
+    # kind 별 저장 함수 등록 : handler(payloads) -> 실패한 payload 목록 ( 예외 시 batch 전체 실패 )
+    def register(self, kind, handler):
+        self.handlers[kind] = handler
+
+    # dead-letter 저장 함수 등록 : handler(kind, lines) ( lines : JSON lines, 실패 시 예외 )
+    def register_dead_letter(self, handler):
+        self.dead_letter_handler = handler
+
+    def enqueue(self, kind, payload):
+        if not WRITE_BEHIND_ENABLED:
+            return False
+
+        self.start()
+        with self.condition:
+            if self.stopped or len(self.pending) >= self.max_size:
+                self.rejected += 1
+                return False
+            self.pending.append({"kind": kind,
+                                 "payload": payload,
+                                 "enqueue_time": time.time(),
+                                 "attempts": 0,
+                                 "next_time": 0})
+            self.enqueued += 1
+            if len(self.pending) >= self.batch_size:
+                self.condition.notify()
+        return True
+
+    def start(self):
+        if self.thread is not None:
+            return
+        with self.condition:
+            if self.thread is not None:
+                return
+            self.reload()
+            self.thread = threading.Thread(target=self.run, name="write-behind", daemon=True)
+            self.thread.start()
+
+    def run(self):
+        self.reload_dead()
+        while True:
+            with self.condition:
+                if not self.stopped:
+                    self.condition.wait(self.flush_interval)
+                if self.stopped:
+                    return
+                batches = self.take_ready(time.time())
+
+            for kind, items in batches.items():
+                for start in range(0, len(items), self.batch_size):
+                    self.deliver(kind, items[start:start + self.batch_size])
+
+    # 재시도 시간이 지난 item 만 kind 별로 꺼냄 ( handler 미등록 kind 는 대기 )
+    def take_ready(self, now):
+        batches = {}
+        for _ in range(len(self.pending)):
+            item = self.pending.popleft()
+            if item["next_time"] <= now and item["kind"] in self.handlers:
+                batches.setdefault(item["kind"], []).append(item)
+                self.inflight[id(item)] = item
+            else:
+                self.pending.append(item)
+        return batches
+
+    def deliver(self, kind, items):
+        # shutdown 이 이미 spill 한 item 은 제외
+        with self.condition:
+            items = [item for item in items if self.inflight.pop(id(item), None) is not None]
+            self.delivering.update((id(item), item) for item in items)
+        if not items:
+            return
+
+        try:
+            failed = self.handlers[kind]([item["payload"] for item in items]) or []
+            failed_ids = set(id(payload) for payload in failed)
+            failed_items = [item for item in items if id(item["payload"]) in failed_ids]
+        except Exception as e:
+            logger.error(f"Write-behind delivery error : {kind}, {len(items)} items - {type(e).__name__} : {e}")
+            failed_items = items
+
+        now = time.time()
+        failed_ids = set(id(item) for item in failed_items)
+        retry_items = []
+        with self.condition:
+            for item in items:
+                del self.delivering[id(item)]
+                if id(item) in failed_ids:
+                    continue
+                lag = now - item["enqueue_time"]
+                self.lags.append(lag)
+                self.max_lag = max(self.max_lag, lag)
+                self.delivered += 1
+
+            dead_items = []
+            for item in failed_items:
+                item["attempts"] += 1
+                if item["attempts"] >= self.max_attempts:
+                    dead_items.append(item)
+                    continue
+                backoff = min(WRITE_BEHIND_BACKOFF_BASE * 2 ** (item["attempts"] - 1), WRITE_BEHIND_BACKOFF_MAX)
+                item["next_time"] = now + backoff * random.uniform(0.5, 1.0)
+                retry_items.append(item)
+                self.retried += 1
+            self.dead += len(dead_items)
+            # shutdown 이후 끝난 batch 의 재시도 건은 대기열 대신 직접 spill ( shutdown 의 spill 과 중복 없음 )
+            stopped = self.stopped
+            if not stopped:
+                self.pending.extend(retry_items)
+
+        if stopped:
+            self.spill(retry_items)
+
+        if dead_items:
+            logger.error(f"Write-behind dead-letter : {kind}, {len(dead_items)} items")
+            self.dead_letter(dead_items)
+
+    def record(self, item):
+        return json.dumps({"kind": item["kind"],
+                           "payload": item["payload"],
+                           "enqueue_time": item["enqueue_time"],
+                           "attempts": item["attempts"]}, ensure_ascii=False)
+
+    # kind 별로 dead-letter handler 에 전달, handler 가 없거나 실패하면 로컬 dead-* 파일
+    def dead_letter(self, items):
+        kinds = {}
+        for item in items:
+            kinds.setdefault(item["kind"], []).append(item)
+        for kind, kind_items in kinds.items():
+            try:
+                if self.dead_letter_handler is None:
+                    raise RuntimeError("No dead-letter handler")
+                self.dead_letter_handler(kind, [self.record(item) for item in kind_items])
+                with self.condition:
+                    self.dead_stored += len(kind_items)
+            except Exception as e:
+                logger.error(f"Write-behind dead-letter store error : {kind}, {len(kind_items)} items - {e}")
+                self.spill(kind_items, prefix="dead")
+
+    # 로컬 디스크에 JSON lines 로 저장 ( 임시 파일 작성 후 rename )
+    def spill(self, items, prefix="spill"):
+        if not items:
+            return None
+        try:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            file_path = os.path.join(self.spill_dir, f"{prefix}-{os.getpid()}-{time.time_ns()}.jsonl")
+            with open(file_path + ".tmp", "w", encoding="utf-8") as f:
+                for item in items:
+                    f.write(self.record(item) + "\n")
+            os.replace(file_path + ".tmp", file_path)
+            if prefix == "spill":
+                self.spilled += len(items)
+            logger.info(f"Write-behind spilled : {len(items)} items -> {file_path}")
+            return file_path
+        except Exception as e:
+            logger.error(f"Write-behind spill error : {len(items)} items lost - {e}")
+            return None
+
+    # 이전 프로세스가 남긴 파일 선점 ( rename 으로 다른 worker 와 중복 적재 방지 ) 후 item 목록 반환
+    def claim(self, prefix):
+        for file_path in sorted(glob.glob(os.path.join(self.spill_dir, f"{prefix}-*.jsonl"))):
+            claimed_path = f"{file_path}.loading-{os.getpid()}"
+            try:
+                os.rename(file_path, claimed_path)
+            except OSError:
+                continue
+
+            try:
+                with open(claimed_path, encoding="utf-8") as f:
+                    items = [json.loads(line) for line in f if line.strip()]
+                os.remove(claimed_path)
+            except Exception as e:
+                logger.error(f"Write-behind reload error : {file_path} - {e}")
+                continue
+            yield items
+
+    # spill 파일은 다시 대기열로
+    def reload(self):
+        for items in self.claim("spill"):
+            for item in items:
+                item["next_time"] = 0
+                self.pending.append(item)
+                self.reloaded += 1
+
+        if self.reloaded:
+            logger.info(f"Write-behind reloaded : {self.reloaded} items")
+
+    # dead-letter handler 실패로 남은 로컬 dead-* 파일은 handler 로 다시 저장 ( flusher thread )
+    def reload_dead(self):
+        for items in self.claim("dead"):
+            logger.info(f"Write-behind dead-letter reloaded : {len(items)} items")
+            self.dead_letter(items)
+
+    def shutdown(self, timeout=WRITE_BEHIND_SHUTDOWN_TIMEOUT):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+
+        thread = self.thread
+        if thread is not None:
+            thread.join(timeout)
+
+        # 대기 + 꺼냈지만 아직 전송하지 않은 item 만 1회 spill ( 전송 완료 / 전송 중 batch 는 제외 : MySQL 요약은 INSERT 라 재전송 시 중복 )
+        # 전송 중 batch 의 실패 건은 flusher 가 끝난 뒤 직접 spill
+        with self.condition:
+            items = list(self.pending) + list(self.inflight.values())
+            self.pending.clear()
+            self.inflight.clear()
+        self.spill(items)
+
+    def stats(self):
+        with self.condition:
+            now = time.time()
+            lags = sorted(self.lags)
+            oldest = min((item["enqueue_time"] for item in self.pending), default=None)
+            return {"pending": len(self.pending),
+                    "inflight": len(self.inflight) + len(self.delivering),
+                    "enqueued": self.enqueued,
+                    "delivered": self.delivered,
+                    "retried": self.retried,
+                    "dead": self.dead,
+                    "dead_stored": self.dead_stored,
+                    "rejected": self.rejected,
+                    "spilled": self.spilled,
+                    "reloaded": self.reloaded,
+                    "lag_avg": round(sum(lags) / len(lags), 3) if lags else 0.0,
+                    "lag_p95": round(lags[min(len(lags) - 1, int(len(lags) * 0.95))], 3) if lags else 0.0,
+                    "lag_max": round(self.max_lag, 3),
+                    "oldest_pending_age": round(now - oldest, 3) if oldest is not None else 0.0}
+
+write_behind_queue = WriteBehindQueue()
+atexit.register(write_behind_queue.shutdown)
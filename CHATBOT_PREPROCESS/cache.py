@@ -0,0 +1,104 @@
+import time
+import threading
+from collections import OrderedDict
+import logging
+logger = logging.getLogger(__name__)
+
+class TTLCache:
+    def __init__(self, maxsize=1024, ttl=3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+        self.inflight = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, key):
+        with self.lock:
+            return self._get(key)
+
+    def _get(self, key):
+        item = self.data.get(key)
+        if item is None:
+            return False, None
+
+        value, expire_time = item
+        if expire_time is not None and expire_time < time.time():
+            del self.data[key]
+            return False, None
+
+        self.data.move_to_end(key)
+        return True, value
+
+    def set(self, key, value, ttl=None):
+        with self.lock:
+            self._set(key, value, ttl)
+
+    def _set(self, key, value, ttl=None):
+        if ttl is None:
+            ttl = self.ttl
+        expire_time = time.time() + ttl if ttl is not None else None
+        self.data[key] = (value, expire_time)
+        self.data.move_to_end(key)
+        while len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+
+    def invalidate(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+    # 캐시에 없으면 loader 실행, 같은 key 동시 요청은 한 번만 실행 (single-flight)
+    def get_or_load(self, key, loader, ttl=None):
+        with self.lock:
+            found, value = self._get(key)
+            if found:
+                self.hits += 1
+                return value
+
+            flight = self.inflight.get(key)
+            if flight is None:
+                flight = {"event": threading.Event(), "value": None, "error": None}
+                self.inflight[key] = flight
+                leader = True
+                self.misses += 1
+            else:
+                leader = False
+                self.coalesced += 1
+
+        if not leader:
+            flight["event"].wait()
+            if flight["error"] is not None:
+                raise flight["error"]
+            return flight["value"]
+
+        try:
+            value = loader()
+            flight["value"] = value
+            with self.lock:
+                self._set(key, value, ttl)
+            return value
+
+        except Exception as e:
+            flight["error"] = e
+            raise
+
+        finally:
+            with self.lock:
+                self.inflight.pop(key, None)
+            flight["event"].set()
+
+    def stats(self):
+        with self.lock:
+            total = self.hits + self.misses + self.coalesced
+            return {"size": len(self.data),
+                    "maxsize": self.maxsize,
+                    "hits": self.hits,
+                    "misses": self.misses,
+                    "coalesced": self.coalesced,
+                    "hit_rate": (self.hits + self.coalesced) / total if total else 0.0}
@@ -56,12 +56,13 @@ _as_str = _as_config['STR']
 
 def main(mytimer: func.TimerRequest) -> None:
 
-    from log import setup_logger, thread_local
+    from log import setup_logger, start_log_buffers, end_log_buffers
 
     formatted_date = datetime.now().strftime("%Y-%m-%d %H:%M")
     api_type = 'chatlog'
     data_type = formatted_date +'-'+ api_type
 
+    log_buffers = start_log_buffers()
     logger = setup_logger(data_type)
     logger.info('===== Chat log data summary start!')
     logger.info("=" * 30 + " POD_NAME " + "=" * 30)
@@ -134,11 +135,11 @@ def main(mytimer: func.TimerRequest) -> None:
         error = traceback.format_exc()
         logger.error(error)
     
-    filter_logs_data_type = filter_logs_by_data_type(logs=thread_local.log_list, data_type=data_type)
-    logs_str = "\n".join(filter_logs_data_type)
+    logs_str = log_buffers.getvalue(data_type)
     formatted_date = datetime.now().strftime('%Y-%m-%d')
     log_file_path = f"chatlogapi/{formatted_date}/upload_chatlog.log"
     upload_log(logger, _as_str, logs_str, file_path=log_file_path)
+    end_log_buffers(log_buffers)
 
     return None
 
@@ -746,7 +747,3 @@ def make_tmp_chat_rag_data(logger, conn, cos_cont, chat_ids, start_time=None):
     insert_tmp_chat_rag_raw(logger, conn, chat_rag_raw_df.to_dict('records'))
 
     logger.info('========= Make tmp_if_chat_rag_raw table end!')
-
-def filter_logs_by_data_type(logs, data_type):
-    filter_chat = str(data_type)
-    return [log for log in logs if filter_chat in log]
@@ -1,17 +1,21 @@
 from azure.storage.blob import BlobServiceClient, generate_blob_sas, BlobSasPermissions, ContentSettings
 from azure.core.exceptions import *
+from azure.core import MatchConditions
 
 from azure.cosmos import CosmosClient, PartitionKey
 from azure.cosmos.exceptions import *
 
 import mysql.connector
 from mysql.connector import Error
+from mysql.connector.errors import PoolError
 
 from sqlalchemy import create_engine, engine
 from sqlalchemy.dialects.mysql import *
 
 import yaml
 import datetime
+import time
+import threading
 import io
 import os
 import pandas as pd
@@ -19,13 +23,24 @@ import json
 import pytz
 from dateutil import parser
 from credential import keyvault_values
+from cache import TTLCache
 # from log import make_logger
 import logging
 logger = logging.getLogger(__name__)
 
+# read_file 캐시 ( key : (account_name, container_name, file_path, sheet_name) )
+BLOB_CACHE = TTLCache(maxsize=256, ttl=None)
+# 캐시 재검증 주기 (초) : 이 시간 이후에는 ETag 조건부 요청으로 변경 여부 확인
+BLOB_CACHE_FRESHNESS = 300
+# 존재하지 않는 blob 캐시 유지 시간 (초)
+BLOB_CACHE_NEGATIVE_TTL = 60
+
 class AzureStorage:
 
-    def __init__(self, container_name='sample-data', storage_type = None):
+    def __init__(self, container_name='sample-data', storage_type = None, use_cache=False, cache_freshness=BLOB_CACHE_FRESHNESS):
+
+        self.use_cache = use_cache
+        self.cache_freshness = cache_freshness
 
         if storage_type == 'docst' :
 
@@ -58,33 +73,88 @@ class AzureStorage:
         except Exception as e :
             logger.error(f"Container connection error \nContainer name : {container_name} \nError message : {str(e)}")
 
-    def read_file(self, file_path, sheet_name=None):
+    def read_file(self, file_path, sheet_name=None, use_cache=None):
         logger.info("###### Function Name : read_file")
+        if use_cache is None:
+            use_cache = self.use_cache
+        if use_cache:
+            return self.read_file_cached(file_path, sheet_name)
+
         try:
             file_client = self.container_client.get_blob_client(file_path)
+            file = self.parse_file(file_path, file_client.download_blob().readall(), sheet_name)
+            logger.info(f"File load completed \nPath : {file_path}")
+            return file
 
-            if file_path.split('.')[-1] == 'xlsx' or file_path.split('.')[-1] == 'csv':
-                with io.BytesIO() as blob_io:
-                    file_client.download_blob().readinto(blob_io)
-                    blob_io.seek(0)
-                    if file_path.split('.')[-1] == 'xlsx' : 
-                        file = pd.read_excel(blob_io, sheet_name=sheet_name if sheet_name is not None else 0)
-                    else :
-                        file = pd.read_csv(blob_io)
-                logger.info(f"File load completed \nPath : {file_path}")
-                return file
-            
-            elif file_path.split('.')[-1] == 'pdf' or file_path.split('.')[-1] == 'json':
-                download = file_client.download_blob()
-                file = io.BytesIO(download.readall())
-                logger.info(f"File load completed \nPath : {file_path}")
-                return file
-            
+        except Exception as e:
+            logger.error(f"File load error \nPath : {file_path} \nError message : {str(e)}")
+            return None
+
+    def parse_file(self, file_path, data, sheet_name=None):
+        if file_path.split('.')[-1] == 'xlsx' or file_path.split('.')[-1] == 'csv':
+            with io.BytesIO(data) as blob_io:
+                if file_path.split('.')[-1] == 'xlsx' : 
+                    file = pd.read_excel(blob_io, sheet_name=sheet_name if sheet_name is not None else 0)
+                else :
+                    file = pd.read_csv(blob_io)
+            return file
+        
+        elif file_path.split('.')[-1] == 'pdf' or file_path.split('.')[-1] == 'json':
+            return io.BytesIO(data)
+        
+        else:
+            return data.decode("utf-8")
+
+    # 캐시된 객체는 호출마다 새로 감싸서 반환 ( BytesIO 위치, DataFrame 변경이 캐시에 영향 주지 않도록 )
+    def cached_value(self, entry):
+        value = entry['value']
+        if value is None:
+            return None
+        if isinstance(value, bytes):
+            return io.BytesIO(value)
+        if isinstance(value, pd.DataFrame):
+            return value.copy()
+        if isinstance(value, dict):
+            return {key: item.copy() if isinstance(item, pd.DataFrame) else item for key, item in value.items()}
+        return value
+
+    def read_file_cached(self, file_path, sheet_name=None):
+        key = (self.account_name, self.container_name, file_path, str(sheet_name))
+        found, entry = BLOB_CACHE.get(key)
+        now = time.time()
+
+        if found:
+            freshness = BLOB_CACHE_NEGATIVE_TTL if entry['etag'] is None else self.cache_freshness
+            if now - entry['checked_time'] < freshness:
+                logger.info(f"File cache hit \nPath : {file_path}")
+                return self.cached_value(entry)
+
+        try:
+            file_client = self.container_client.get_blob_client(file_path)
+
+            if found and entry['etag'] is not None:
+                try:
+                    download = file_client.download_blob(etag=entry['etag'], match_condition=MatchConditions.IfModified)
+                except HttpResponseError as e:
+                    if e.status_code != 304:
+                        raise
+                    BLOB_CACHE.set(key, dict(entry, checked_time=now))
+                    logger.info(f"File not modified \nPath : {file_path}")
+                    return self.cached_value(entry)
             else:
                 download = file_client.download_blob()
-                downloaded_bytes = download.readall()
-                logger.info(f"File load completed \nPath : {file_path}")
-                return downloaded_bytes.decode("utf-8")
+
+            data = download.readall()
+            file = self.parse_file(file_path, data, sheet_name)
+            value = data if isinstance(file, io.BytesIO) else file
+            BLOB_CACHE.set(key, {"etag": download.properties.etag, "value": value, "checked_time": now})
+            logger.info(f"File load completed \nPath : {file_path}")
+            return self.cached_value({"value": value})
+
+        except ResourceNotFoundError as e:
+            BLOB_CACHE.set(key, {"etag": None, "value": None, "checked_time": now})
+            logger.error(f"File load error \nPath : {file_path} \nError message : {str(e)}")
+            return None
 
         except Exception as e:
             logger.error(f"File load error \nPath : {file_path} \nError message : {str(e)}")
@@ -357,6 +427,179 @@ class CosmosDB:
         
         return result
         
+# MySQL connection pool 설정
+MYSQL_POOL_SIZE = 10
+# 커넥션 대기 최대 시간 (초)
+MYSQL_POOL_TIMEOUT = 10
+# 이 시간 이상 유휴 상태였던 커넥션은 재사용 전에 ping 으로 상태 확인 (초)
+MYSQL_POOL_PING_INTERVAL = 60
+
+class PooledConnection:
+    # close() 호출 시 실제 연결을 끊지 않고 pool 로 반환
+    def __init__(self, pool, connection):
+        self.pool = pool
+        self.raw_connection = connection
+        self.released = False
+
+    def close(self):
+        if not self.released:
+            self.released = True
+            self.pool.release(self.raw_connection)
+
+    def is_connected(self):
+        if self.released:
+            return False
+        return self.raw_connection.is_connected()
+
+    def __getattr__(self, name):
+        return getattr(self.raw_connection, name)
+
+class MySqlPool:
+    def __init__(self, config, max_size=MYSQL_POOL_SIZE, timeout=MYSQL_POOL_TIMEOUT):
+        self.config = config
+        self.max_size = max_size
+        self.timeout = timeout
+        self.condition = threading.Condition()
+        self.idle = []
+        self.size = 0
+        self.in_use = 0
+
+        # metrics
+        self.acquire_count = 0
+        self.wait_count = 0
+        self.timeout_count = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.created_count = 0
+        self.discarded_count = 0
+
+    def acquire(self):
+        start_time = time.time()
+        deadline = start_time + self.timeout
+        waited = False
+
+        with self.condition:
+            while True:
+                if self.idle:
+                    connection, last_used = self.idle.pop()
+                    break
+                if self.size < self.max_size:
+                    connection, last_used = None, None
+                    self.size += 1
+                    break
+
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    self.timeout_count += 1
+                    raise PoolError(f"MySQL pool exhausted : {self.in_use}/{self.max_size} in use, waited {self.timeout}s")
+                waited = True
+                self.condition.wait(remaining)
+
+            self.in_use += 1
+            wait_time = time.time() - start_time
+            self.acquire_count += 1
+            self.total_wait_time += wait_time
+            self.max_wait_time = max(self.max_wait_time, wait_time)
+            if waited:
+                self.wait_count += 1
+
+        try:
+            if connection is None:
+                connection = self.connect()
+            elif time.time() - last_used > MYSQL_POOL_PING_INTERVAL:
+                try:
+                    connection.ping(reconnect=False)
+                except Exception as e:
+                    logger.info(f"Stale MySQL connection discarded : {e}")
+                    self.close_quietly(connection)
+                    with self.condition:
+                        self.discarded_count += 1
+                    connection = self.connect()
+
+        except Exception:
+            with self.condition:
+                self.size -= 1
+                self.in_use -= 1
+                self.condition.notify()
+            raise
+
+        return PooledConnection(self, connection)
+
+    def connect(self):
+        connection = mysql.connector.connect(**self.config)
+        with self.condition:
+            self.created_count += 1
+        return connection
+
+    def release(self, connection):
+        # 트랜잭션 종료 ( 유휴 커넥션이 오래된 snapshot 을 유지하지 않도록 )
+        healthy = True
+        try:
+            if connection.unread_result:
+                connection.consume_results()
+            if connection.in_transaction:
+                connection.rollback()
+        except Exception as e:
+            logger.info(f"Broken MySQL connection discarded : {e}")
+            healthy = False
+
+        if not healthy:
+            self.close_quietly(connection)
+
+        with self.condition:
+            self.in_use -= 1
+            if healthy:
+                self.idle.append((connection, time.time()))
+            else:
+                self.size -= 1
+                self.discarded_count += 1
+            self.condition.notify()
+
+    def close_quietly(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def close_all(self):
+        with self.condition:
+            idle, self.idle = self.idle, []
+            self.size -= len(idle)
+        for connection, last_used in idle:
+            self.close_quietly(connection)
+
+    def stats(self):
+        with self.condition:
+            return {"max_size": self.max_size,
+                    "size": self.size,
+                    "in_use": self.in_use,
+                    "idle": len(self.idle),
+                    "utilisation": self.in_use / self.max_size,
+                    "acquire_count": self.acquire_count,
+                    "wait_count": self.wait_count,
+                    "timeout_count": self.timeout_count,
+                    "avg_wait_time": self.total_wait_time / self.acquire_count if self.acquire_count else 0.0,
+                    "max_wait_time": self.max_wait_time,
+                    "created_count": self.created_count,
+                    "discarded_count": self.discarded_count}
+
+mysql_pools = {}
+mysql_pools_lock = threading.Lock()
+
+def get_mysql_pool(config):
+    key = (config['host'], config['user'], config['database'])
+    with mysql_pools_lock:
+        pool = mysql_pools.get(key)
+        if pool is None:
+            pool = MySqlPool(config)
+            mysql_pools[key] = pool
+        return pool
+
+def mysql_pool_stats():
+    with mysql_pools_lock:
+        pools = dict(mysql_pools)
+    return {f"{key[0]}/{key[2]}": pool.stats() for key, pool in pools.items()}
+        
 class MySql:
     def __init__(self, database_name='lgchatbot'):
    
@@ -364,22 +607,34 @@ class MySql:
         self.user = keyvault_values["mysql-user"]
         self.password = keyvault_values["mysql-password"]
         self.database = database_name
+        self._connection = None
         
-        try :
-            config = {
-            'user': self.user,
-            'password': self.password,
-            'host': self.host,
-            'database': self.database,
-            'ssl_verify_identity': True,  # 인증서 신뢰 여부 설정
-            'ssl_ca': './config/DigiCertGlobalRootCA.crt.pem'  # CA 인증서 파일 경로 설정
-            }
-
-            # Azure MySQL에 연결
-            self.connection = mysql.connector.connect(**config)
-            
-        except Error as e:
-            logger.error(f"Database connection error : {e}")
+        config = {
+        'user': self.user,
+        'password': self.password,
+        'host': self.host,
+        'database': self.database,
+        'ssl_verify_identity': True,  # 인증서 신뢰 여부 설정
+        'ssl_ca': './config/DigiCertGlobalRootCA.crt.pem'  # CA 인증서 파일 경로 설정
+        }
+
+        # Azure MySQL 커넥션은 pool 에서 빌려서 사용 ( connection.close() 시 pool 로 반환 )
+        self.pool = get_mysql_pool(config)
+
+    @property
+    def connection(self):
+        if self._connection is None or self._connection.released:
+            try:
+                self._connection = self.pool.acquire()
+            except Error as e:
+                logger.error(f"Database connection error : {e}")
+                raise
+        return self._connection
+
+    def __del__(self):
+        connection = getattr(self, '_connection', None)
+        if connection is not None:
+            connection.close()
 
     def get_table(self, query, parameters=None):
         logger.info("###### Function Name : get_table")
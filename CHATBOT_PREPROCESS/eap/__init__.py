@@ -12,13 +12,14 @@ import time
 
 def main(mytimer: func.TimerRequest) -> None:
 
-    from log import setup_logger, thread_local
+    from log import setup_logger, start_log_buffers, end_log_buffers
     from database import MySql, AzureStorage
 
     formatted_date = datetime.now().strftime('%Y-%m-%d')
     api_type = 'eap'
     data_type = formatted_date +'-'+ api_type
 
+    log_buffers = start_log_buffers()
     logger = setup_logger(data_type)
     logger.info('===== Chat log data summary start!')
     as_instance_log = AzureStorage(container_name='logs', storage_type='datast')
@@ -159,15 +160,11 @@ def main(mytimer: func.TimerRequest) -> None:
         error = traceback.format_exc()
         logger.error(error)
 
-    filter_logs_data_type = filter_logs_by_data_type(logs=thread_local.log_list, data_type=data_type)
-    logs_str = "\n".join(filter_logs_data_type)
+    logs_str = log_buffers.getvalue(data_type)
 
     formatted_date = datetime.now().strftime('%Y-%m-%d')
     log_file_path = f"eapapi/{formatted_date}/eap.log"
     as_instance_log.upload_log(logs_str, file_path=log_file_path)
+    end_log_buffers(log_buffers)
 
     return None
-
-def filter_logs_by_data_type(logs, data_type):
-    filter_chat = str(data_type)
-    return [log for log in logs if filter_chat in log]
@@ -1,13 +1,84 @@
 import logging
 import pytz
+import threading
+from collections import deque
+from contextvars import ContextVar
 from datetime import datetime
-from threading import local
 from azure.storage.blob import BlobServiceClient
 from io import StringIO
 import os
 
-# 스레드 로컬 데이터를 저장할 변수 생성
-thread_local = local()
+# 전처리 유형 당 로그 상한 ( 문자 수 ) : 초과 시 앞부분 절반 + 마지막 절반만 유지
+LOG_BUFFER_MAX_CHARS = 16 * 1024 * 1024
+
+class LogBuffer:
+    def __init__(self, max_chars=LOG_BUFFER_MAX_CHARS):
+        self.max_chars = max_chars
+        self.head = []
+        self.head_chars = 0
+        self.tail = deque()
+        self.tail_chars = 0
+        self.dropped = 0
+        self.lock = threading.Lock()
+
+    def append(self, line):
+        with self.lock:
+            if not self.tail and self.head_chars + len(line) <= self.max_chars // 2:
+                self.head.append(line)
+                self.head_chars += len(line)
+                return
+
+            self.tail.append(line)
+            self.tail_chars += len(line)
+            while self.tail_chars > self.max_chars // 2 and len(self.tail) > 1:
+                self.tail_chars -= len(self.tail.popleft())
+                self.dropped += 1
+
+    def lines(self):
+        with self.lock:
+            lines = list(self.head)
+            if self.dropped:
+                lines.append(f"... {self.dropped} log lines dropped ...")
+            lines.extend(self.tail)
+            return lines
+
+    def getvalue(self):
+        return "\n".join(self.lines())
+
+# 실행 단위 로그 버퍼 ( preprocess_type 별로 분리 )
+class LogBuffers:
+    def __init__(self, max_chars=LOG_BUFFER_MAX_CHARS):
+        self.max_chars = max_chars
+        self.buffers = {}
+        self.lock = threading.Lock()
+
+    def append(self, preprocess_type, line):
+        buffer = self.buffers.get(preprocess_type)
+        if buffer is None:
+            with self.lock:
+                buffer = self.buffers.setdefault(preprocess_type, LogBuffer(self.max_chars))
+        buffer.append(line)
+
+    def getvalue(self, preprocess_type):
+        buffer = self.buffers.get(preprocess_type)
+        return buffer.getvalue() if buffer is not None else ""
+
+    def clear(self):
+        with self.lock:
+            self.buffers = {}
+
+log_buffers_var = ContextVar("log_buffers", default=None)
+
+def start_log_buffers(max_chars=LOG_BUFFER_MAX_CHARS):
+    buffers = LogBuffers(max_chars)
+    log_buffers_var.set(buffers)
+    return buffers
+
+# 실행 종료 시 호출 : 버퍼 해제
+def end_log_buffers(buffers):
+    if log_buffers_var.get() is buffers:
+        log_buffers_var.set(None)
+    buffers.clear()
 
 class ListLogHandler(logging.Handler):
     def __init__(self, preprocess_type):
@@ -18,12 +89,13 @@ class ListLogHandler(logging.Handler):
         self.preprocess_type = new_preprocess_type
 
     def emit(self, record):
-        if not hasattr(thread_local, 'log_list'):
-            thread_local.log_list = []
+        buffers = log_buffers_var.get()
+        if buffers is None:
+            return
         log_entry = self.format(record)
 
         log_entry_with_data_type = f"{self.preprocess_type} - {log_entry}"
-        thread_local.log_list.append(log_entry_with_data_type)
+        buffers.append(self.preprocess_type, log_entry_with_data_type)
 
 class KSTFormatter(logging.Formatter):
     def formatTime(self, record, datefmt=None):
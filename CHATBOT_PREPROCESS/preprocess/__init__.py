@@ -16,10 +16,12 @@ def main(mytimer: func.TimerRequest) -> None:
 
     from preprocessing import Preprocessing
     from database import AzureStorage, MySql
-    from log import setup_logger, thread_local
-    from tools import clean_string, calc_stats, run_indexer, filter_logs_by_data_type, update_index_count
+    from log import setup_logger, start_log_buffers, end_log_buffers
+    from tools import clean_string, calc_stats, run_indexer, update_index_count
     from ai_search import AISearch
     
+    # 실행 단위 로그 버퍼 ( 전처리 유형별, 종료 시 해제 )
+    log_buffers = start_log_buffers()
     search_instance = AISearch()
     as_instance_log = AzureStorage(container_name='logs', storage_type='datast')
     preprocess_instance = Preprocessing()
@@ -50,8 +52,7 @@ def main(mytimer: func.TimerRequest) -> None:
 
     try :
         procedure_result = preprocess_instance.run_procedure(logger=logger)
-        filter_logs_data_type = filter_logs_by_data_type(logs=thread_local.log_list, data_type=data_type)
-        logs_str = "\n".join(filter_logs_data_type)
+        logs_str = log_buffers.getvalue(data_type)
         log_file_path = f"prcapi/batch/log/{formatted_date}/{data_type}.log"
         as_instance_log.upload_file(logs_str, file_path=log_file_path, overwrite=True)
         as_instance_log.upload_file(procedure_result, file_path=f"prcapi/batch/prc_info/{formatted_date}/{data_type}.json", overwrite=True)
@@ -61,8 +62,7 @@ def main(mytimer: func.TimerRequest) -> None:
         logger.error(traceback.format_exc())
         error_procedure = f"{type(e).__name__} : '{e}'"
         logger.error(error_procedure)
-        filter_logs_data_type = filter_logs_by_data_type(logs=thread_local.log_list, data_type=data_type)
-        logs_str = "\n".join(filter_logs_data_type)
+        logs_str = log_buffers.getvalue(data_type)
         log_file_path = f"prcapi/batch/error_log/{formatted_date}/{data_type}.log"
         as_instance_log.upload_file(logs_str, file_path=log_file_path, overwrite=True)
     
@@ -82,8 +82,7 @@ def main(mytimer: func.TimerRequest) -> None:
     
     try :
         spec_index_list, spec_result = preprocess_instance.spec_to_storage(logger=logger, type='batch',time=preprocess_time) 
-        filter_logs_data_type = filter_logs_by_data_type(logs=thread_local.log_list, data_type=data_type)
-        logs_str = "\n".join(filter_logs_data_type)
+        logs_str = log_buffers.getvalue(data_type)
         log_file_path = f"prcapi/batch/log/{formatted_date}/{data_type}.log"
         as_instance_log.upload_file(logs_str, file_path=log_file_path, overwrite=True)
         as_instance_log.upload_file(spec_result, file_path=f"prcapi/batch/prc_info/{formatted_date}/{data_type}.json", overwrite=True)
@@ -91,8 +90,7 @@ def main(mytimer: func.TimerRequest) -> None:
     except Exception as e :
         error = traceback.format_exc()
         logger.error(error)
-        filter_logs_data_type = filter_logs_by_data_type(logs=thread_local.log_list, data_type=data_type)
-        logs_str = "\n".join(filter_logs_data_type)
+        logs_str = log_buffers.getvalue(data_type)
         log_file_path = f"prcapi/batch/error_log/{formatted_date}/{data_type}.log"
         as_instance_log.upload_file(logs_str, file_path=log_file_path, overwrite=True)
 
@@ -113,8 +111,7 @@ def main(mytimer: func.TimerRequest) -> None:
 
     try :
         contents_index_list, contents_result = preprocess_instance.contents_to_storage(logger=logger, type='batch', time=preprocess_time)
-        filter_logs_data_type = filter_logs_by_data_type(logs=thread_local.log_list, data_type=data_type)
-        logs_str = "\n".join(filter_logs_data_type)
+        logs_str = log_buffers.getvalue(data_type)
         log_file_path = f"prcapi/batch/log/{formatted_date}/{data_type}.log"
         as_instance_log.upload_file(logs_str, file_path=log_file_path, overwrite=True)
         as_instance_log.upload_file(contents_result, file_path=f"prcapi/batch/prc_info/{formatted_date}/{data_type}.json", overwrite=True)
@@ -122,8 +119,7 @@ def main(mytimer: func.TimerRequest) -> None:
     except Exception as e :
         error = traceback.format_exc()
         logger.error(error)
-        filter_logs_data_type = filter_logs_by_data_type(logs=thread_local.log_list, data_type=data_type)
-        logs_str = "\n".join(filter_logs_data_type)
+        logs_str = log_buffers.getvalue(data_type)
         log_file_path = f"prcapi/batch/error_log/{formatted_date}/{data_type}.log"
         as_instance_log.upload_file(logs_str, file_path=log_file_path, overwrite=True)
 
@@ -144,8 +140,7 @@ def main(mytimer: func.TimerRequest) -> None:
 
     try :
         microsites_index_list, microsites_result = preprocess_instance.microsites_to_storage(logger=logger, type='batch', time=preprocess_time)
-        filter_logs_data_type = filter_logs_by_data_type(logs=thread_local.log_list, data_type=data_type)
-        logs_str = "\n".join(filter_logs_data_type)
+        logs_str = log_buffers.getvalue(data_type)
         log_file_path = f"prcapi/batch/log/{formatted_date}/{data_type}.log"
         as_instance_log.upload_file(logs_str, file_path=log_file_path, overwrite=True)
         as_instance_log.upload_file(microsites_result, file_path=f"prcapi/batch/prc_info/{formatted_date}/{data_type}.json", overwrite=True)
@@ -153,8 +148,7 @@ def main(mytimer: func.TimerRequest) -> None:
     except Exception as e :
         error = traceback.format_exc()
         logger.error(error)
-        filter_logs_data_type = filter_logs_by_data_type(logs=thread_local.log_list, data_type=data_type)
-        logs_str = "\n".join(filter_logs_data_type)
+        logs_str = log_buffers.getvalue(data_type)
         log_file_path = f"prcapi/batch/error_log/{formatted_date}/{data_type}.log"
         as_instance_log.upload_file(logs_str, file_path=log_file_path, overwrite=True)
     
@@ -197,7 +191,7 @@ def main(mytimer: func.TimerRequest) -> None:
         #====================================================== 
         # -- LOAD PRODUCT_MST 
         # [2024.04.25] 수정 - load 방식 변경
-        prod_mst = as_instance_raw.read_file(mst_blob_paths['prod_mst'])
+        prod_mst = as_instance_raw.read_file(mst_blob_paths['prod_mst'], use_cache=True)
         prod_group_cd_map = prod_mst[['PROD_GROUP_CD', 'PROD_CD']].drop_duplicates().reset_index(drop=True)
 
         # -- 법인 대상언어 
@@ -334,8 +328,7 @@ def main(mytimer: func.TimerRequest) -> None:
         preprocess_instance.unzip(logger, tmp_target_unzip)
         logger.info(f"###### End - unzip")
         
-        filter_logs_data_type = filter_logs_by_data_type(logs=thread_local.log_list, data_type=data_type)
-        logs_str = "\n".join(filter_logs_data_type)
+        logs_str = log_buffers.getvalue(data_type)
         log_file_path = f"prcapi/batch/log/{formatted_date}/{data_type}.log"
         as_instance_log.upload_file(logs_str, file_path=log_file_path, overwrite=True)
         
@@ -344,8 +337,7 @@ def main(mytimer: func.TimerRequest) -> None:
         logger.error(traceback.format_exc())
         error_manual = f"{type(e).__name__} : '{e}'"
         logger.error(error_manual)
-        filter_logs_data_type = filter_logs_by_data_type(logs=thread_local.log_list, data_type=data_type)
-        logs_str = "\n".join(filter_logs_data_type)
+        logs_str = log_buffers.getvalue(data_type)
         log_file_path = f"prcapi/batch/error_log/{formatted_date}/{data_type}.log"
         as_instance_log.upload_file(logs_str, file_path=log_file_path, overwrite=True)
 
@@ -377,19 +369,22 @@ def main(mytimer: func.TimerRequest) -> None:
         for index_name in index_list :
             search_instance.backup_index(logger=logger, index_name=index_name, batch_size=1000)
 
-        filter_logs_data_type = filter_logs_by_data_type(logs=thread_local.log_list, data_type=data_type)
-        logs_str = "\n".join(filter_logs_data_type)
+        logs_str = log_buffers.getvalue(data_type)
         log_file_path = f"prcapi/batch/log/{formatted_date}/{data_type}.log"
         as_instance_log.upload_file(logs_str, file_path=log_file_path, overwrite=True)
+
+        # 전처리 완료 표시 ( chat 모델 코드 resolver 가 변경 감지 후 tb_sales_prod_map / tb_if_manual_list 다시 적재 )
+        marker = {"preprocess_date" : formatted_date, "finished_time" : datetime.now(korea_timezone).strftime('%Y-%m-%d %H:%M:%S')}
+        as_instance_log.upload_file(json.dumps(marker), file_path="prcapi/batch/complete.json", overwrite=True)
         
     except Exception as e:
         logger.error(str(e))
         error_contents = f"{type(e).__name__} : '{e}'"
         logger.error(error_contents)
-        filter_logs_data_type = filter_logs_by_data_type(logs=thread_local.log_list, data_type=data_type)
-        logs_str = "\n".join(filter_logs_data_type)
+        logs_str = log_buffers.getvalue(data_type)
         log_file_path = f"prcapi/batch/error_log/{formatted_date}/{data_type}.log"
         as_instance_log.upload_file(logs_str, file_path=log_file_path, overwrite=True)      
+        end_log_buffers(log_buffers)
         return func.HttpResponse(f"에러 발생 - {str(e)}")
     
     # preprocess_result = {'procedure_result' : json.loads(procedure_result),
@@ -399,4 +394,5 @@ def main(mytimer: func.TimerRequest) -> None:
     
     # output = json.dumps(preprocess_result, ensure_ascii=False, indent=4).encode('utf-8')
     # Return the response  
+    end_log_buffers(log_buffers)
     return None
\ No newline at end of file
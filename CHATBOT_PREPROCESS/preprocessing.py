@@ -15,7 +15,7 @@ from urllib.request import urlopen
 from PyPDF2 import PdfReader, PdfWriter
 from collections import Counter, defaultdict
 from tqdm import tqdm
-from tools import extract_data, remove_tag_between, chunked_texts, filter_logs_by_data_type, num_tokens_from_string, read_pdf_using_fitz, make_html_group, extract_page_patterns, to_structured_1, split_text_by_batch, get_system_mssg, parse_text_to_dict, merge_dicts, extract_main_text_microsite
+from tools import extract_data, remove_tag_between, chunked_texts, num_tokens_from_string, read_pdf_using_fitz, make_html_group, extract_page_patterns, to_structured_1, split_text_by_batch, get_system_mssg, parse_text_to_dict, merge_dicts, extract_main_text_microsite
 import pytz
 from zipfile import ZipFile # [2024.04.24] 추가
 from ai_search import AISearch
@@ -1034,7 +1034,7 @@ f"""
         as_instance_raw = AzureStorage(container_name='raw-data', storage_type='datast')
         as_instance_preprocessed = AzureStorage(container_name='preprocessed-data', storage_type='datast')
         as_instance_preprocessed_docst = AzureStorage(container_name='documents', storage_type='docst')
-        PRODUCT_MST = as_instance_raw.read_file(file_path="Contents_Manual_List_Mst_Data/PRODUCT_MST.csv")
+        PRODUCT_MST = as_instance_raw.read_file(file_path="Contents_Manual_List_Mst_Data/PRODUCT_MST.csv", use_cache=True)
 
         sql_instance = MySql()
         locale_mst_table = sql_instance.get_table("""
@@ -1106,7 +1106,7 @@ f"""
         web_container_client = as_instance_web.container_client
         as_instance_raw = AzureStorage(container_name='raw-data', storage_type='datast')
         pdf_list = as_instance_raw.extract_blob_list(blob_path=f"manual_output_{corporation_name}_240207/{corporation_name}/{language_name}", file_type='pdf')
-        product_to_check = as_instance_raw.read_file('Contents_Manual_List_Mst_Data/PRODUCT_MST.csv')
+        product_to_check = as_instance_raw.read_file('Contents_Manual_List_Mst_Data/PRODUCT_MST.csv', use_cache=True)
         sql_instance = MySql()
         locale_mst_table = sql_instance.get_table("""
                                                 SELECT CORP_CD, LOCALE_CD, LANGUAGE_CD, CODE_NAME
@@ -515,10 +515,6 @@ def run_indexer(logger, indexer_list, indexer_client):
     return None
 
 
-def filter_logs_by_data_type(logs, data_type):
-    filter_chat = str(data_type)
-    return [log for log in logs if filter_chat in log]
-
 def get_kst_now():
 
     korea_time_zone = pytz.timezone('Asia/Seoul')